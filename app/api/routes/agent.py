@@ -1,8 +1,14 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.schemas import AgentRequest, AgentResponse
 from app.services.agent_service import AgentService
+from app.services.scheduler import SchedulerRejectedError
 from app.api.dependencies import get_agent_service
-from typing import Optional
+from app.utils.logger import get_logger
+from typing import Optional, Literal
+
+logger = get_logger(__name__)
 
 router = APIRouter(tags=["agents"])
 
@@ -14,6 +20,8 @@ async def chat(
     use_rag: bool = True,
     rag_collection: str = "default",
     rag_num_results: int = 3,
+    use_cache: Optional[bool] = None,
+    priority: Literal["interactive", "batch"] = "interactive",
     agent_service: AgentService = Depends(get_agent_service)):
     """
     Chat with an AI agent using various models.
@@ -21,6 +29,12 @@ async def chat(
     the model is specified in the request, defaulting to the configurted default model.
     This endpoint works with all supported model providers (Ollama, Huggingface, etc.)
     without changing the API contract
+
+    Low-temperature requests are served from the response cache when possible;
+    pass use_cache=false to bypass it or use_cache=true to force it.
+
+    Use priority=batch for evaluation/fan-out jobs so they queue behind
+    interactive chats. Returns 503 if the generation queue can't admit the request in time.
     """
     try:
         # Swagger automatically makes the model "String".. this is to prevent that
@@ -36,11 +50,78 @@ async def chat(
             use_rag=use_rag,
             rag_collection=rag_collection,
             rag_num_results=rag_num_results,
+            use_cache=use_cache,
+            priority=priority,
             **request.additional_params
         )
         return response
+    except SchedulerRejectedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, int(e.retry_after or 1)))}
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error Processing Request: {str(e)}")
-    
\ No newline at end of file
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: AgentRequest,
+    skip_memory: bool = False,
+    conversation_id: Optional[str] = "default",
+    use_rag: bool = True,
+    rag_collection: str = "default",
+    rag_num_results: int = 3,
+    use_cache: Optional[bool] = None,
+    priority: Literal["interactive", "batch"] = "interactive",
+    agent_service: AgentService = Depends(get_agent_service)):
+    """
+    Chat with an AI agent, streaming tokens back as Server-Sent Events.
+
+    Emits a "token" event for each piece of generated text, followed by a single
+    "done" event carrying the model, usage and timing metrics (including
+    time-to-first-token). If something fails mid-stream an "error" event is sent.
+    When the client disconnects the stream is cancelled, which also cancels the
+    upstream generation.
+    """
+    model = None if request.model == "string" else request.model
+
+    async def event_stream():
+        events = agent_service.stream_request(
+            messages=request.messages,
+            model=model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            conversation_id=conversation_id,
+            skip_memory=skip_memory,
+            use_rag=use_rag,
+            rag_collection=rag_collection,
+            rag_num_results=rag_num_results,
+            use_cache=use_cache,
+            priority=priority,
+            **request.additional_params
+        )
+        try:
+            async for event in events:
+                yield _sse_event(event["type"], event)
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {str(e)}")
+            yield _sse_event("error", {"type": "error", "detail": f"Error Processing Request: {str(e)}"})
+        finally:
+            # Starlette cancels this generator when the client disconnects;
+            # closing the agent stream propagates that to the model provider
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import platform
 import time
 import socket
@@ -23,6 +23,7 @@ class HealthResponse(BaseModel):
     environment: str
     system_info: Dict[str, Any]
     services: Dict[str, str]
+    circuit_breakers: Optional[Dict[str, Dict[str, Any]]] = None
 
 start_time = time.time()
 
@@ -36,6 +37,10 @@ async def health_check(agent_service: AgentService = Depends(get_agent_service))
     - Version Info
     - System resources
     - Connected services status
+    - Circuit breaker state of external dependencies
+
+    MongoDB being down reports "degraded" without failing the check, since
+    conversations are kept in buffer memory until it's back.
     """
     services_status = {}
 
@@ -47,6 +52,19 @@ async def health_check(agent_service: AgentService = Depends(get_agent_service))
         logger.error(f"Health check failed for model service: {str(e)}")
         services_status["model_service"] = f"ERROR: {str(e)}"
 
+    # Check whether conversation memory can reach MongoDB
+    circuit_breakers = {}
+    memory_service = agent_service.memory_service
+    mongo_breaker = memory_service.breaker_state()
+    if mongo_breaker is not None:
+        circuit_breakers["mongodb"] = mongo_breaker
+    if not memory_service.use_mongo:
+        services_status["memory_service"] = "OK (buffer memory only)"
+    elif mongo_breaker is not None and mongo_breaker["state"] != "closed":
+        services_status["memory_service"] = "DEGRADED: MongoDB unavailable, using buffer memory"
+    else:
+        services_status["memory_service"] = "OK"
+
     # Get System Information
     system_info = {
         "cpu_percent": psutil.cpu_percent(),
@@ -66,9 +84,13 @@ async def health_check(agent_service: AgentService = Depends(get_agent_service))
         uptime=time.time() - start_time,
         environment=environment,
         system_info=system_info,
-        services=services_status
+        services=services_status,
+        circuit_breakers=circuit_breakers
     )
 
+    if any(status.startswith("DEGRADED") for status in services_status.values()):
+        response.status = "degraded"
+
     # If any service is down return 503 Service Unavailable
     if any("ERROR" in status for status in services_status.values()):
         response.status = "degraded"
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Any
+from app.services.agent_service import AgentService
+from app.services.memory_service import MemoryService
+from app.services.rag_service import RAGService
+from app.api.dependencies import get_agent_service, get_memory_service, get_rag_service
+from app.utils.metrics import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics():
+    """
+    Export in-process performance metrics.
+
+    Returns counters, gauges and histograms (e.g. time-to-first-token per model)
+    recorded since the process started.
+    """
+    return metrics.snapshot()
+
+
+@router.get("/metrics/routing", response_model=Dict[str, Any])
+async def get_routing(agent_service: AgentService = Depends(get_agent_service)):
+    """
+    Inputs of the latency-aware router.
+
+    Returns the current prediction (throughput, in-flight/queued requests,
+    loaded state) for every configured model and the recent routing decisions.
+    """
+    if agent_service.latency_router is None:
+        raise HTTPException(status_code=404, detail="Latency-aware routing is disabled")
+    return agent_service.latency_router.snapshot()
+
+
+@router.get("/metrics/memory", response_model=Dict[str, Any])
+async def get_memory(memory_service: MemoryService = Depends(get_memory_service)):
+    """
+    Occupancy of the in-process conversation memory.
+
+    "buffer": buffered conversations, messages and approximate bytes against
+    their limits, plus evictions by reason (lru, ttl, bytes) and hit counts.
+    "cache": recent-history reads by result (hit, miss, stale, bypass), hit
+    rate and invalidations; null when MongoDB or the cache is disabled.
+    """
+    return {
+        "buffer": memory_service.buffer_stats(),
+        "cache": memory_service.cache_stats()
+    }
+
+
+@router.get("/metrics/rag", response_model=Dict[str, Any])
+async def get_rag(rag_service: RAGService = Depends(get_rag_service)):
+    """
+    Resident RAG collections and the query embedding cache.
+
+    "collections": approximate memory used by loaded FAISS indexes against
+    the budget and, per collection, whether it's resident, its size and
+    vector count, hits and misses, loads, reloads after changes on disk,
+    evictions and load times, and its on-disk segments, compactions and last
+    persist time.
+    "query_embedding_cache": entries, hit rate and the embedding time saved
+    by hits; null when the cache is disabled.
+    "embedding_cache": stored document embeddings and bytes against the
+    budget, this worker's hits and misses, and evictions; null when disabled.
+    "embedding_pipeline": current adaptive batch size, batches, retries,
+    failures and chunks/sec of document embedding.
+    """
+    return {
+        "collections": rag_service.collection_stats(),
+        "query_embedding_cache": rag_service.query_cache_stats(),
+        "embedding_cache": await rag_service.embedding_cache_stats(),
+        "embedding_pipeline": rag_service.embedding_pipeline_stats()
+    }
@@ -1,8 +1,10 @@
 import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from app.config import settings
 from typing import List, Dict, Any
 from app.models.schemas import OllamaModel
+from app.services.model_service import ModelService
+from app.api.dependencies import get_model_service
 
 router = APIRouter(
     prefix="/models",
@@ -34,3 +36,16 @@ async def list_available_models():
                                   detail="Failed to fetch models from Ollama")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error connecting to Ollama: {str(e)}")
+
+
+@router.get("/residency")
+async def get_model_residency(model_service: ModelService = Depends(get_model_service)) -> Dict[str, Any]:
+    """
+    Show which models are loaded in Ollama and why.
+
+    Includes per-model traffic, the keep_alive currently chosen for each model,
+    the memory budget and the residency manager's recent load/evict decisions.
+    """
+    if model_service.residency is None:
+        raise HTTPException(status_code=404, detail="Model residency management is disabled")
+    return model_service.residency.status()
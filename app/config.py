@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 
 # Load Environment variables from .env file if needed
@@ -30,30 +30,207 @@ class Settings(BaseSettings):
     TASK_PARAMS: Dict[str, Dict[str, Any]] = {
         "DEFAULT": {
             "temperature": 0.7,
-            "max_tokens": 1000
+            "max_tokens": 1000,
+            "max_context_tokens": 4096 # Prompt budget: history + RAG context + input
         },
         "TRANSLATION": {
             "temperature": 0.3,
-            "max_tokens": 1000
+            "max_tokens": 1000,
+            "max_context_tokens": 2048
         },
         "CODE": {
             "temperature": 0.2,
-            "max_tokens": 1500
+            "max_tokens": 1500,
+            "max_context_tokens": 8192
         },
         "CREATIVE": {
             "temperature": 0.8,
-            "max_tokens": 2000
+            "max_tokens": 2000,
+            "max_context_tokens": 4096
         },
         "MATH": {
             "temperature": 0.1,
-            "max_tokens": 800
+            "max_tokens": 800,
+            "max_context_tokens": 2048
         }
     }
 
 
+    # Context windows (tokens) per model, with or without the provider prefix
+    MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+        "gemma3:1b": 32768,
+        "deepseek-r1:7b": 32768,
+        "codellama:7b": 16384,
+        "mistral": 32768,
+        "llama2:13b": 4096,
+        "lauchacarro/qwen2.5-translator": 32768
+    }
+    DEFAULT_CONTEXT_WINDOW: int = 4096
+    CONTEXT_CHARS_PER_TOKEN: float = 4.0 # Token estimator heuristic
+    CONTEXT_MIN_TRUNCATED_TOKENS: int = 64 # Drop RAG context rather than keep less than this
+
+    # Prompt layout - "default" inserts RAG context before the newest user message;
+    # "prefix_stable" keeps each conversation's prompt prefix unchanged across turns
+    # so Ollama can reuse its KV cache, and pins the conversation's model/options
+    PROMPT_LAYOUT: str = "default"
+    PROMPT_LAYOUT_TRUNCATE_TO: float = 0.5 # When over budget, drop old turns down to this fraction of it
+    PROMPT_LAYOUT_MAX_CONVERSATIONS: int = 1000
+
+    # Chain factory - max cached (chain type, model, temperature, max_tokens, system message) chains
+    CHAIN_CACHE_MAX_ENTRIES: int = 64
+
+    # Task routing - "keyword" matches keyword lists; "semantic" routes by the
+    # nearest embedded category centroid and falls back to keywords when unsure
+    ROUTING_MODE: str = "keyword"
+    SEMANTIC_ROUTER_EMBEDDING_MODEL: str = "nomic-embed-text"
+    SEMANTIC_ROUTER_THRESHOLD: float = 0.55 # Min cosine similarity to the nearest centroid
+    SEMANTIC_ROUTER_MIN_MARGIN: float = 0.02 # Min lead over the runner-up centroid
+    SEMANTIC_ROUTER_LATENCY_BUDGET_MS: float = 25.0 # Fall back to keywords if the query embedding takes longer
+    SEMANTIC_ROUTER_CENTROIDS_PATH: str = "data/router/centroids.json"
+
+    # Latency-aware routing - when the routed model's predicted latency (queue
+    # wait + load + prompt eval + generation, from observed throughput) exceeds
+    # the SLO, send the request to the fastest fallback model of its category
+    ROUTING_LATENCY_AWARE: bool = True
+    ROUTING_LATENCY_SLO_SECONDS: float = 30.0
+    ROUTING_FALLBACK_MODELS: Dict[str, List[str]] = {
+        "CODE": ["ollama:gemma3:1b"],
+        "CREATIVE": ["ollama:gemma3:1b"],
+        "MATH": ["ollama:gemma3:1b"],
+        "TRANSLATION": ["ollama:gemma3:1b"]
+    }
+    # Used until a model has served requests
+    ROUTING_DEFAULT_TOKENS_PER_SECOND: float = 20.0
+    ROUTING_DEFAULT_PROMPT_TOKENS_PER_SECOND: float = 200.0
+    ROUTING_DEFAULT_COMPLETION_TOKENS: int = 256
+    ROUTING_DEFAULT_LOAD_SECONDS: float = 5.0
+
     # Ollama Settings
     OLLAMA_HOST: str = "http://localhost:11434"
 
+    # Ollama transport settings
+    # "async" uses a shared, pooled httpx.AsyncClient; "executor" runs the
+    # synchronous client in the default thread pool (legacy behaviour)
+    OLLAMA_TRANSPORT: str = "async"
+    OLLAMA_MAX_CONNECTIONS: int = 128
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 64
+    OLLAMA_KEEPALIVE_EXPIRY: float = 60.0
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_READ_TIMEOUT: float = 300.0 # Long generations can take minutes
+    OLLAMA_WRITE_TIMEOUT: float = 30.0
+    OLLAMA_POOL_TIMEOUT: float = 30.0
+
+    # Response cache settings
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_TEMPERATURE: float = 0.2 # Cache only (near-)deterministic generations by default, e.g. MATH/CODE
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    # e.g. "data/response_cache" to enable the on-disk tier. It has no size bound and no expiry sweep
+    # (expired files are deleted when read), so prune it externally, e.g. find <dir> -mmin +60 -delete
+    RESPONSE_CACHE_DISK_PATH: Optional[str] = None
+
+    # Request coalescing - concurrent identical generations share one upstream call
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # Generation scheduler settings
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_GLOBAL_CONCURRENCY: int = 4 # Max generations running at once across all models
+    SCHEDULER_DEFAULT_MODEL_CONCURRENCY: int = 2
+    SCHEDULER_MODEL_CONCURRENCY: Dict[str, int] = {} # Per-model overrides, e.g. {"ollama:llama2:13b": 1}
+    SCHEDULER_MAX_QUEUE: int = 64
+    SCHEDULER_DEADLINES: Dict[str, float] = { # Max queue wait (seconds) per priority class
+        "interactive": 30.0,
+        "batch": 300.0
+    }
+
+    # Model residency settings - keep the routed models loaded in Ollama
+    RESIDENCY_ENABLED: bool = True
+    RESIDENCY_PRELOAD_MODELS: Optional[List[str]] = None # Models loaded at startup and kept warm; None means just DEFAULT_MODEL
+    RESIDENCY_MIN_KEEP_ALIVE: int = 60 # Seconds, for rarely used models
+    RESIDENCY_MAX_KEEP_ALIVE: int = 1800 # Seconds, for busy and preloaded models
+    RESIDENCY_MEMORY_BUDGET_BYTES: Optional[int] = None # e.g. 16 * 1024**3; None leaves eviction to Ollama
+    RESIDENCY_REFRESH_SECONDS: float = 15.0 # How often to resync with /api/ps
+
+    # Query embedding cache - repeated queries reuse their embedding instead of calling Ollama
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = True
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = 4096 # ~3 KB each for 768-dimensional vectors
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Document embedding pipeline - chunks are embedded in concurrent batches whose size
+    # adapts to observed latency (grows while batches are fast, halves when slow or failing)
+    EMBEDDING_BATCH_SIZE: int = 32 # Initial batch size
+    EMBEDDING_MIN_BATCH_SIZE: int = 4
+    EMBEDDING_MAX_BATCH_SIZE: int = 256
+    EMBEDDING_BATCH_INCREASE: int = 8 # Added after a batch within the target latency
+    EMBEDDING_TARGET_BATCH_SECONDS: float = 2.0
+    EMBEDDING_CONCURRENCY: int = 4 # Max batches in flight against Ollama
+    EMBEDDING_MAX_RETRIES: int = 3 # Per failed batch
+    EMBEDDING_RETRY_BASE_DELAY: float = 0.5 # Seconds, doubled per retry
+
+    # Document embedding cache - chunk embeddings persisted by (model, SHA-256 of the text),
+    # shared by all workers, so re-uploaded or overlapping documents aren't embedded again
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024 # Least recently used vectors are evicted beyond this
+
+    # RAG collection registry - loaded FAISS indexes stay resident and are shared across requests
+    RAG_REGISTRY_MAX_BYTES: int = 1024 * 1024 * 1024 # Approximate RAM budget; least recently used collections are unloaded beyond it
+    RAG_REGISTRY_RELOAD_CHECK_SECONDS: float = 1.0 # How often a resident index is checked for changes on disk; 0 checks every use
+
+    # FAISS persistence - uploads are appended to a collection as delta segments listed in a
+    # manifest instead of rewriting the whole index; segments are merged into the base in the background
+    RAG_SEGMENTED_PERSISTENCE: bool = True # False rewrites the whole index on every upload
+    RAG_COMPACT_MAX_SEGMENTS: int = 32 # Compact once a collection has this many segments...
+    RAG_COMPACT_SEGMENT_RATIO: float = 0.5 # ...or its segments reach this fraction of the base's size on disk
+
+    # Buffer memory settings - in-process copy of recent conversation messages
+    MEMORY_BUFFER_MAX_CONVERSATIONS: int = 1000 # Least recently used conversations are evicted beyond this
+    MEMORY_BUFFER_MAX_MESSAGES: int = 100 # Per conversation; the oldest messages are dropped
+    MEMORY_BUFFER_TTL_SECONDS: float = 3600.0 # Conversations idle for longer are evicted
+    MEMORY_BUFFER_MAX_BYTES: int = 64 * 1024 * 1024 # Approximate memory budget for all buffered messages
+
+    # MongoDB settings - "async" uses pymongo's native asyncio client, "sync" the
+    # synchronous client in the default thread pool
+    MEMORY_MONGO_BACKEND: str = "async"
+    MONGO_MAX_POOL_SIZE: int = 50
+    MONGO_MIN_POOL_SIZE: int = 2 # Connections kept open between bursts
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000 # Fail fast if MongoDB isn't available
+
+    # Conversation summary settings - older turns are folded into a rolling summary
+    # by a background worker while the models are idle (needs MongoDB)
+    SUMMARY_ENABLED: bool = True
+    SUMMARY_MODEL: str = "ollama:gemma3:1b" # Small, cheap model
+    SUMMARY_KEEP_RECENT_MESSAGES: int = 10 # Newest messages that are never folded
+    SUMMARY_FOLD_BATCH_MESSAGES: int = 8 # Unsummarized messages beyond the recent ones that trigger a fold
+    SUMMARY_MAX_FOLD_MESSAGES: int = 40 # Max messages folded per generation
+    SUMMARY_MAX_WORDS: int = 200
+    SUMMARY_MAX_TOKENS: int = 400
+    SUMMARY_TEMPERATURE: float = 0.2
+    SUMMARY_IDLE_POLL_SECONDS: float = 0.5 # How often the worker checks for idle models
+    SUMMARY_CACHE_TTL_SECONDS: float = 30.0 # How long a worker keeps a summary before rereading it
+
+    # Memory circuit breaker settings - fail fast while MongoDB is down, reconnect in the background
+    MEMORY_BREAKER_ENABLED: bool = True
+    MEMORY_BREAKER_FAILURE_THRESHOLD: int = 1 # Consecutive connection failures that open the circuit
+    MEMORY_BREAKER_PROBE_BASE_DELAY: float = 1.0 # Seconds before the first reconnection attempt, doubled per failure
+    MEMORY_BREAKER_PROBE_MAX_DELAY: float = 30.0
+
+    # Memory cache settings - recent history is served from process memory
+    MEMORY_CACHE_ENABLED: bool = True
+    MEMORY_CACHE_MAX_CONVERSATIONS: int = 1000
+    MEMORY_CACHE_MAX_MESSAGES: int = 50 # Per conversation; larger history loads go to MongoDB
+    MEMORY_CACHE_VERSION_CHECK_SECONDS: float = 1.0 # How long other workers' writes may go unnoticed; 0 checks every read
+
+    # Memory settings - MongoDB writes are queued and persisted in background batches
+    MEMORY_WRITE_BEHIND_ENABLED: bool = True
+    MEMORY_WRITE_BEHIND_MAX_QUEUE: int = 10000 # Saves wait for the flusher beyond this
+    MEMORY_WRITE_BEHIND_BATCH_SIZE: int = 100 # Max messages per insert_many
+    MEMORY_WRITE_BEHIND_LINGER_MS: float = 5.0 # How long a batch may wait to fill up
+    MEMORY_WRITE_BEHIND_MAX_RETRIES: int = 5
+    MEMORY_WRITE_BEHIND_RETRY_BASE_DELAY: float = 0.2 # Seconds, doubled per retry
+    MEMORY_WRITE_BEHIND_RETRY_MAX_DELAY: float = 5.0
+    MEMORY_WRITE_BEHIND_DRAIN_TIMEOUT: float = 10.0 # Max seconds to persist queued messages on shutdown
+
     # Logging
     LOG_LEVEL: str ="INFO"
 
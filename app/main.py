@@ -1,14 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import agent, health, rag, ollama, chains
+from app.api.routes import agent, health, rag, ollama, chains, metrics
 from app.config import settings
 import uvicorn
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start up and shut down shared services."""
+    from app.api.dependencies import model_service, agent_service, memory_service
+
+    # Connect the MongoDB memory backend
+    await memory_service.start()
+    # Load the routed models before the first request needs them
+    await model_service.start()
+    # Build or load the semantic router centroids (no-op in keyword mode)
+    await agent_service.start()
+
+    yield
+
+    # Stop background summarization
+    await agent_service.close()
+    # Persist queued conversation messages
+    await memory_service.close()
+    # Release pooled Ollama connections
+    await model_service.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
     version=settings.API_VERSION,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -27,6 +52,7 @@ app.include_router(health.router, prefix="/api")
 app.include_router(rag.router, prefix="/api/rag")
 app.include_router(ollama.router, prefix="/api/ollama")
 app.include_router(chains.router, prefix="/api/chains")
+app.include_router(metrics.router, prefix="/api")
 
 
 if __name__ == "__main__":
@@ -22,11 +22,12 @@ class AgentRequest(BaseModel):
     # C# equivalent: public string? Model { get; set; } = null;
     model: Optional[str] = Field(None, description="Model to use for generating response (Like ollama:llama2)")
     
-    # C# equivalent: public float Temperature { get; set; } = 0.7f;
-    temperature: float = Field(0.7, description="Creativity parameter (0-1)")
+    # C# equivalent: public float? Temperature { get; set; } = null;
+    # null means "use the task profile's temperature" (see settings.TASK_PARAMS)
+    temperature: Optional[float] = Field(None, description="Creativity parameter (0-1), defaults to the task profile")
     
-    # C# equivalent: public int MaxTokens { get; set; } = 1000;
-    max_tokens: int = Field(1000, description="Maximum number of tokens to generate")
+    # C# equivalent: public int? MaxTokens { get; set; } = null;
+    max_tokens: Optional[int] = Field(None, description="Maximum number of tokens to generate, defaults to the task profile")
     
     # C# equivalent: public Dictionary<string, object> AdditionalParams { get; set; } = new Dictionary<string, object>();
     # default_factory=dict means "initialize with an empty dictionary"
@@ -39,11 +40,22 @@ class TokenUsage(BaseModel):
     prompt_tokens: Optional[int] = None
     
     # C# equivalent: public int? CompletionTokens { get; set; } = null;
-    completion: Optional[int] = None
+    completion_tokens: Optional[int] = None
     
     # C# equivalent: public int? TotalTokens { get; set; } = null;
     total_tokens: Optional[int] = None
 
+    # Timings reported by the model server, in milliseconds
+    # C# equivalent: public double? LoadDurationMs { get; set; } = null;
+    load_duration_ms: Optional[float] = None
+    prompt_eval_duration_ms: Optional[float] = None
+    eval_duration_ms: Optional[float] = None
+    total_duration_ms: Optional[float] = None
+
+    # Throughput derived from the counts and durations
+    prompt_tokens_per_second: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+
 class AgentResponse(BaseModel):
     """Response schema for agent interactions"""
     # C# equivalent: public required string Response { get; set; }
@@ -53,7 +65,12 @@ class AgentResponse(BaseModel):
     model: str = Field(..., description="Model used for generating the response")
     
     # C# equivalent: public Dictionary<string, object> Usage { get; set; } = new Dictionary<string, object>();
-    usage: Dict[str, Any] = Field(default_factory=dict, description="Token usage information")
+    # Filled from TokenUsage when the provider reports it
+    usage: Dict[str, Any] = Field(default_factory=dict, description="Token usage information (see TokenUsage)")
+
+    # C# equivalent: public Dictionary<string, object> Telemetry { get; set; } = new Dictionary<string, object>();
+    # How the request was handled (task type, context budget decisions, ...)
+    telemetry: Dict[str, Any] = Field(default_factory=dict, description="Request handling decisions and timings")
 
 class OllamaModel(BaseModel):
     """Schema for Ollama model information"""
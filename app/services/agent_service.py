@@ -1,14 +1,20 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+import time
 from app.models.schemas import Message, AgentResponse
 from app.services.model_service import ModelService
 from app.services.memory_service import MemoryService
+from app.services.memory.summary_memory import SummaryMemory, ConversationSummary
+from app.services.context_budget import ContextBudget, count_tokens
+from app.services.prompt_layout import PrefixStableLayout
 from langchain.chains import ConversationChain
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.chat_models import ChatOllama
+from app.services.chains.factory import chain_factory
 from app.config import settings
 from app.utils.logger import get_logger
-from app.utils.keywords import (PROGRAMMING_LANGUAGES, CODE_RELATED_TERMS,
-                                 TRANSLATION_TERMS, MATH_TERMS, CREATIVE_TERMS)
+from app.utils.metrics import metrics
+from app.utils.pipeline import StagePipeline
+from app.services.routing.keyword_router import KeywordRouter
+from app.services.routing.semantic_router import SemanticRouter
+from app.services.routing.latency_router import LatencyAwareRouter
 
 logger = get_logger(__name__)
 
@@ -30,6 +36,66 @@ class AgentService:
         self.model_service = model_service
         self.memory_service = memory_service
         self.rag_service = rag_service
+        self.context_budget = ContextBudget()
+        self.prompt_layout = PrefixStableLayout(self.context_budget)
+        # Keyword sets are compiled once, not scanned per request
+        self.keyword_router = KeywordRouter()
+        self.semantic_router = None
+        if settings.ROUTING_MODE == "semantic":
+            # Share the RAG embedding service (and its caches) when it uses the same model
+            embedding_service = getattr(rag_service, "embedding_service", None)
+            if getattr(embedding_service, "model_name", None) != settings.SEMANTIC_ROUTER_EMBEDDING_MODEL:
+                embedding_service = None
+            self.semantic_router = SemanticRouter(embedding_service, self.keyword_router)
+        # Moves requests to a category's fallback model when the routed one is too busy
+        self.latency_router = None
+        if settings.ROUTING_LATENCY_AWARE:
+            self.latency_router = LatencyAwareRouter(model_service.scheduler, model_service.residency)
+        # Older turns are folded into a rolling summary in the background
+        self.summary_memory = None
+        if settings.SUMMARY_ENABLED and memory_service is not None:
+            self.summary_memory = SummaryMemory(memory_service, model_service)
+
+    async def start(self) -> None:
+        """Load or build the semantic router centroids."""
+        if self.semantic_router is not None:
+            await self.semantic_router.warm_up()
+
+    async def close(self) -> None:
+        """Stop the background summarizer."""
+        if self.summary_memory is not None:
+            await self.summary_memory.close()
+
+    async def classify_task(self, messages: List[Message]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Classify the request into a task category from its latest user message.
+
+        Args:
+            messages: The conversation history
+
+        Returns:
+            Tuple of (category, e.g. "CODE" or "DEFAULT", routing details with
+            the router used and its per-category scores)
+        """
+        last_user_message = next((msg.content for msg in reversed(messages) if msg.role.lower() == "user"), None)
+        if not last_user_message:
+            return "DEFAULT", {}
+
+        if self.semantic_router is not None:
+            category, details = await self.semantic_router.classify(last_user_message)
+        else:
+            category, scores = self.keyword_router.classify(last_user_message)
+            details = {"router": "keyword", "scores": scores}
+        return category or "DEFAULT", details
+
+    def model_for_category(self, category: str) -> str:
+        """The configured model for a task category."""
+        return {
+            "CODE": settings.CODE_MODEL,
+            "CREATIVE": settings.CREATIVE_MODEL,
+            "MATH": settings.MATH_MODEL,
+            "TRANSLATION": settings.TRANSLATION_MODEL
+        }.get(category, settings.DEFAULT_MODEL)
 
     async def select_model_for_task(self, messages: List[Message]) -> str:
         """
@@ -41,35 +107,247 @@ class AgentService:
         Returns:
             The selected model identifier (e.g., "ollama:llama2")
         """
-        # Get the most recent user message
-        user_messages = [msg for msg in messages if msg.role.lower() == "user"]
-        if not user_messages:
-            return settings.DEFAULT_MODEL
-    
-        last_user_message = user_messages[-1].content.lower()
-    
-    
-        # Check if the message mentions a programming language
-        code_keywords = PROGRAMMING_LANGUAGES + CODE_RELATED_TERMS
-        if any(keyword in last_user_message for keyword in code_keywords):
-            logger.info(f"Detected programming language in query, routing to code model")
-            return settings.CODE_MODEL
-    
-        if any(keyword in last_user_message for keyword in CREATIVE_TERMS):
-            logger.info(f"Detected creative task, routing to creative model")
-            return settings.CREATIVE_MODEL
-        
-        if any(keyword in last_user_message for keyword in MATH_TERMS):
-            logger.info(f"Detected mathematical task, routing to math model")
-            return settings.MATH_MODEL
-        
-        if any(keyword in last_user_message for keyword in TRANSLATION_TERMS):
-            logger.info(f"Detected translation task, routing to translation model")
-            return settings.TRANSLATION_MODEL
-    
-        # Default model for general queries
-        return settings.DEFAULT_MODEL
+        model, _, _ = await self.route_request(messages)
+        return model
+
+    async def route_request(
+        self,
+        messages: List[Message],
+        max_tokens: Optional[int] = None
+        ) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Pick the task category and the model to serve it.
+
+        The category's configured model is used unless the latency-aware
+        router predicts it would miss the SLO and a fallback is faster.
+
+        Args:
+            messages: The conversation history
+            max_tokens: Requested max tokens (defaults to the category's)
+
+        Returns:
+            Tuple of (model, category, routing telemetry incl. the reason)
+        """
+        category, details = await self.classify_task(messages)
+        if category != "DEFAULT":
+            logger.info(f"Detected {category.lower()} task ({details['router']} scores: {details['scores']}), routing to {category.lower()} model")
+
+        model = self.model_for_category(category)
+        routing: Dict[str, Any] = {
+            "category": category,
+            "router": details.get("router", "keyword"),
+            "preferred_model": model,
+            "model": model,
+            "reason": "task_category"
+        }
+
+        if self.latency_router is not None:
+            task_params = settings.TASK_PARAMS.get(category, settings.TASK_PARAMS["DEFAULT"])
+            decision = self.latency_router.route(
+                category,
+                model,
+                prompt_tokens=count_tokens(messages),
+                max_tokens=max_tokens or task_params.get("max_tokens")
+            )
+            routing["model"] = decision["model"]
+            routing["reason"] = decision["reason"]
+            routing["predicted_seconds"] = next(
+                p["predicted_seconds"] for p in decision["predictions"] if p["model"] == decision["model"]
+            )
+            if "detail" in decision:
+                routing["detail"] = decision["detail"]
+
+        return routing["model"], category, routing
     
+    async def _prepare_request(
+        self,
+        messages: List[Message],
+        model: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        conversation_id: str,
+        skip_memory: bool,
+        use_rag: bool,
+        rag_collection: str,
+        rag_num_results: int
+        ) -> Tuple[List[Message], str, float, int, Dict[str, Any], Optional[StagePipeline]]:
+        """
+        Run the pre-generation stages shared by normal and streaming requests.
+
+        The stages run as a pipeline, each one as soon as what it needs is ready:
+
+            load ──┬── save (background)
+                   └── route ──┐
+            retrieve ──────────┤
+            summary ───────────┴── fit
+
+        History is loaded before the user message is saved, so it never
+        contains the new message. Saving doesn't block generation; callers
+        wait for it (pipeline.wait("save")) before saving the reply, which
+        keeps the conversation in order.
+
+        With a rolling summary, the prompt gets the summary plus only the
+        loaded turns that come after it.
+
+        Returns:
+            Tuple of (messages to send to the model, selected model,
+            effective temperature, effective max_tokens, telemetry, the
+            pipeline when a user message is being saved, else None)
+        """
+        use_memory = self.memory_service is not None and not skip_memory
+        user_message = next((msg for msg in reversed(messages) if msg.role.lower() == "user"), None)
+        user_query = user_message.content if user_message else ""
+
+        # The prefix-stable layout needs the stored conversation to build on
+        prefix_stable = settings.PROMPT_LAYOUT == "prefix_stable" and use_memory
+
+        async def load(_) -> List[Message]:
+            if not use_memory:
+                return []
+            history = await self.memory_service.load_recent_messages(conversation_id)
+            logger.debug(f"Loaded {len(history)} messages from memory for conversation {conversation_id}")
+            return history
+
+        async def save(_) -> None:
+            logger.debug(f"Saving user message to conversation {conversation_id}")
+            await self.memory_service.save_message(user_message, conversation_id)
+
+        async def route(inputs: Dict[str, Any]) -> Dict[str, Any]:
+            selected, task_type, routing = model, None, None
+            pinned = self.prompt_layout.pinned(conversation_id) if prefix_stable else None
+
+            # Auto-select model if none provided
+            if selected is None:
+                if pinned:
+                    # Stay on the conversation's model so its KV cache keeps being reused
+                    selected = pinned[0]
+                else:
+                    # A latency fallback model keeps the category's task parameters
+                    selected, task_type, routing = await self.route_request(inputs["load"] + messages, max_tokens)
+
+            logger.info(f"Processing request with model: {selected}")
+
+            # Explicit and pinned models get the parameters of the task they serve
+            if task_type is None:
+                task_type = "DEFAULT"
+                if selected == settings.CODE_MODEL:
+                    task_type = "CODE"
+                elif selected == settings.TRANSLATION_MODEL:
+                    task_type = "TRANSLATION"
+                elif selected == settings.CREATIVE_MODEL:
+                    task_type = "CREATIVE"
+                elif selected == settings.MATH_MODEL:
+                    task_type = "MATH"
+
+            task_params = settings.TASK_PARAMS.get(task_type, settings.TASK_PARAMS["DEFAULT"])
+
+            temp = temperature if temperature is not None else task_params.get("temperature")
+            tokens = max_tokens if max_tokens is not None else task_params.get("max_tokens")
+
+            if prefix_stable:
+                if pinned and pinned[0] == selected:
+                    # Keep the options of the conversation's first turn unless overridden
+                    temp = temperature if temperature is not None else pinned[1]
+                    tokens = max_tokens if max_tokens is not None else pinned[2]
+                self.prompt_layout.pin(conversation_id, selected, temp, tokens)
+
+            logger.info(f"Using task type: {task_type}, temperature: {temp}, max_tokens: {tokens}")
+            return {"model": selected, "task_type": task_type, "temperature": temp, "max_tokens": tokens, "routing": routing}
+
+        async def summary(_) -> Optional[ConversationSummary]:
+            # The prefix-stable layout keeps its own transcript instead
+            if not use_memory or prefix_stable or self.summary_memory is None:
+                return None
+            try:
+                return await self.summary_memory.load(conversation_id)
+            except Exception as e:
+                logger.error(f"Error loading conversation summary: {str(e)}")
+                return None
+
+        # RAG Implementation
+        async def retrieve(_) -> Optional[Message]:
+            if not (use_rag and user_query and self.rag_service):
+                return None
+            try:
+                logger.info(f"Retrieving relevant documents from {rag_collection} collection")
+                documents = await self.rag_service.retrieve_relevant_documents(
+                    query=user_query,
+                    top_k=rag_num_results,
+                    collection_name=rag_collection
+                )
+            except Exception as e:
+                logger.error(f"Error retrieving documents: {str(e)}")
+                # Continue without RAG if retrieval fails
+                return None
+
+            if not documents:
+                return None
+            # Format retrieved doc as context
+            context_str = "\n\n".join([f"Document: {doc.page_content}" for doc in documents])
+            logger.info(f"Retrieved {len(documents)} documents as context")
+            return Message(
+                role="system",
+                content=f"Here are some relevant documents that may help with the query:\n\n{context_str}\n\n"
+                        f"Use this information to help answer the user's question."
+            )
+
+        # Fit history, RAG context and the new messages into the task's token budget
+        async def fit(inputs: Dict[str, Any]) -> Tuple[List[Message], Dict[str, Any]]:
+            selection = inputs["route"]
+            history = inputs["load"]
+            assemble = self.prompt_layout.assemble if prefix_stable else self.context_budget.fit
+            kwargs = {"conversation_id": conversation_id} if prefix_stable else {}
+            if inputs["summary"] is not None:
+                history = inputs["summary"].unsummarized(history)
+                kwargs["summary"] = inputs["summary"].text
+            prompt, budget = assemble(
+                history=history,
+                new_messages=messages,
+                model=selection["model"],
+                task_type=selection["task_type"],
+                max_tokens=selection["max_tokens"],
+                context_message=inputs["retrieve"],
+                **kwargs
+            )
+            if inputs["summary"] is not None:
+                budget["summary_high_water_mark"] = inputs["summary"].high_water_mark
+            return prompt, budget
+
+        pipeline = StagePipeline("agent_prepare")
+        pipeline.add("load", load)
+        if use_memory and user_message is not None:
+            pipeline.add("save", save, after=["load"], background=True)
+        pipeline.add("route", route, after=["load"])
+        pipeline.add("retrieve", retrieve)
+        pipeline.add("summary", summary)
+        pipeline.add("fit", fit, after=["load", "route", "retrieve", "summary"])
+
+        started = time.perf_counter()
+        results = await pipeline.run()
+        selection = results["route"]
+        prompt, budget = results["fit"]
+
+        telemetry = {
+            "task_type": selection["task_type"],
+            "prompt_layout": "prefix_stable" if prefix_stable else "default",
+            "context_budget": budget,
+            "pipeline": {
+                "total_ms": round((time.perf_counter() - started) * 1000, 3),
+                "stages": pipeline.timings()
+            }
+        }
+        if selection["routing"] is not None:
+            telemetry["routing"] = selection["routing"]
+
+        return (
+            prompt,
+            selection["model"],
+            selection["temperature"],
+            selection["max_tokens"],
+            telemetry,
+            pipeline if use_memory and user_message is not None else None
+        )
+
     async def process_request(
         self,
         messages: List[Message],
@@ -81,6 +359,8 @@ class AgentService:
         use_rag: bool = True,
         rag_collection: str = "default",
         rag_num_results: int = 3,
+        use_cache: Optional[bool] = None,
+        priority: str = "interactive",
         **additional_params
         ) -> AgentResponse:
 
@@ -97,94 +377,34 @@ class AgentService:
             use_rag: Whether to enhance response with document retreival
             rag_collection: Collection name for relevant documents
             rag_num_results: Number of top documents to retrieve
+            use_cache: Response cache override (None caches low-temperature requests only)
+            priority: Scheduling class, "interactive" (default) or "batch"
             additional_params: Any additional model-specific parameters
         
         Returns:
             AgentResponse with the model's response
         """
-        # Only use memory if not skipping
-        # If we have memory service, save the latest user message to memory
-        if self.memory_service and not skip_memory:
-            # Find the latest user message
-            for msg in reversed(messages):
-                if msg.role.lower() == "user":
-                    logger.debug(f"Saving user message to conversation {conversation_id}")
-                    await self.memory_service.save_message(msg, conversation_id)
-                    break
-
-        if self.memory_service and not skip_memory:
-            # Load prior conversation history
-            conversation_history = await self.memory_service.load_recent_messages(conversation_id)
-            # If we have history, prepend it to the current messages (except the last one)
-            if conversation_history and len(conversation_history) > 1:
-                # Remove the most recent message since it's already in 'messages'
-                conversation_history = conversation_history[:-1]
-                messages = conversation_history + messages
-                logger.debug(f"Loaded {len(conversation_history)} messages from memory for conversation {conversation_id}")
-
-
-        # Auto-select model if none provided
-        if model is None:
-            model = await self.select_model_for_task(messages)
-    
-        logger.info(f"Processing request with model: {model}")
-
-        task_type = "DEFAULT"
-        if model == settings.CODE_MODEL:
-            task_type = "CODE"
-        elif model == settings.TRANSLATION_MODEL:
-            task_type = "TRANSLATION"
-        elif model == settings.CREATIVE_MODEL:
-            task_type = "CREATIVE"
-        elif model == settings.MATH_MODEL:
-            task_type = "MATH"
-
-        task_params = settings.TASK_PARAMS.get(task_type, settings.TASK_PARAMS["DEFAULT"])
-
-        temp = temperature if temperature is not None else task_params.get("temperature")
-        tokens = max_tokens if max_tokens is not None else task_params.get("max_tokens")
-
-        logger.info(f"Using task type: {task_type}, temperature: {temp}, max_tokens: {tokens}")
-    
-        user_query = next((msg.content for msg in reversed(messages) if msg.role.lower() == "user"),"")
-
-        # RAG Implementation
-        context_documents = []
-        if use_rag and user_query and hasattr(self, 'rag_service') and self.rag_service:
-            try:
-                logger.info(f"Retrieving relevant documents from {rag_collection} collection")
-                documents = await self.rag_service.retrieve_relevant_documents(
-                    query=user_query,
-                    top_k=rag_num_results,
-                    collection_name=rag_collection
-                )
-
-                if documents:
-                    # Format retrieved doc as context
-                    context_str = "\n\n".join([f"Document: {doc.page_content}" for doc in documents])
-                    context_message = Message(
-                        role="system",
-                        content=f"Here are some relevant documents that may help with the query:\n\n{context_str}\n\n"
-                                f"Use this information to help answer the user's question."
-                    )
-                    # Insert context before the most recent user message
-                    for i in range(len(messages)-1, -1, -1):
-                        if messages[i].role.lower() == "user":
-                            messages.insert(i, context_message)
-                            break
-
-                    logger.info(f"Added {len(documents)} documents as context")
-                    context_documents = documents
-            except Exception as e:
-                logger.error(f"Error retrieving documents: {str(e)}")
-                # Continue without RAG if retrieval fails
+        messages, model, temp, tokens, telemetry, pipeline = await self._prepare_request(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            conversation_id=conversation_id,
+            skip_memory=skip_memory,
+            use_rag=use_rag,
+            rag_collection=rag_collection,
+            rag_num_results=rag_num_results
+        )
 
         # Use the model service to get a response
         model_response = await self.model_service.generate(
             messages=messages,
             model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
+            temperature=temp,
+            max_tokens=tokens,
+            use_cache=use_cache,
+            priority=priority,
+            conversation_id=conversation_id,
             **additional_params
         )
     
@@ -192,24 +412,157 @@ class AgentService:
         response = AgentResponse(
             response=model_response["content"],
             model=model_response["model"],
-            usage=model_response.get("usage", {})
+            usage=model_response.get("usage", {}),
+            telemetry=telemetry
         )
 
         # if we have memory service, save assistant's response
         if self.memory_service and not skip_memory:
+            if pipeline is not None:
+                # The user message goes first
+                await pipeline.wait("save")
             assistant_message = Message(role="assistant", content=response.response)
             logger.debug(f"Saving assistant response to memory for conversation {conversation_id}")
             await self.memory_service.save_message(assistant_message, conversation_id)
+            if self.summary_memory is not None:
+                self.summary_memory.notify(conversation_id)
+
+        if telemetry["prompt_layout"] == "prefix_stable":
+            self.prompt_layout.record_reply(conversation_id, response.response)
 
         return response
     
-    async def create_conversation_chain(self, model: str = None, system_message: str = None):
+    async def stream_request(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        conversation_id: str = "default",
+        skip_memory: bool = False,
+        use_rag: bool = True,
+        rag_collection: str = "default",
+        rag_num_results: int = 3,
+        use_cache: Optional[bool] = None,
+        priority: str = "interactive",
+        **additional_params
+        ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a chat request, streaming the model's tokens as they arrive.
+
+        Takes the same arguments as process_request. The assistant reply is only
+        saved to memory once the stream has completed; if the consumer stops
+        iterating (e.g. the client disconnected) the upstream generation is
+        cancelled and nothing is saved.
+
+        Yields:
+            {"type": "token", "content": ...} for each piece of text, then a final
+            {"type": "done", "model": ..., "usage": ..., "metrics": {...}, "telemetry": {...}} event
+        """
+        started = time.perf_counter()
+
+        messages, model, temp, tokens, telemetry, pipeline = await self._prepare_request(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            conversation_id=conversation_id,
+            skip_memory=skip_memory,
+            use_rag=use_rag,
+            rag_collection=rag_collection,
+            rag_num_results=rag_num_results
+        )
+
+        upstream = self.model_service.generate_stream(
+            messages=messages,
+            model=model,
+            temperature=temp,
+            max_tokens=tokens,
+            use_cache=use_cache,
+            priority=priority,
+            conversation_id=conversation_id,
+            **additional_params
+        )
+
+        generation_started = time.perf_counter()
+        first_token_at = None
+        parts = []
+        final_chunk = {}
+
+        try:
+            async for chunk in upstream:
+                if chunk.get("content"):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        metrics.observe(
+                            "chat_time_to_first_token_seconds",
+                            first_token_at - started,
+                            model=model
+                        )
+                    parts.append(chunk["content"])
+                    yield {"type": "token", "content": chunk["content"]}
+
+                if chunk.get("done"):
+                    final_chunk = chunk
+                    break
+        except BaseException:
+            metrics.inc("chat_stream_aborted_total", model=model)
+            raise
+        finally:
+            # Cancels the upstream generation if we stopped early
+            await upstream.aclose()
+
+        finished = time.perf_counter()
+        stream_metrics = {
+            "time_to_first_token_ms": (first_token_at - started) * 1000 if first_token_at else None,
+            "generation_time_to_first_token_ms": (first_token_at - generation_started) * 1000 if first_token_at else None,
+            "total_time_ms": (finished - started) * 1000
+        }
+        metrics.observe("chat_stream_duration_seconds", finished - started, model=model)
+        logger.info(f"Streamed response with model {model}, TTFT: {stream_metrics['time_to_first_token_ms']} ms")
+
+        # Persist the assistant reply only once the stream completed
+        if self.memory_service and not skip_memory:
+            if pipeline is not None:
+                # The user message goes first
+                await pipeline.wait("save")
+            assistant_message = Message(role="assistant", content="".join(parts))
+            logger.debug(f"Saving streamed assistant response to memory for conversation {conversation_id}")
+            await self.memory_service.save_message(assistant_message, conversation_id)
+            if self.summary_memory is not None:
+                self.summary_memory.notify(conversation_id)
+
+        if telemetry["prompt_layout"] == "prefix_stable":
+            self.prompt_layout.record_reply(conversation_id, "".join(parts))
+
+        yield {
+            "type": "done",
+            "model": final_chunk.get("model", model),
+            "usage": final_chunk.get("usage", {}),
+            "metrics": stream_metrics,
+            "telemetry": telemetry
+        }
+    
+    async def create_conversation_chain(
+        self,
+        model: str = None,
+        system_message: str = None,
+        conversation_id: str = "default",
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ):
         """
         Create a LangChain ConversationChain with memory.
+
+        The prompt and chat model come from the shared chain factory, so
+        repeated calls reuse them (and their pooled HTTP client).
         
         Args:
             model: Model to use
             system_message: Optional system message to set context
+            conversation_id: Conversation whose memory the chain uses
+            temperature: Optional sampling temperature
+            max_tokens: Optional max tokens to generate
             
             Returns:
                 A LangChain ConversationChain
@@ -219,33 +572,13 @@ class AgentService:
         
         model_name = model or settings.DEFAULT_MODEL
 
-        # Extract the model name without provider prefix
-        if ":" in model_name:
-            provider, actual_model = model_name.split(":", 1)
-        else:
-            actual_model = model_name
-
-        llm = ChatOllama(model=actual_model)
-
-        if system_message:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_message),
-                MessagesPlaceholder(variable_name="history"),
-                ("human", "{input}")
-            ])
-        else:
-            prompt = ChatPromptTemplate.from_messages([
-                MessagesPlaceholder(variable_name="history"),
-                ("human", "{input}")
-            ])
-
-            # Create the chain with memory
+        pooled = chain_factory.get("conversation", model_name, temperature, max_tokens, system_message)
 
+        # Create the chain with memory
         chain = ConversationChain(
-            llm=llm,
-            prompt=prompt,
-            memory=self.memory_service.get_langchain_memory(),
-            verbose=True
+            llm=pooled.llm,
+            prompt=pooled.prompt,
+            memory=self.memory_service.get_langchain_memory(conversation_id)
         )
 
         return chain
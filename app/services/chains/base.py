@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from abc import ABC, abstractmethod
 from app.models.schemas import Message
 
@@ -17,4 +17,26 @@ class BaseChain(ABC):
         """Run the chain with the given inputs."""
         pass
 
-    
\ No newline at end of file
+    async def stream(
+        self,
+        messages: List[Message],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the chain output as incremental chunks.
+
+        Chains without native streaming yield the full result as one chunk.
+        Chunks follow the same format as BaseModelHandler.generate_stream.
+        """
+        response = await self.run(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        yield {"content": response["content"], "done": False}
+        yield {"content": "", "done": True, "usage": response.get("usage", {})}
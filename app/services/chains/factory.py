@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_ollama import ChatOllama
+
+from app.services.model_providers.transport import get_async_client
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+ChainKey = Tuple[str, str, Optional[float], Optional[int], Optional[str]]
+
+
+class PooledChain:
+    """A prompt template and chat model built once and reused across requests."""
+
+    __slots__ = ("prompt", "llm")
+
+    def __init__(self, prompt: ChatPromptTemplate, llm: ChatOllama):
+        self.prompt = prompt
+        self.llm = llm
+
+    async def ainvoke(self, inputs: Dict[str, Any], **llm_kwargs) -> AIMessage:
+        """
+        Run the chain.
+
+        Args:
+            inputs: Prompt variables ("history" and "input")
+            llm_kwargs: Per-request Ollama parameters (e.g. keep_alive)
+        """
+        return await self.llm.ainvoke(self.prompt.invoke(inputs), **llm_kwargs)
+
+    async def astream(self, inputs: Dict[str, Any], **llm_kwargs) -> AsyncIterator[AIMessageChunk]:
+        """Stream the chain output as message chunks."""
+        async for chunk in self.llm.astream(self.prompt.invoke(inputs), **llm_kwargs):
+            yield chunk
+
+
+class ChainFactory:
+    """
+    Builds chains and keeps a bounded LRU cache of them.
+
+    Chains are keyed by (chain type, model, temperature, max_tokens, system
+    message). All chat models share the pooled Ollama client for their host,
+    so cached chains don't hold their own connection pools.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, host: Optional[str] = None):
+        """
+        Initialize the factory.
+
+        Args:
+            max_entries: Max cached chains (defaults to settings.CHAIN_CACHE_MAX_ENTRIES)
+            host: Ollama API host (defaults to settings.OLLAMA_HOST)
+        """
+        self.max_entries = max_entries or settings.CHAIN_CACHE_MAX_ENTRIES
+        self.host = host or settings.OLLAMA_HOST
+        self._chains: "OrderedDict[ChainKey, PooledChain]" = OrderedDict()
+
+    def get(
+        self,
+        chain_type: str,
+        model: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        system_message: Optional[str] = None
+    ) -> PooledChain:
+        """
+        Get a cached chain, building it on first use.
+
+        Args:
+            chain_type: Name of the chain (e.g. "code_llama", "conversation")
+            model: Model name, with or without the "ollama:" prefix
+            temperature: Sampling temperature
+            max_tokens: Max tokens to generate
+            system_message: Optional system prompt
+
+        Returns:
+            The pooled chain
+        """
+        model_name = model.split(":", 1)[1] if model.startswith("ollama:") else model
+        key = (chain_type, model_name, temperature, max_tokens, system_message)
+
+        chain = self._chains.get(key)
+        if chain is not None:
+            self._chains.move_to_end(key)
+            metrics.inc("chain_cache_hits_total", chain=chain_type)
+            return chain
+
+        metrics.inc("chain_cache_misses_total", chain=chain_type)
+        chain = PooledChain(
+            prompt=self._build_prompt(system_message),
+            llm=self._build_llm(model_name, temperature, max_tokens)
+        )
+        self._chains[key] = chain
+        while len(self._chains) > self.max_entries:
+            self._chains.popitem(last=False)
+        logger.debug(f"Built {chain_type} chain for {model_name} ({len(self._chains)} cached)")
+        return chain
+
+    def clear(self) -> None:
+        """Drop every cached chain."""
+        self._chains.clear()
+
+    def _build_prompt(self, system_message: Optional[str]) -> ChatPromptTemplate:
+        """Chat prompt with optional system message, history and the new input."""
+        parts = [("system", system_message)] if system_message else []
+        return ChatPromptTemplate.from_messages(parts + [
+            MessagesPlaceholder(variable_name="history"),
+            ("human", "{input}")
+        ])
+
+    def _build_llm(self, model_name: str, temperature: Optional[float], max_tokens: Optional[int]) -> ChatOllama:
+        """Chat model on top of the shared, pooled Ollama client."""
+        llm = ChatOllama(
+            model=model_name,
+            base_url=self.host,
+            temperature=temperature,
+            num_predict=max_tokens
+        )
+        # ChatOllama creates its own clients (the private _client/_async_client
+        # attributes of langchain-ollama 0.3.1, pinned in requirements.txt); swap
+        # in the shared pooled one and discard its own AsyncClient. Check the
+        # attribute is still there, so an upgrade that renames it fails loudly
+        # instead of silently giving every chain its own connection pool.
+        if not hasattr(llm, "_async_client"):
+            raise RuntimeError(
+                "ChatOllama has no _async_client attribute; the pooled client swap in "
+                "ChainFactory._build_llm needs updating for this langchain-ollama version"
+            )
+        llm._async_client = get_async_client(self.host)
+        return llm
+
+
+# Shared factory instance
+chain_factory = ChainFactory()
@@ -1,12 +1,8 @@
-from typing import List, Dict, Any, Optional
-import asyncio
-from functools import partial
-
-from langchain.chains import LLMChain
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.chat_models import ChatOllama
+from typing import List, Dict, Any, Optional, AsyncIterator
 
 from app.services.chains.base import BaseChain
+from app.services.chains.factory import ChainFactory, chain_factory
+from app.services.model_providers.usage import ollama_usage, record_usage
 from app.models.schemas import Message
 from app.utils.logger import get_logger
 
@@ -15,16 +11,8 @@ logger = get_logger(__name__)
 class CodeLlamaChain(BaseChain):
     """Chain for CodeLlama that enforces programming-focused responses."""
 
-    async def run(
-            self,
-            messages: List[Message],
-            model: str,
-            temperature: float = 0.7,
-            max_tokens: int = 1000,
-            **kwargs
-    ) -> Dict[str, Any]:
-        # Prompt template to follow
-        system_message = """You are a professional programming assistant specializing in:
+    # Prompt template to follow
+    system_message = """You are a professional programming assistant specializing in:
         
         1. Providing clear, efficient code examples
         2. Explaining programming concepts and algorithms
@@ -35,44 +23,79 @@ class CodeLlamaChain(BaseChain):
         politely redirect to programming assistance. Prioritize clarity, correctness, and 
         educational value in your responses."""
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_message),
-            MessagesPlaceholder(variable_name="history"),
-            ("human", "{input}")
-        ])
-
-        model_name = model.split(":", 1)[1] if ":" in model else model
+    def __init__(self, factory: Optional[ChainFactory] = None):
+        """
+        Initialize the chain.
 
+        Args:
+            factory: Chain factory to build/reuse chains from (defaults to the shared one)
+        """
+        self.factory = factory or chain_factory
 
-        # Create the LangChain LLM
-        llm = ChatOllama(
-            model_name=model_name,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
+    def _build_inputs(self, messages: List[Message]) -> Dict[str, Any]:
+        """Convert our messages into the chain's history/input variables."""
+        # The last user message is the input, everything else is history
+        last_user = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].role.lower() == "user"), None)
+        input_message = messages[last_user].content if last_user is not None else ""
 
-        # Create and run the chain
-        chain = LLMChain(llm=llm, prompt=prompt)
+        history = [
+            {"role": msg.role, "content": msg.content}
+            for i, msg in enumerate(messages) if i != last_user
+        ]
 
-        # Convert messages to history format
-        history = [{"role": msg.role, "content": msg.content} for msg in messages[:-1]]
+        return {"history": history, "input": input_message}
 
-        # Get the last user message as input
-        input_message = next ((msg.content for msg in reversed(messages) if msg.role.lower() == "user" ), "")
+    async def run(
+            self,
+            messages: List[Message],
+            model: str,
+            temperature: float = 0.7,
+            max_tokens: int = 1000,
+            **kwargs
+    ) -> Dict[str, Any]:
+        chain = self.factory.get("code_llama", model, temperature, max_tokens, self.system_message)
 
         try:
-            # Run in a thread pool
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                partial(chain.invoke, {"history": history, "input": input_message})
-            )
+            response = await chain.ainvoke(self._build_inputs(messages), **self._llm_kwargs(kwargs))
+
+            # ChatOllama passes Ollama's final stats through as response metadata
+            usage = ollama_usage(response.response_metadata)
+            record_usage(model, usage)
 
             return {
-                "content": response["text"] if isinstance(response, dict) and "text" in response else response,
+                "content": response.content,
                 "model": model,
-                "usage": {}
+                "usage": usage
             }
         except Exception as e:
             logger.error(f"Error in CodeLlamaChain: {str(e)}")
             raise
+
+    async def stream(
+            self,
+            messages: List[Message],
+            model: str,
+            temperature: float = 0.7,
+            max_tokens: int = 1000,
+            **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the chain output token by token."""
+        chain = self.factory.get("code_llama", model, temperature, max_tokens, self.system_message)
+
+        usage = {}
+        try:
+            async for chunk in chain.astream(self._build_inputs(messages), **self._llm_kwargs(kwargs)):
+                if chunk.content:
+                    yield {"content": chunk.content, "done": False}
+                if chunk.response_metadata.get("done"):
+                    usage = ollama_usage(chunk.response_metadata)
+            record_usage(model, usage)
+            yield {"content": "", "done": True, "usage": usage}
+        except Exception as e:
+            logger.error(f"Error streaming CodeLlamaChain: {str(e)}")
+            raise
+
+    @staticmethod
+    def _llm_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Per-request Ollama parameters passed through to the chat model."""
+        return {"keep_alive": kwargs["keep_alive"]} if kwargs.get("keep_alive") is not None else {}
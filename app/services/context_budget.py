@@ -0,0 +1,204 @@
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.schemas import Message
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Role markers and separators the chat template adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """
+    Fast token estimate for a piece of text.
+
+    Uses the larger of a characters-per-token and a words/punctuation based
+    estimate, which stays close to BPE tokenizers for both prose and code
+    without loading a tokenizer. Cached, since history messages are counted
+    again on every turn.
+    """
+    if not text:
+        return 0
+    by_chars = len(text) / settings.CONTEXT_CHARS_PER_TOKEN
+    by_words = len(_WORD_PATTERN.findall(text)) * 0.75
+    return math.ceil(max(by_chars, by_words))
+
+
+def message_tokens(message: Message) -> int:
+    """Estimated tokens for a message, including chat template overhead."""
+    return estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def count_tokens(messages: List[Message]) -> int:
+    """Estimated tokens for a list of messages."""
+    return sum(message_tokens(msg) for msg in messages)
+
+
+class ContextBudget:
+    """
+    Fits conversation history, RAG context and new input into a token budget.
+
+    The budget for a request is the task's max_context_tokens (from
+    TASK_PARAMS), capped by the model's context window, minus the tokens
+    reserved for the reply. Within it:
+
+    1. the new input is always kept
+    2. RAG context is kept, truncated only if it can't fit on its own
+    3. a summary of the conversation before `history` is kept if it fits
+    4. history fills the rest newest-first, whole turns at a time
+    """
+
+    def context_window(self, model: str) -> int:
+        """Context window of a model, in tokens."""
+        windows = settings.MODEL_CONTEXT_WINDOWS
+        if model in windows:
+            return windows[model]
+        # Allow entries without the provider prefix
+        if ":" in model and model.split(":", 1)[1] in windows:
+            return windows[model.split(":", 1)[1]]
+        return settings.DEFAULT_CONTEXT_WINDOW
+
+    def budget_for(self, model: str, task_type: str, max_tokens: int) -> int:
+        """Prompt token budget for a request."""
+        task_params = settings.TASK_PARAMS.get(task_type, settings.TASK_PARAMS["DEFAULT"])
+        window = self.context_window(model)
+        limit = min(task_params.get("max_context_tokens", window), window)
+        # The reply has to fit in the same window
+        return max(0, min(limit, window - (max_tokens or 0)))
+
+    def fit(
+        self,
+        history: List[Message],
+        new_messages: List[Message],
+        model: str,
+        task_type: str,
+        max_tokens: int,
+        context_message: Optional[Message] = None,
+        summary: Optional[str] = None
+    ) -> Tuple[List[Message], Dict[str, Any]]:
+        """
+        Assemble the prompt messages within the budget.
+
+        Args:
+            history: Prior conversation messages, oldest first
+            new_messages: Messages from the current request (always kept)
+            model: Full model name
+            task_type: Key into settings.TASK_PARAMS
+            max_tokens: Tokens reserved for the reply
+            context_message: Optional RAG context, placed before the last user message
+            summary: Optional summary of the turns before `history`
+
+        Returns:
+            Tuple of (messages to send, budget decisions for telemetry)
+        """
+        budget = self.budget_for(model, task_type, max_tokens)
+        input_tokens = count_tokens(new_messages)
+        remaining = budget - input_tokens
+
+        decision: Dict[str, Any] = {
+            "budget_tokens": budget,
+            "context_window": self.context_window(model),
+            "input_tokens": input_tokens,
+            "history_messages_available": len(history),
+            "history_messages_kept": 0,
+            "history_tokens": 0,
+            "summary_used": False,
+            "context_tokens": 0,
+            "context_truncated": False
+        }
+        if remaining < 0:
+            decision["input_exceeds_budget"] = True
+            remaining = 0
+
+        # RAG context answers the current question, so it outranks old history;
+        # it is only truncated if it doesn't fit even without any history
+        if context_message is not None:
+            cost = message_tokens(context_message)
+            if cost > remaining:
+                context_message = self._truncate(context_message, remaining)
+                decision["context_truncated"] = True
+            if context_message is not None:
+                decision["context_tokens"] = message_tokens(context_message)
+                remaining -= decision["context_tokens"]
+
+        # The summary stands in for everything before the history, so it goes
+        # ahead of individual old turns
+        summary_message = None
+        if summary:
+            summary_message = Message(
+                role="system",
+                content=f"Summary of the earlier conversation:\n{summary}"
+            )
+            cost = message_tokens(summary_message)
+            if cost <= remaining:
+                decision["summary_used"] = True
+                decision["summary_tokens"] = cost
+                remaining -= cost
+            else:
+                summary_message = None
+
+        # History: keep the newest whole turns that fit, dropping the oldest
+        turns = self._split_turns(history)
+        kept: List[Message] = []
+        for turn in reversed(turns):
+            cost = count_tokens(turn)
+            if cost > remaining:
+                break
+            kept = turn + kept
+            remaining -= cost
+
+        dropped = len(history) - len(kept)
+        decision["history_messages_kept"] = len(kept)
+        decision["history_messages_dropped"] = dropped
+        decision["history_tokens"] = count_tokens(kept)
+
+        prompt = ([summary_message] if summary_message else []) + kept + list(new_messages)
+        if context_message is not None:
+            # Insert context before the most recent user message
+            for i in range(len(prompt) - 1, -1, -1):
+                if prompt[i].role.lower() == "user":
+                    prompt.insert(i, context_message)
+                    break
+
+        decision["prompt_tokens"] = count_tokens(prompt)
+        if dropped or decision["context_truncated"]:
+            metrics.inc("context_budget_trimmed_total", model=model, task=task_type)
+            logger.info(
+                f"Context budget {budget} tokens for {model}: dropped {dropped} history messages, "
+                f"context truncated: {decision['context_truncated']}"
+            )
+        metrics.observe("context_prompt_tokens", decision["prompt_tokens"], buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768), model=model)
+
+        return prompt, decision
+
+    @staticmethod
+    def _split_turns(history: List[Message]) -> List[List[Message]]:
+        """Group history into turns, each starting at a user message."""
+        turns: List[List[Message]] = []
+        for msg in history:
+            if msg.role.lower() == "user" or not turns:
+                turns.append([msg])
+            else:
+                turns[-1].append(msg)
+        return turns
+
+    @staticmethod
+    def _truncate(message: Message, max_tokens: int) -> Optional[Message]:
+        """Shorten a message to roughly max_tokens, or drop it if nothing useful fits."""
+        available = max_tokens - MESSAGE_OVERHEAD_TOKENS
+        if available < settings.CONTEXT_MIN_TRUNCATED_TOKENS:
+            return None
+        content = message.content
+        # Shrink proportionally until the estimate fits
+        while content and estimate_tokens(content) > available:
+            content = content[:int(len(content) * available / estimate_tokens(content) * 0.95)]
+        return Message(role=message.role, content=content)
@@ -1,5 +1,6 @@
 from app.services.memory.base import BaseMemory
 from app.services.memory.mongo_memory import MongoMemory
-from app.services.memory.buffer_memory import ConversationBufferMemoryWrapper
+from app.services.memory.async_mongo_memory import AsyncMongoMemory
+from app.services.memory.buffer_memory import BoundedBufferMemory, ConversationBufferMemoryWrapper
 
-__all__ = ["BaseMemory", "MongoMemory", "ConversationBufferMemoryWrapper"]
\ No newline at end of file
+__all__ = ["BaseMemory", "MongoMemory", "AsyncMongoMemory", "BoundedBufferMemory", "ConversationBufferMemoryWrapper"]
\ No newline at end of file
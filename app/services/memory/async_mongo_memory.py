@@ -0,0 +1,283 @@
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+from bson import ObjectId
+import pymongo
+from pymongo import AsyncMongoClient
+
+from app.models.schemas import Message
+from app.services.memory.base import BaseMemory
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Only what a Message needs (plus _id, which is always returned)
+MESSAGE_PROJECTION = {"role": 1, "content": 1}
+
+
+class AsyncMongoMemory(BaseMemory):
+    """
+    MongoDB memory storage on pymongo's native asyncio client.
+
+    Same storage layout as MongoMemory, but every operation runs on the event
+    loop instead of the default thread pool, which FAISS and the Ollama
+    executor transport also use. Reads only fetch role and content, and the
+    (conversation_id, timestamp) index serves the recent-messages query
+    (filter + sort + limit) without an in-memory sort.
+
+    The connection is checked and the index created in initialize(); the
+    client can be injected, e.g. the in-process stand-in in
+    benchmarks/fake_mongo.py.
+    """
+
+    def __init__(self,
+                 connection_string: str = "mongodb://localhost:27017",
+                 db_name: str = "agent_conversations",
+                 client: Optional[Any] = None):
+        """
+        Set up the client. Call initialize() before use.
+
+        Args:
+            connection_string: MongoDB connection URI
+            db_name: Name of the database to use
+            client: Client to use instead of creating an AsyncMongoClient
+        """
+        self.connection_string = connection_string
+        self.db_name = db_name
+        self.client = client or AsyncMongoClient(
+            connection_string,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+        )
+        self.db = self.client[db_name]
+        self.messages_collection = self.db["messages"]
+        self.versions_collection = self.db["conversation_versions"]
+        self.summaries_collection = self.db["conversation_summaries"]
+
+        logger.info(f"Initialized async MongoDB memory with db: {db_name}")
+
+    async def initialize(self) -> None:
+        """Check the connection and create the index for the recent-messages query."""
+        try:
+            await self.client.admin.command("ping")
+            await self.messages_collection.create_index([
+                ("conversation_id", pymongo.ASCENDING),
+                ("timestamp", pymongo.DESCENDING)
+            ])
+            logger.info("Successfully connected to MongoDB (async)")
+        except Exception as e:
+            logger.error(f"Error connecting to MongoDB: {str(e)}")
+            raise
+
+    async def close(self) -> None:
+        """Close the client's connection pool."""
+        await self.client.close()
+
+    def message_to_doc(self, message: Message, conversation_id: str) -> Dict[str, Any]:
+        """ Convert a Message to a MongoDB doc."""
+        return {
+            "role": message.role,
+            "content": message.content,
+            "conversation_id": conversation_id,
+            "timestamp": datetime.now()
+        }
+
+    def doc_to_message(self, doc: Dict[str, Any]) -> Message:
+        """ Convert a MongoDB document to a message object."""
+        return Message(
+            role=doc["role"],
+            content=doc["content"]
+        )
+
+    async def save_message(self, message: Message, conversation_id: str = "default") -> None:
+        """
+        Save a message to MongoDB.
+
+        Args:
+            message: The message to save
+            conversation_id: Identifier for the conversation
+        """
+        try:
+            await self.messages_collection.insert_one(self.message_to_doc(message, conversation_id))
+            logger.debug(f"Saved message to MongoDB for conversation {conversation_id}")
+        except Exception as e:
+            logger.error(f"Failed to save message to MongoDB: {str(e)}")
+            raise
+
+    async def insert_documents(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Insert message documents in one ordered batch.
+
+        Args:
+            docs: Documents as built by message_to_doc()
+
+        Raises:
+            BulkWriteError: Some documents weren't inserted (see details["nInserted"])
+        """
+        await self.messages_collection.insert_many(docs, ordered=True)
+
+    async def load_messages(self, conversation_id: str = "default", limit: Optional[int] = None, skip: int = 0) -> List[Message]:
+        """
+        Load messages from MongoDB.
+
+        Args:
+            conversation_id: Identifier for the conversation
+            limit: Max number of messages to load
+            skip: Number of oldest messages to skip
+
+        Returns:
+            List of messages (oldest first)
+        """
+        try:
+            cursor = self.messages_collection.find(
+                {"conversation_id": conversation_id},
+                MESSAGE_PROJECTION
+            ).sort("timestamp", pymongo.ASCENDING).skip(skip).limit(limit or 0)
+            docs = await cursor.to_list()
+
+            messages = [self.doc_to_message(doc) for doc in docs]
+            logger.debug(f"Loaded {len(messages)} messages from MongoDB for conversation {conversation_id}")
+            return messages
+        except Exception as e:
+            logger.error(f"Failed to load messages from MongoDB: {str(e)}")
+            raise
+
+    async def load_recent_documents(self, conversation_id: str = "default", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Load the most recent message documents of a conversation.
+
+        Args:
+            conversation_id: Identifier for the conversation
+            limit: Max number of documents to load
+
+        Returns:
+            List of documents with _id, role and content (oldest first)
+        """
+        # Newest first from the index, then reversed into chronological order
+        cursor = self.messages_collection.find(
+            {"conversation_id": conversation_id},
+            MESSAGE_PROJECTION
+        ).sort("timestamp", pymongo.DESCENDING).limit(limit)
+        docs = await cursor.to_list(length=limit)
+        docs.reverse()
+        return docs
+
+    async def load_recent_messages(self, conversation_id: str = "default", limit: int = 10) -> List[Message]:
+        """
+        Load most recent messages from MongoDB.
+
+        Args:
+            conversation_id: Identifier for the conversation
+            limit: Max number of messages to load
+
+        Returns:
+            List of messages (oldest first)
+        """
+        try:
+            docs = await self.load_recent_documents(conversation_id, limit)
+            messages = [self.doc_to_message(doc) for doc in docs]
+            logger.debug(f"Loaded {len(messages)} recent messages from MongoDB for conversation {conversation_id}")
+            return messages
+        except Exception as e:
+            logger.error(f"Failed to load recent messages from MongoDB: {str(e)}")
+            raise
+
+    async def clear_conversation(self, conversation_id: str = "default") -> None:
+        """
+        Clear all messages (and the summary) for a conversation.
+
+        Args:
+            conversation_id: Identifier for the conversation to clear
+        """
+        try:
+            result = await self.messages_collection.delete_many({"conversation_id": conversation_id})
+            await self.summaries_collection.delete_one({"_id": conversation_id})
+            logger.info(f"Cleared {result.deleted_count} messages for conversation {conversation_id}")
+        except Exception as e:
+            logger.error(f"Failed to clear conversation from MongoDB: {str(e)}")
+            raise
+
+    async def delete_message(self, message_id: str, conversation_id: str = "default") -> None:
+        """
+        Delete a specific message.
+
+        Args:
+            message_id: ID of the message to delete
+            conversation_id: Identifier for the conversation
+        """
+        try:
+            await self.messages_collection.delete_one({
+                "_id": ObjectId(message_id),
+                "conversation_id": conversation_id
+            })
+            logger.debug(f"Deleted message {message_id} from conversation {conversation_id}")
+        except Exception as e:
+            logger.error(f"Failed to delete message from MongoDB: {str(e)}")
+            raise
+
+    async def get_conversation_version(self, conversation_id: str = "default") -> int:
+        """
+        Get a conversation's write version (0 if it was never written).
+
+        Args:
+            conversation_id: Identifier for the conversation
+
+        Returns:
+            The version counter
+        """
+        doc = await self.versions_collection.find_one({"_id": conversation_id})
+        return doc["version"] if doc else 0
+
+    async def increment_conversation_version(self, conversation_id: str = "default") -> int:
+        """
+        Bump a conversation's write version after changing its messages.
+
+        Args:
+            conversation_id: Identifier for the conversation
+
+        Returns:
+            The new version
+        """
+        doc = await self.versions_collection.find_one_and_update(
+            {"_id": conversation_id},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=pymongo.ReturnDocument.AFTER
+        )
+        return doc["version"]
+
+    async def load_summary(self, conversation_id: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Load a conversation's rolling summary.
+
+        Args:
+            conversation_id: Identifier for the conversation
+
+        Returns:
+            The summary document, or None if there is none
+        """
+        return await self.summaries_collection.find_one({"_id": conversation_id})
+
+    async def save_summary(self, conversation_id: str, summary: Dict[str, Any]) -> None:
+        """
+        Store a conversation's rolling summary, replacing the previous one.
+
+        Args:
+            conversation_id: Identifier for the conversation
+            summary: Summary document (without _id)
+        """
+        await self.summaries_collection.replace_one({"_id": conversation_id}, summary, upsert=True)
+
+    async def get_all_conversation_ids(self) -> List[str]:
+        """
+        Get all available conversation IDs.
+
+        Returns:
+            List of unique conversation IDs
+        """
+        try:
+            return await self.messages_collection.distinct("conversation_id")
+        except Exception as e:
+            logger.error(f"Failed to get conversation IDs from MongoDB: {str(e)}")
+            raise
@@ -1,171 +1,306 @@
-from typing import List, Dict, Any, Optional
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Deque, Sequence
 from langchain.memory import ConversationBufferMemory
+from langchain_core.chat_history import BaseChatMessageHistory
 from langchain.schema import AIMessage, HumanMessage, SystemMessage, BaseMessage
 
 from app.models.schemas import Message
 from app.services.memory.base import BaseMemory
+from app.config import settings
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
 
 logger = get_logger(__name__)
 
-class ConversationBufferMemoryWrapper(BaseMemory):
+# Roles kept in the buffer (system messages never were)
+_ROLES = {"user": "user", "assistant": "assistant"}
+
+
+class _BufferedMessage:
+    """A stored message: role, content and its approximate memory footprint."""
+
+    __slots__ = ("role", "content", "size")
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+        self.size = sys.getsizeof(content) + _RECORD_OVERHEAD
+
+
+class _Conversation:
+    """Ring buffer of a conversation's most recent messages."""
+
+    __slots__ = ("messages", "size", "last_access")
+
+    def __init__(self, max_messages: int):
+        self.messages: Deque[_BufferedMessage] = deque(maxlen=max_messages)
+        self.size = 0
+        self.last_access = time.monotonic()
+
+
+# Size of a record without its content string
+_RECORD_OVERHEAD = sys.getsizeof(object.__new__(_BufferedMessage))
+
+
+class BoundedBufferMemory(BaseMemory):
     """
-    Wrapper for LangChain's ConversationBufferMemory.
-    
-    This provides a short-term memory storage for active conversations,
-    implementing the BaseMemory interface.
+    Bounded in-process store of recent conversation messages.
+
+    Short-term memory for active conversations and the fallback when MongoDB
+    is unavailable. Each conversation keeps its last `max_messages` messages
+    in a ring buffer of slotted (role, content) records, and loads build
+    Message objects straight from them.
+
+    Conversations are evicted when they haven't been used for `ttl_seconds`,
+    when there are more than `max_conversations`, or when the stored messages
+    exceed `max_bytes` (least recently used first in both cases).
     """
 
-    def __init__(self):
-        """Initialize the buffer memory."""
-        # Dictionary to store conversatoin memory objects for each conversation ID
-        self.memories: Dict[str, ConversationBufferMemory] = {}
-        logger.info("Initialized ConversationBufferMemoryWrapper")
-
-    def _get_or_create_memory(self, conversation_id: str) -> ConversationBufferMemory:
-        """Get an existing memory or create a new one for the conversation ID."""
-        if conversation_id not in self.memories:
-            self.memories[conversation_id] = ConversationBufferMemory(
-                return_messages=True,
-                ai_prefix="assistant",  # This needs to match the message schema
-                human_prefix="user"
-            )
-            logger.debug(f"Created new buffer memory for conversation ID: {conversation_id}")
+    def __init__(
+        self,
+        max_conversations: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Initialize the buffer memory.
 
-        return self.memories[conversation_id]
-    
-    def _convert_to_langchain_message(self, message: Message) -> BaseMessage:
-        """Convert our message model to a langchain message."""
-        role = message.role.lower()
-
-        if role == "user":
-            return HumanMessage(content=message.content)
-        elif role == "assistant":
-            return AIMessage(content=message.content)
-        elif role == "system":
-            return SystemMessage(content=message.content)
-        else:
-            # Default to HumanMessage if role is unknown
-            logger.warning(f"Unknown role '{role}' in message. Defaulting to HumanMessage.")
-            return HumanMessage(content=message.content)
-        
-
-    def _convert_from_langchain_message(self, message: BaseMessage) -> Message:
-        """Convert a langchain message back to our message model."""
-        if isinstance(message, HumanMessage):
-            role = "user"
-        elif isinstance(message, AIMessage):
-            role = "assistant"
-        elif isinstance(message, SystemMessage):    
-            role = "system"
-        else:
-            logger.warning(f"Unknown langchain message type '{type(message)}'. Defaulting to HumanMessage.")
-            role = "user"
+        Args:
+            max_conversations: Max conversations kept
+            max_messages: Messages kept per conversation (oldest are dropped)
+            ttl_seconds: Idle time after which a conversation is evicted
+            max_bytes: Approximate memory budget for all stored messages
+        """
+        self.max_conversations = max_conversations or settings.MEMORY_BUFFER_MAX_CONVERSATIONS
+        self.max_messages = max_messages or settings.MEMORY_BUFFER_MAX_MESSAGES
+        self.ttl_seconds = ttl_seconds or settings.MEMORY_BUFFER_TTL_SECONDS
+        self.max_bytes = max_bytes or settings.MEMORY_BUFFER_MAX_BYTES
+
+        # Least recently used first
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._bytes = 0
+        self._evictions: Dict[str, int] = {"lru": 0, "ttl": 0, "bytes": 0}
+        self._hits = 0
+        self._misses = 0
+
+        logger.info(
+            f"Initialized BoundedBufferMemory (conversations={self.max_conversations}, "
+            f"messages={self.max_messages}, ttl={self.ttl_seconds}s, bytes={self.max_bytes})"
+        )
 
-        return Message(role=role, content=message.content)
-    
     async def save_message(self, message: Message, conversation_id: str = "default") -> None:
         """
         Save a message to the buffer memory.
-        
-        
+
         Args:
             message: the message to save
             conversation_id: Unique ID for the conversation
         """
-        memory = self._get_or_create_memory(conversation_id)
-
-        # Save to memory based on role
-
-        role = message.role.lower()
-        if role == "user":
-            memory.chat_memory.add_user_message(message.content)
-        elif role == "assistant":
-            memory.chat_memory.add_ai_message(message.content)
-        elif role == "system":
-            # System messages aren't directly supported by ConversationBufferMemory
-            # If needed add custom handling
-            logger.warning("System messages are not directly supported in ConversationBufferMemory.")
-            pass
-        else:
-            logger.warning(f"Unknown message role: {role}. Message not saved.")
+        self.append(conversation_id, message.role, message.content)
 
-        logger.debug(f"Saved {role} message to buffer memory for conversation {conversation_id}")
+    def append(self, conversation_id: str, role: str, content: str) -> None:
+        """Store a message (synchronous; used by the LangChain adapter too)."""
+        stored_role = _ROLES.get(role.lower())
+        if stored_role is None:
+            logger.warning(f"Only user and assistant messages are kept in buffer memory, not {role!r}")
+            return
 
+        self._expire()
+        conversation = self._touch(conversation_id, create=True)
+
+        if len(conversation.messages) == conversation.messages.maxlen:
+            # The ring buffer drops its oldest message on append
+            self._resize(conversation, -conversation.messages[0].size)
+        record = _BufferedMessage(stored_role, content)
+        conversation.messages.append(record)
+        self._resize(conversation, record.size)
+
+        self._enforce_limits(keep=conversation_id)
+        logger.debug(f"Saved {stored_role} message to buffer memory for conversation {conversation_id}")
 
     async def load_messages(self, conversation_id: str = "default", limit: Optional[int] = None) -> List[Message]:
         """
         Load messages from the buffer memory.
-        
-        
+
         Args:
             conversation_id: Unique ID for the conversation
-            limit: Max number of messages to load (ignored in buffer memory)
-            
-            
+            limit: Max number of messages to load (most recent)
+
         Returns:
-            List of messages
+            List of messages (oldest first)
         """
-        memory = self._get_or_create_memory(conversation_id)
-
-        # Get messages from memory
-
-        langchain_messages = memory.chat_memory.messages
-
-        # Convert to our message model
-
-        messages = [self._convert_from_langchain_message(msg) for msg in langchain_messages]
-
-        # Apply limit if provided
+        records = self.records(conversation_id)
         if limit is not None and limit > 0:
-            messages = messages[-limit:]
-
+            records = records[-limit:]
+        messages = [Message(role=record.role, content=record.content) for record in records]
         logger.debug(f"Loaded {len(messages)} messages from buffer memory for conversation {conversation_id}")
         return messages
-    
+
+    def records(self, conversation_id: str) -> List[_BufferedMessage]:
+        """A conversation's stored records, oldest first."""
+        self._expire()
+        conversation = self._touch(conversation_id, create=False)
+        if conversation is None:
+            self._misses += 1
+            return []
+        self._hits += 1
+        return list(conversation.messages)
 
     async def clear_conversation(self, conversation_id: str = "default") -> None:
         """
         Clear all messages for a conversation.
-        
-        
+
         Args:
             conversation_id: Identifier for the conversation to clear
         """
-        if conversation_id in self.memories:
-            self.memories[conversation_id].clear()
-            logger.info(f"Cleared buffer memory for conversation {conversation_id}")
-        else:
-            logger.debug(f"No buffer memory found for conversation {conversation_id}")
+        self.clear(conversation_id)
 
+    def clear(self, conversation_id: str) -> None:
+        """Drop a conversation (synchronous; used by the LangChain adapter too)."""
+        conversation = self._conversations.pop(conversation_id, None)
+        if conversation is None:
+            logger.debug(f"No buffer memory found for conversation {conversation_id}")
+            return
+        self._bytes -= conversation.size
+        self._update_gauges()
+        logger.info(f"Cleared buffer memory for conversation {conversation_id}")
 
     async def delete_message(self, message_id: str, conversation_id: str = "default") -> None:
         """
         Delete a specific message from memory.
-        
-        Note: ConversionBufferMemory doesn't support deleting individual messages.
-        This is a stub implementation to satisfy the BaseMemory interface.
+
+        Buffered messages have no IDs, so this is not supported.
+
         Args:
             message_id: ID of the message to delete
             conversation_id: Identifier for the conversation
         """
-        # Not implemented in buffer memory
         logger.warning("Delete message not implemented in buffer memory.")
-        
-
 
     def get_langchain_memory(self, conversation_id: str = "default") -> ConversationBufferMemory:
         """
-        Get the LangChain memory object for a specific conversation ID.
-        
-        
+        Get a LangChain memory object backed by this buffer.
+
         Args:
             conversation_id: Unique ID for the conversation
-            
-            
+
         Returns:
-            LangChain ConversationBufferMemory object
+            LangChain ConversationBufferMemory reading and writing this buffer
         """
-        return self._get_or_create_memory(conversation_id)
-    
-    
+        return ConversationBufferMemory(
+            chat_memory=BufferChatMessageHistory(self, conversation_id),
+            return_messages=True,
+            ai_prefix="assistant",  # This needs to match the message schema
+            human_prefix="user"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy, eviction and hit counts."""
+        return {
+            "conversations": len(self._conversations),
+            "max_conversations": self.max_conversations,
+            "messages": sum(len(conversation.messages) for conversation in self._conversations.values()),
+            "max_messages_per_conversation": self.max_messages,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": dict(self._evictions),
+            "hits": self._hits,
+            "misses": self._misses
+        }
+
+    def _touch(self, conversation_id: str, create: bool) -> Optional[_Conversation]:
+        """Get a conversation and mark it most recently used."""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            if not create:
+                return None
+            conversation = _Conversation(self.max_messages)
+            self._conversations[conversation_id] = conversation
+            logger.debug(f"Created new buffer memory for conversation ID: {conversation_id}")
+        else:
+            self._conversations.move_to_end(conversation_id)
+        conversation.last_access = time.monotonic()
+        return conversation
+
+    def _resize(self, conversation: _Conversation, delta: int) -> None:
+        conversation.size += delta
+        self._bytes += delta
+
+    def _expire(self) -> None:
+        """Evict conversations idle for longer than the TTL (they are at the LRU end)."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if conversation.last_access > cutoff:
+                break
+            self._evict(conversation_id, "ttl")
+
+    def _enforce_limits(self, keep: str) -> None:
+        """Evict least recently used conversations until within the count and byte limits."""
+        while len(self._conversations) > self.max_conversations:
+            self._evict(next(iter(self._conversations)), "lru")
+
+        while self._bytes > self.max_bytes:
+            victim = next(iter(self._conversations))
+            if victim != keep:
+                self._evict(victim, "bytes")
+                continue
+            # Only the active conversation is left: drop its oldest messages
+            conversation = self._conversations[keep]
+            if len(conversation.messages) <= 1:
+                break
+            self._resize(conversation, -conversation.messages.popleft().size)
+
+        self._update_gauges()
+
+    def _evict(self, conversation_id: str, reason: str) -> None:
+        conversation = self._conversations.pop(conversation_id)
+        self._bytes -= conversation.size
+        self._evictions[reason] += 1
+        metrics.inc("memory_buffer_evictions_total", reason=reason)
+        logger.debug(f"Evicted buffer memory for conversation {conversation_id} ({reason})")
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("memory_buffer_conversations", len(self._conversations))
+        metrics.set_gauge("memory_buffer_bytes", self._bytes)
+
+
+class BufferChatMessageHistory(BaseChatMessageHistory):
+    """LangChain chat history view of one conversation in a BoundedBufferMemory."""
+
+    def __init__(self, buffer: BoundedBufferMemory, conversation_id: str):
+        self.buffer = buffer
+        self.conversation_id = conversation_id
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """The conversation as LangChain messages."""
+        return [
+            HumanMessage(content=record.content) if record.role == "user" else AIMessage(content=record.content)
+            for record in self.buffer.records(self.conversation_id)
+        ]
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """Store LangChain messages in the buffer."""
+        for message in messages:
+            if isinstance(message, HumanMessage):
+                self.buffer.append(self.conversation_id, "user", message.content)
+            elif isinstance(message, AIMessage):
+                self.buffer.append(self.conversation_id, "assistant", message.content)
+            elif isinstance(message, SystemMessage):
+                logger.warning("System messages are not kept in buffer memory.")
+            else:
+                logger.warning(f"Unknown langchain message type '{type(message)}'. Defaulting to HumanMessage.")
+                self.buffer.append(self.conversation_id, "user", message.content)
+
+    def clear(self) -> None:
+        """Drop the conversation from the buffer."""
+        self.buffer.clear(self.conversation_id)
+
+
+# The buffer used to wrap one LangChain ConversationBufferMemory per conversation
+ConversationBufferMemoryWrapper = BoundedBufferMemory
@@ -0,0 +1,251 @@
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.models.schemas import Message
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class _CachedConversation:
+    """The most recent messages of a conversation, as of a MongoDB version."""
+
+    __slots__ = ("messages", "version", "complete", "checked_at")
+
+    def __init__(self, messages: List[Message], max_messages: int, version: int, complete: bool):
+        self.messages: Deque[Message] = deque(messages, maxlen=max_messages)
+        self.version = version
+        # Whether these are all of the conversation's messages
+        self.complete = complete
+        self.checked_at = time.monotonic()
+
+
+class CacheFill:
+    """
+    Token for loading a conversation into the cache.
+
+    Taken before reading MongoDB; the cache only accepts the result if nothing
+    changed the conversation in the meantime.
+    """
+
+    __slots__ = ("valid",)
+
+    def __init__(self):
+        self.valid = True
+
+
+class ConversationCache:
+    """
+    Read-through cache of recent conversation history.
+
+    Holds the last `max_messages` messages of the most recently used
+    conversations, loaded from MongoDB on a miss. Messages saved by this
+    process are appended as they're saved, so the cache stays consistent with
+    its own writes.
+
+    Other processes' writes are detected with a per-conversation version
+    counter in MongoDB, bumped after every persisted write: an entry remembers
+    the version it reflects, and is revalidated against MongoDB at most every
+    `version_check_seconds` (0 checks on every read). When our own bump
+    doesn't land exactly one above the cached version, someone else wrote in
+    between and the entry is dropped.
+    """
+
+    def __init__(
+        self,
+        max_conversations: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        version_check_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_conversations: Max cached conversations (least recently used are evicted)
+            max_messages: Messages cached per conversation; larger loads bypass the cache
+            version_check_seconds: Min interval between version checks of an entry
+        """
+        self.max_conversations = max_conversations or settings.MEMORY_CACHE_MAX_CONVERSATIONS
+        self.max_messages = max_messages or settings.MEMORY_CACHE_MAX_MESSAGES
+        self.version_check_seconds = (
+            settings.MEMORY_CACHE_VERSION_CHECK_SECONDS if version_check_seconds is None else version_check_seconds
+        )
+
+        # Least recently used first
+        self._entries: "OrderedDict[str, _CachedConversation]" = OrderedDict()
+        self._fills: Dict[str, List[CacheFill]] = {}
+        self._requests: Dict[str, int] = {"hit": 0, "miss": 0, "stale": 0, "bypass": 0}
+        self._invalidations: Dict[str, int] = {}
+
+    def get(self, conversation_id: str, limit: int) -> Optional[List[Message]]:
+        """
+        Cached recent messages, if the entry can serve `limit` of them.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+            limit: Number of messages wanted
+
+        Returns:
+            Up to `limit` most recent messages (oldest first), or None
+        """
+        entry = self._entries.get(conversation_id)
+        if entry is None or (len(entry.messages) < limit and not entry.complete):
+            return None
+        self._entries.move_to_end(conversation_id)
+        messages = list(entry.messages)
+        return messages[-limit:] if limit > 0 else messages
+
+    def needs_version_check(self, conversation_id: str) -> bool:
+        """Whether the entry is due to be revalidated against MongoDB."""
+        entry = self._entries.get(conversation_id)
+        return entry is not None and time.monotonic() - entry.checked_at >= self.version_check_seconds
+
+    def validate(self, conversation_id: str, version: int) -> bool:
+        """
+        Check an entry against the conversation's current MongoDB version.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+            version: Version read from MongoDB
+
+        Returns:
+            Whether the entry is still current (it's dropped if not)
+        """
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return False
+        if version != entry.version:
+            self.invalidate(conversation_id, "remote_write")
+            return False
+        entry.checked_at = time.monotonic()
+        return True
+
+    def begin_fill(self, conversation_id: str) -> CacheFill:
+        """Start loading a conversation; pass the token to put()."""
+        fill = CacheFill()
+        self._fills.setdefault(conversation_id, []).append(fill)
+        return fill
+
+    def put(
+        self,
+        conversation_id: str,
+        fill: CacheFill,
+        messages: List[Message],
+        version: int,
+        complete: bool
+    ) -> None:
+        """
+        Store messages loaded from MongoDB.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+            fill: Token from begin_fill(), taken before the version was read
+            messages: Most recent messages, oldest first
+            version: Conversation version read before the messages
+            complete: Whether these are all of the conversation's messages
+        """
+        self.end_fill(conversation_id, fill)
+        if not fill.valid:
+            # Changed while loading; the next read loads it again
+            return
+
+        self._entries[conversation_id] = _CachedConversation(messages, self.max_messages, version, complete)
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_conversations:
+            self.invalidate(next(iter(self._entries)), "lru")
+        metrics.set_gauge("memory_cache_conversations", len(self._entries))
+
+    def end_fill(self, conversation_id: str, fill: CacheFill) -> None:
+        """Release a fill token (put() does this; call it when the load failed)."""
+        fills = self._fills.get(conversation_id)
+        if fills and fill in fills:
+            fills.remove(fill)
+            if not fills:
+                del self._fills[conversation_id]
+
+    def append(self, conversation_id: str, message: Message) -> None:
+        """Add a message saved by this process."""
+        self._changed(conversation_id)
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        if len(entry.messages) == entry.messages.maxlen:
+            entry.complete = False
+        entry.messages.append(message)
+
+    def confirm_version(self, conversation_id: str, version: int) -> None:
+        """
+        Record the version our own write bumped a conversation to.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+            version: Version returned by the increment
+        """
+        self._changed(conversation_id)
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        if version == entry.version + 1:
+            entry.version = version
+        else:
+            # Another process wrote since the entry was loaded
+            self.invalidate(conversation_id, "remote_write")
+
+    def invalidate(self, conversation_id: str, reason: str = "explicit") -> None:
+        """
+        Drop a conversation from the cache.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+            reason: Label for the invalidation metrics
+        """
+        self._changed(conversation_id)
+        if self._entries.pop(conversation_id, None) is None:
+            return
+        self._invalidations[reason] = self._invalidations.get(reason, 0) + 1
+        metrics.inc("memory_cache_invalidations_total", reason=reason)
+        metrics.set_gauge("memory_cache_conversations", len(self._entries))
+        logger.debug(f"Invalidated cached history of conversation {conversation_id} ({reason})")
+
+    def clear(self) -> None:
+        """Drop every cached conversation."""
+        for conversation_id in list(self._entries):
+            self.invalidate(conversation_id, "reset")
+
+    def record(self, result: str) -> None:
+        """
+        Count a history read.
+
+        Args:
+            result: "hit", "miss", "stale" (entry failed its version check) or
+                "bypass" (more messages asked for than are cached)
+        """
+        self._requests[result] += 1
+        metrics.inc("memory_cache_requests_total", result=result)
+        metrics.set_gauge("memory_cache_hit_ratio", self.hit_rate)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of history reads served from the cache."""
+        total = sum(self._requests.values())
+        return self._requests["hit"] / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy, hit rate and invalidation counts."""
+        return {
+            "conversations": len(self._entries),
+            "max_conversations": self.max_conversations,
+            "max_messages_per_conversation": self.max_messages,
+            "version_check_seconds": self.version_check_seconds,
+            "requests": dict(self._requests),
+            "hit_rate": round(self.hit_rate, 4),
+            "invalidations": dict(self._invalidations)
+        }
+
+    def _changed(self, conversation_id: str) -> None:
+        """Make loads of the conversation that are in progress discard their result."""
+        for fill in self._fills.pop(conversation_id, ()):
+            fill.valid = False
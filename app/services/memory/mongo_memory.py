@@ -23,21 +23,26 @@ class MongoMemory(BaseMemory):
 
     def __init__(self,
                  connection_string: str = "mongodb://localhost:27017",
-                 db_name: str = "agent_conversations"):
+                 db_name: str = "agent_conversations",
+                 connect: bool = True):
         """
         Initializes MongoDB connection. 
         
         Args:
             connection_string: MongoDB connection URI
             db_name: Name of the database to use
+            connect: Connect now; otherwise call initialize() before use
         """
         self.connection_string = connection_string
         self.db_name = db_name
         self.client = None
         self.db = None
         self.messages_collection = None
+        self.versions_collection = None
+        self.summaries_collection = None
 
-        self._initialize_connection()
+        if connect:
+            self._initialize_connection()
 
         logger.info(f"Initialized MongoDB memory with db: {db_name}")
 
@@ -50,6 +55,8 @@ class MongoMemory(BaseMemory):
             )
             self.db = self.client[self.db_name]
             self.messages_collection = self.db["messages"]
+            self.versions_collection = self.db["conversation_versions"]
+            self.summaries_collection = self.db["conversation_summaries"]
 
             # Force immediate connection attempt
             self.client.admin.command('ping')
@@ -64,12 +71,21 @@ class MongoMemory(BaseMemory):
         except Exception as e:
             logger.error(f"Error connecting to MongoDB: {str(e)}")
             # Clear these to indiciate failure
+            if self.client is not None:
+                self.client.close()
             self.client = None
             self.db = None
             self.messages_collection = None
+            self.versions_collection = None
+            self.summaries_collection = None
             raise
 
-    def _message_to_doc(self, message: Message, conversation_id: str) -> Dict[str, Any]:
+    async def initialize(self) -> None:
+        """(Re)connect to MongoDB without blocking the event loop."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._initialize_connection)
+
+    def message_to_doc(self, message: Message, conversation_id: str) -> Dict[str, Any]:
         """ Convert a Message to a MongoDB doc."""
         return {
             "role": message.role,
@@ -78,7 +94,7 @@ class MongoMemory(BaseMemory):
             "timestamp": datetime.now()
         }
 
-    def _doc_to_message(self, doc: Dict[str, Any]) -> Message:
+    def doc_to_message(self, doc: Dict[str, Any]) -> Message:
         """ Convert a MongoDB document to a message object."""
         return Message(
             role=doc["role"],
@@ -93,7 +109,7 @@ class MongoMemory(BaseMemory):
             message: The message to save
             conversation_id: Identifier for the conversation
         """
-        doc = self._message_to_doc(message, conversation_id)
+        doc = self.message_to_doc(message, conversation_id)
 
         try:
             # Run MongoDB operations in a thread pool
@@ -107,13 +123,14 @@ class MongoMemory(BaseMemory):
             logger.error(f"Failed to save message to MongoDB: {str(e)}")
             raise
 
-    async def load_messages(self, conversation_id: str = "default", limit: Optional[int] = None) -> List[Message]:
+    async def load_messages(self, conversation_id: str = "default", limit: Optional[int] = None, skip: int = 0) -> List[Message]:
         """
         Load messages from MongoDB.
         
         Args:
             conversation_id: Identifier for the conversation
             limit: Max number of messages to load 
+            skip: Number of oldest messages to skip
             
         Returns:
             List of messages (oldest first)
@@ -131,17 +148,62 @@ class MongoMemory(BaseMemory):
             # Get documents from MongoDB
             docs = await loop.run_in_executor(
                 None,
-                lambda: list(cursor_function().sort("timestamp", pymongo.ASCENDING).limit(limit or 0))
+                lambda: list(cursor_function().sort("timestamp", pymongo.ASCENDING).skip(skip).limit(limit or 0))
             )
 
             # Convert to message 
-            messages = [self._doc_to_message(doc) for doc in docs]
+            messages = [self.doc_to_message(doc) for doc in docs]
             logger.debug(f"Loaded {len(messages)} messages from MongoDB for conversation {conversation_id}")
             return messages
         except Exception as e:
             logger.error(f"Failed to load messages from MongoDB: {str(e)}")
             raise
 
+    async def insert_documents(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Insert message documents in one ordered batch.
+
+        Args:
+            docs: Documents as built by message_to_doc()
+
+        Raises:
+            BulkWriteError: Some documents weren't inserted (see details["nInserted"])
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None,
+            lambda: self.messages_collection.insert_many(docs, ordered=True)
+        )
+
+    async def load_recent_documents(self, conversation_id: str = "default", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Load the most recent message documents of a conversation.
+
+        Args:
+            conversation_id: Identifier for the conversation
+            limit: Max number of documents to load
+
+        Returns:
+            List of documents (oldest first)
+        """
+        loop = asyncio.get_event_loop()
+
+        # First get the most recent messages in reverse order
+        cursor_function = partial(
+            self.messages_collection.find,
+            {"conversation_id": conversation_id}
+        )
+
+        # Get documents from MongoDB (Newest first)
+        docs = await loop.run_in_executor(
+            None,
+            lambda: list(cursor_function().sort("timestamp", pymongo.DESCENDING).limit(limit))
+        )
+
+        # Reverse to get chronologicail order (Oldest first)
+        docs.reverse()
+        return docs
+
     async def load_recent_messages(self, conversation_id: str = "default", limit: int = 10) -> List[Message]:
         """
         Load most recent messages from MongoDB.
@@ -155,26 +217,11 @@ class MongoMemory(BaseMemory):
             List of messages (oldest first)
         """
         try:
-            loop = asyncio.get_event_loop()
-
-            # First get the most recent messages in reverse order
-            cursor_function = partial(
-                self.messages_collection.find,
-                {"conversation_id": conversation_id}
-            )
-
-            # Get documents from MongoDB (Newest first)
-            docs = await loop.run_in_executor(
-                None,
-                lambda: list(cursor_function().sort("timestamp", pymongo.DESCENDING).limit(limit))
-            )
-
-            # Reverse to get chronologicail order (Oldest first)
-            docs.reverse()
+            docs = await self.load_recent_documents(conversation_id, limit)
 
             # Convert to Message objects
 
-            messages = [self._doc_to_message(doc) for doc in docs]
+            messages = [self.doc_to_message(doc) for doc in docs]
             logger.debug(f"Loaded {len(messages)} recent messages from MongoDB for conversation {conversation_id}")
             return messages
         except Exception as e:
@@ -183,7 +230,7 @@ class MongoMemory(BaseMemory):
 
     async def clear_conversation(self, conversation_id: str = "default") -> None:
         """
-        Clear all messages for a conversation.
+        Clear all messages (and the summary) for a conversation.
         
         Args:
             conversation_id: Identifier for the conversation to clear
@@ -194,6 +241,10 @@ class MongoMemory(BaseMemory):
                 None,
                 lambda: self.messages_collection.delete_many({"conversation_id": conversation_id})
             )
+            await loop.run_in_executor(
+                None,
+                lambda: self.summaries_collection.delete_one({"_id": conversation_id})
+            )
             logger.info(f"Cleared {result.deleted_count} messages for conversation {conversation_id}")
         except Exception as e:
             logger.error(f"Failed to clear conversation from MongoDB: {str(e)}")
@@ -221,6 +272,75 @@ class MongoMemory(BaseMemory):
             logger.error(f"Failed to delete message from MongoDB: {str(e)}")
             raise
 
+    async def get_conversation_version(self, conversation_id: str = "default") -> int:
+        """
+        Get a conversation's write version (0 if it was never written).
+
+        Args:
+            conversation_id: Identifier for the conversation
+
+        Returns:
+            The version counter
+        """
+        loop = asyncio.get_event_loop()
+        doc = await loop.run_in_executor(
+            None,
+            lambda: self.versions_collection.find_one({"_id": conversation_id})
+        )
+        return doc["version"] if doc else 0
+
+    async def increment_conversation_version(self, conversation_id: str = "default") -> int:
+        """
+        Bump a conversation's write version after changing its messages.
+
+        Args:
+            conversation_id: Identifier for the conversation
+
+        Returns:
+            The new version
+        """
+        loop = asyncio.get_event_loop()
+        doc = await loop.run_in_executor(
+            None,
+            lambda: self.versions_collection.find_one_and_update(
+                {"_id": conversation_id},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                return_document=pymongo.ReturnDocument.AFTER
+            )
+        )
+        return doc["version"]
+
+    async def load_summary(self, conversation_id: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Load a conversation's rolling summary.
+
+        Args:
+            conversation_id: Identifier for the conversation
+
+        Returns:
+            The summary document, or None if there is none
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.summaries_collection.find_one({"_id": conversation_id})
+        )
+
+    async def save_summary(self, conversation_id: str, summary: Dict[str, Any]) -> None:
+        """
+        Store a conversation's rolling summary, replacing the previous one.
+
+        Args:
+            conversation_id: Identifier for the conversation
+            summary: Summary document (without _id)
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None,
+            lambda: self.summaries_collection.replace_one({"_id": conversation_id}, summary, upsert=True)
+        )
+
     async def get_all_conversation_ids(self) -> List[str]:
         """
         Get all available conversation IDs.
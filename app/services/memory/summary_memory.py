@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.models.schemas import Message
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new messages into the existing summary. Keep facts, names, numbers, decisions, "
+    "preferences and open questions; leave out greetings and filler. "
+    "Reply with the updated summary only, in at most {words} words."
+)
+
+
+def _fingerprint(messages: List[Message]) -> str:
+    """Identity of a run of messages, to find it again in loaded history."""
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(f"{message.role.lower()}\0{message.content}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ConversationSummary:
+    """
+    A rolling summary and how much of the conversation it covers.
+
+    The high-water mark is the number of messages (oldest first) folded into
+    the summary. The boundary fingerprint identifies the last folded messages,
+    so the turns after the summary can be found in the recent history loaded
+    for a request.
+    """
+
+    # Messages in the boundary fingerprint
+    BOUNDARY_MESSAGES = 2
+
+    __slots__ = ("text", "high_water_mark", "boundary", "updated_at")
+
+    def __init__(self, text: str, high_water_mark: int, boundary: str, updated_at: Optional[datetime] = None):
+        self.text = text
+        self.high_water_mark = high_water_mark
+        self.boundary = boundary
+        self.updated_at = updated_at or datetime.now()
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "ConversationSummary":
+        return cls(doc["summary"], doc["high_water_mark"], doc["boundary"], doc.get("updated_at"))
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "summary": self.text,
+            "high_water_mark": self.high_water_mark,
+            "boundary": self.boundary,
+            "updated_at": self.updated_at
+        }
+
+    def unsummarized(self, history: List[Message]) -> List[Message]:
+        """
+        The part of recent history that comes after the summary.
+
+        Args:
+            history: Most recent messages, oldest first
+
+        Returns:
+            The messages after the last summarized one; all of history if the
+            boundary isn't in it (the summary is further behind)
+        """
+        size = self.BOUNDARY_MESSAGES
+        for end in range(len(history), 0, -1):
+            start = max(0, end - size)
+            if _fingerprint(history[start:end]) == self.boundary:
+                return history[end:]
+        return history
+
+
+class SummaryMemory:
+    """
+    Rolling conversation summaries, computed off the request path.
+
+    After a turn is saved, its conversation is queued (notify() never
+    blocks). A single background worker waits until the generation scheduler
+    is idle, then folds the conversation's older messages into its summary
+    with a small model, at batch priority. The newest `keep_recent` messages
+    are left as they are; a fold happens once `fold_batch` more messages than
+    that have accumulated, so the summary is updated in steps rather than on
+    every turn.
+
+    The summary and its high-water mark are stored next to the messages in
+    MongoDB; without MongoDB there are no summaries, since the bounded buffer
+    memory can't tell which messages were already folded.
+    """
+
+    def __init__(
+        self,
+        memory_service,
+        model_service,
+        model: Optional[str] = None,
+        keep_recent: Optional[int] = None,
+        fold_batch: Optional[int] = None,
+        max_fold: Optional[int] = None,
+        max_words: Optional[int] = None,
+        idle_poll_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the summarizer. The worker starts with the first notify().
+
+        Args:
+            memory_service: MemoryService holding messages and summaries
+            model_service: ModelService used to generate summaries
+            model: Model used for summarization
+            keep_recent: Newest messages that are never folded
+            fold_batch: Unsummarized messages beyond keep_recent that trigger a fold
+            max_fold: Max messages folded per generation
+            max_words: Target summary length
+            idle_poll_seconds: How often to check whether the models are idle
+        """
+        self.memory_service = memory_service
+        self.model_service = model_service
+        self.model = model or settings.SUMMARY_MODEL
+        self.keep_recent = keep_recent or settings.SUMMARY_KEEP_RECENT_MESSAGES
+        self.fold_batch = fold_batch or settings.SUMMARY_FOLD_BATCH_MESSAGES
+        self.max_fold = max_fold or settings.SUMMARY_MAX_FOLD_MESSAGES
+        self.max_words = max_words or settings.SUMMARY_MAX_WORDS
+        self.idle_poll_seconds = idle_poll_seconds or settings.SUMMARY_IDLE_POLL_SECONDS
+
+        # Conversations waiting to be summarized, oldest notification first
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self, conversation_id: str) -> None:
+        """Queue a conversation for summarization after a turn was saved."""
+        self._pending[conversation_id] = None
+        metrics.set_gauge("summary_backlog", len(self._pending))
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def load(self, conversation_id: str) -> Optional[ConversationSummary]:
+        """
+        The conversation's current summary, if it has one.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+
+        Returns:
+            The summary, or None
+        """
+        doc = await self.memory_service.get_summary(conversation_id)
+        return ConversationSummary.from_doc(doc) if doc else None
+
+    async def close(self) -> None:
+        """Stop the worker; queued conversations are summarized after their next turn."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def summarize(self, conversation_id: str) -> Optional[ConversationSummary]:
+        """
+        Fold the conversation's older messages into its summary, if enough have accumulated.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+
+        Returns:
+            The updated summary, or None if nothing was folded
+        """
+        summary = await self.load(conversation_id)
+        high_water_mark = summary.high_water_mark if summary else 0
+
+        messages = await self.memory_service.load_persisted_messages(conversation_id, skip=high_water_mark)
+        if messages is None or len(messages) < self.keep_recent + self.fold_batch:
+            return None
+
+        updated = None
+        foldable = messages[:-self.keep_recent]
+        while foldable:
+            batch, foldable = foldable[:self.max_fold], foldable[self.max_fold:]
+            started = time.perf_counter()
+            text = await self._fold(summary.text if summary else None, batch)
+            high_water_mark += len(batch)
+            summary = ConversationSummary(
+                text,
+                high_water_mark,
+                _fingerprint(batch[-ConversationSummary.BOUNDARY_MESSAGES:])
+            )
+            await self.memory_service.save_summary(conversation_id, summary.to_doc())
+            updated = summary
+
+            metrics.observe("summary_seconds", time.perf_counter() - started, model=self.model)
+            metrics.inc("summary_messages_folded_total", len(batch))
+            logger.info(
+                f"Folded {len(batch)} messages into the summary of conversation {conversation_id} "
+                f"(high-water mark {high_water_mark})"
+            )
+            if foldable:
+                await self._wait_until_idle()
+        return updated
+
+    async def _run(self) -> None:
+        """Worker loop: summarize queued conversations while the models are idle."""
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            await self._wait_until_idle()
+            conversation_id, _ = self._pending.popitem(last=False)
+            metrics.set_gauge("summary_backlog", len(self._pending))
+            try:
+                updated = await self.summarize(conversation_id)
+                metrics.inc("summary_runs_total", result="folded" if updated else "skipped")
+            except Exception as e:
+                metrics.inc("summary_runs_total", result="error")
+                logger.error(f"Failed to summarize conversation {conversation_id}: {str(e)}")
+
+    async def _wait_until_idle(self) -> None:
+        """Wait until no generation is running or queued, so summaries never delay requests."""
+        scheduler = self.model_service.scheduler
+        while scheduler.in_flight_total or scheduler.queued:
+            await asyncio.sleep(self.idle_poll_seconds)
+
+    async def _fold(self, summary: Optional[str], messages: List[Message]) -> str:
+        """Generate the summary of the previous summary plus the given messages."""
+        transcript = "\n".join(f"{message.role}: {message.content}" for message in messages)
+        response = await self.model_service.generate(
+            messages=[
+                Message(role="system", content=SUMMARY_SYSTEM_PROMPT.format(words=self.max_words)),
+                Message(
+                    role="user",
+                    content=f"Existing summary:\n{summary or '(none yet)'}\n\nNew messages:\n{transcript}"
+                )
+            ],
+            model=self.model,
+            temperature=settings.SUMMARY_TEMPERATURE,
+            max_tokens=settings.SUMMARY_MAX_TOKENS,
+            use_cache=False,
+            priority="batch"
+        )
+        return response["content"].strip()
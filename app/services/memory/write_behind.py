@@ -0,0 +1,319 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.models.schemas import Message
+from app.config import settings
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# MongoDB duplicate key error
+_DUPLICATE_KEY = 11000
+
+
+class _PendingWrite:
+    """A message document waiting to be persisted."""
+
+    __slots__ = ("seq", "conversation_id", "doc", "enqueued_at", "discarded", "rejected")
+
+    def __init__(self, seq: int, conversation_id: str, doc: Dict[str, Any]):
+        self.seq = seq
+        self.conversation_id = conversation_id
+        self.doc = doc
+        self.enqueued_at = time.perf_counter()
+        # Set when the conversation is cleared before the write went through
+        self.discarded = False
+        # Set when MongoDB refused the document itself (e.g. failed validation)
+        self.rejected = False
+
+
+class WriteBehindQueue:
+    """
+    Persists messages to MongoDB in the background, in batches.
+
+    Saves return as soon as the message is queued. A single flusher task takes
+    up to `batch_size` queued messages at a time, in order, and writes them
+    with one ordered insert_many; the next batch only starts once the current
+    one is persisted (or given up on), so messages of a conversation reach
+    MongoDB in the order they were saved.
+
+    Documents get their _id and timestamp when queued, which makes retries
+    idempotent (already inserted documents fail with a duplicate key and are
+    skipped) and lets readers merge not-yet-persisted messages into MongoDB
+    results without duplicates.
+
+    The queue is bounded: when it's full, saves wait for the flusher. With a
+    circuit breaker, writes go through it; while MongoDB is down the current
+    batch is held (not retried or dropped) until the circuit closes, and a
+    full queue drops its oldest messages instead of blocking saves.
+
+    A document MongoDB refuses (a write error other than a duplicate key, such
+    as failed validation) is logged and skipped, and the rest of the batch is
+    written; only connection and other errors are retried with backoff, so a
+    bad message can't get the messages behind it dropped.
+
+    `on_written` is awaited after each batch with the batch's conversation IDs
+    and whether it was persisted (False when it was dropped), before its
+    messages stop being reported as pending. Conversations with a skipped
+    document are reported again as not persisted.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        linger_ms: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_base_delay: Optional[float] = None,
+        retry_max_delay: Optional[float] = None,
+        on_written: Optional[Callable[[List[str], bool], Awaitable[None]]] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Initialize the queue. The flusher starts with the first save.
+
+        Args:
+            backend: Memory backend with message_to_doc() and insert_documents()
+            max_size: Max queued messages before saves wait
+            batch_size: Max messages per insert_many
+            linger_ms: How long the flusher waits for a batch to fill up
+            max_retries: Attempts per batch before it's dropped
+            retry_base_delay: First retry delay in seconds, doubled per attempt
+            retry_max_delay: Cap on the retry delay in seconds
+            on_written: Called with (conversation IDs, persisted) after each batch
+            breaker: Circuit breaker guarding the backend
+        """
+        self.backend = backend
+        self.max_size = max_size or settings.MEMORY_WRITE_BEHIND_MAX_QUEUE
+        self.batch_size = batch_size or settings.MEMORY_WRITE_BEHIND_BATCH_SIZE
+        self.linger = (settings.MEMORY_WRITE_BEHIND_LINGER_MS if linger_ms is None else linger_ms) / 1000
+        self.max_retries = max_retries or settings.MEMORY_WRITE_BEHIND_MAX_RETRIES
+        self.retry_base_delay = retry_base_delay or settings.MEMORY_WRITE_BEHIND_RETRY_BASE_DELAY
+        self.retry_max_delay = retry_max_delay or settings.MEMORY_WRITE_BEHIND_RETRY_MAX_DELAY
+        self.on_written = on_written
+        self.breaker = breaker
+
+        self._queue: Deque[_PendingWrite] = deque()
+        # Batch currently being written
+        self._writing: List[_PendingWrite] = []
+        self._changed = asyncio.Condition()
+        self._enqueued_seq = 0
+        # Every write up to this sequence number is persisted or dropped
+        self._done_seq = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        """Messages not yet persisted (queued or being written)."""
+        return len(self._queue) + len(self._writing)
+
+    async def enqueue(self, message: Message, conversation_id: str = "default") -> None:
+        """
+        Queue a message for persistence.
+
+        Args:
+            message: The message to save
+            conversation_id: Unique ID for the conversation
+        """
+        self._ensure_started()
+        doc = self.backend.message_to_doc(message, conversation_id)
+        doc["_id"] = ObjectId()
+
+        async with self._changed:
+            if len(self._queue) >= self.max_size:
+                metrics.inc("memory_write_behind_full_total")
+                if self.breaker is not None and not self.breaker.is_closed:
+                    # MongoDB is down: the flusher won't make room any time soon
+                    dropped = self._queue.popleft()
+                    metrics.inc("memory_write_behind_dropped_total")
+                    logger.warning(f"Write-behind queue full ({self.max_size}) while MongoDB is down, dropping the oldest message")
+                    if self.on_written is not None:
+                        await self._notify([dropped], False)
+                else:
+                    logger.warning(f"Write-behind queue full ({self.max_size}), waiting for the flusher")
+                    await self._changed.wait_for(lambda: len(self._queue) < self.max_size)
+
+            self._enqueued_seq += 1
+            self._queue.append(_PendingWrite(self._enqueued_seq, conversation_id, doc))
+            metrics.set_gauge("memory_write_behind_queue_depth", self.depth)
+            self._changed.notify_all()
+
+    def pending(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Documents of a conversation that may not be in MongoDB yet, oldest first."""
+        return [
+            write.doc
+            for write in (*self._writing, *self._queue)
+            if write.conversation_id == conversation_id
+        ]
+
+    def discard(self, conversation_id: str) -> None:
+        """Drop a conversation's messages that aren't persisted yet (it was cleared)."""
+        for write in (*self._writing, *self._queue):
+            if write.conversation_id == conversation_id:
+                write.discarded = True
+        self._queue = deque(write for write in self._queue if not write.discarded)
+        metrics.set_gauge("memory_write_behind_queue_depth", self.depth)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything queued so far is persisted (or dropped).
+
+        Args:
+            timeout: Max seconds to wait (None waits indefinitely)
+
+        Returns:
+            Whether the queue caught up in time
+        """
+        target = self._enqueued_seq
+        if self._done_seq >= target:
+            return True
+        self._ensure_started()
+
+        async def caught_up():
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._done_seq >= target)
+
+        try:
+            await asyncio.wait_for(caught_up(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Drain the queue and stop the flusher.
+
+        Args:
+            timeout: Max seconds to drain (defaults to settings.MEMORY_WRITE_BEHIND_DRAIN_TIMEOUT)
+        """
+        timeout = settings.MEMORY_WRITE_BEHIND_DRAIN_TIMEOUT if timeout is None else timeout
+        if not await self.flush(timeout):
+            logger.error(f"Write-behind queue not drained in {timeout}s, {self.depth} messages were not persisted")
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _ensure_started(self) -> None:
+        """Start the flusher on first use (needs a running event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        """Flusher loop: write batches in queue order."""
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: bool(self._queue))
+
+            if self.linger and len(self._queue) < self.batch_size:
+                # Give concurrent saves a moment to join the batch
+                await asyncio.sleep(self.linger)
+
+            async with self._changed:
+                count = min(self.batch_size, len(self._queue))
+                self._writing = [self._queue.popleft() for _ in range(count)]
+                # Saves waiting on a full queue can go ahead
+                self._changed.notify_all()
+
+            try:
+                persisted = await self._write(self._writing)
+                if self.on_written is not None:
+                    await self._notify(self._writing, persisted)
+                    rejected = [write for write in self._writing if write.rejected]
+                    if rejected:
+                        await self._notify(rejected, False)
+            finally:
+                async with self._changed:
+                    self._done_seq = self._writing[-1].seq
+                    self._writing = []
+                    metrics.set_gauge("memory_write_behind_queue_depth", self.depth)
+                    self._changed.notify_all()
+
+    async def _notify(self, batch: List[_PendingWrite], persisted: bool) -> None:
+        """Report a written (or dropped) batch to on_written."""
+        conversation_ids = list(dict.fromkeys(write.conversation_id for write in batch))
+        try:
+            await self.on_written(conversation_ids, persisted)
+        except Exception as e:
+            logger.error(f"Write-behind batch callback failed: {str(e)}")
+
+    async def _write(self, batch: List[_PendingWrite]) -> bool:
+        """Insert a batch, retrying the rest of it with backoff on failure; False if it was dropped."""
+        remaining = batch
+        attempt = 0
+        while remaining:
+            remaining = [write for write in remaining if not write.discarded]
+            if not remaining:
+                break
+            try:
+                await self._insert([write.doc for write in remaining])
+                remaining = []
+            except BulkWriteError as e:
+                inserted = e.details.get("nInserted", 0)
+                errors = e.details.get("writeErrors", [])
+                if errors and errors[0].get("code") == _DUPLICATE_KEY:
+                    # Written by an attempt whose result we didn't see; skip it
+                    remaining = remaining[inserted + 1:]
+                    continue
+                if errors:
+                    # MongoDB refused this document; retrying can't help
+                    rejected = remaining[inserted]
+                    rejected.rejected = True
+                    metrics.inc("memory_write_behind_rejected_total")
+                    logger.error(
+                        f"MongoDB rejected a message for conversation {rejected.conversation_id}, "
+                        f"skipping it: {errors[0].get('errmsg', str(e))}"
+                    )
+                    remaining = remaining[inserted + 1:]
+                    continue
+                remaining = remaining[inserted:]
+                attempt += 1
+                if not await self._backoff(attempt, remaining, e):
+                    return False
+            except Exception as e:
+                if self.breaker is not None and not self.breaker.is_closed:
+                    # MongoDB is down: hold the batch until it's back
+                    await self.breaker.wait_closed()
+                    continue
+                attempt += 1
+                if not await self._backoff(attempt, remaining, e):
+                    return False
+
+        now = time.perf_counter()
+        for write in batch:
+            metrics.observe("memory_write_behind_lag_seconds", now - write.enqueued_at)
+        metrics.inc("memory_write_behind_batches_total")
+        metrics.observe("memory_write_behind_batch_size", len(batch), buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+        logger.debug(f"Persisted {len(batch)} messages to MongoDB")
+        return True
+
+    async def _insert(self, docs: List[Dict[str, Any]]) -> None:
+        if self.breaker is not None:
+            await self.breaker.call(self.backend.insert_documents, docs)
+        else:
+            await self.backend.insert_documents(docs)
+
+    async def _backoff(self, attempt: int, remaining: List[_PendingWrite], error: Exception) -> bool:
+        """Sleep before the next attempt; False once the batch should be given up."""
+        if attempt >= self.max_retries:
+            metrics.inc("memory_write_behind_dropped_total", len(remaining))
+            logger.error(f"Dropping {len(remaining)} messages after {attempt} failed MongoDB writes: {str(error)}")
+            return False
+
+        delay = min(self.retry_base_delay * 2 ** (attempt - 1), self.retry_max_delay)
+        metrics.inc("memory_write_behind_retries_total")
+        logger.warning(f"MongoDB write failed (attempt {attempt}), retrying in {delay:.1f}s: {str(error)}")
+        await asyncio.sleep(delay)
+        return True
@@ -1,8 +1,18 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Deque, Tuple
+from pymongo.errors import ConnectionFailure
 from app.models.schemas import Message
 from app.services.memory.mongo_memory import MongoMemory
-from app.services.memory.buffer_memory import ConversationBufferMemoryWrapper
+from app.services.memory.async_mongo_memory import AsyncMongoMemory
+from app.services.memory.buffer_memory import BoundedBufferMemory
+from app.services.memory.write_behind import WriteBehindQueue
+from app.services.memory.conversation_cache import ConversationCache
+from app.config import settings
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
 
 logger = get_logger(__name__)
 
@@ -15,7 +25,13 @@ class MemoryService:
     """
 
 
-    def __init__(self, use_mongo: bool = True, connection_string: str = "mongodb://localhost:27017/"):
+    def __init__(
+            self,
+            use_mongo: bool = True,
+            connection_string: str = "mongodb://localhost:27017/",
+            mongo_backend: Optional[str] = None,
+            mongo_client: Optional[Any] = None
+    ):
         """
         Initialize memory service with short and long term storage
 
@@ -23,22 +39,111 @@ class MemoryService:
         Args:
             use_mongo: Flag to use MongoDB for long-term memory
             connection_string: MongoDB connection string
+            mongo_backend: "async" or "sync" (defaults to settings.MEMORY_MONGO_BACKEND)
+            mongo_client: Client for the async backend, e.g. an in-process stand-in
         """
         # Initialize buffer memory (always used)
-        self.buffer_memory = ConversationBufferMemoryWrapper()
+        self.buffer_memory = BoundedBufferMemory()
 
         self.use_mongo = use_mongo
         self.mongo_memory = None
 
         if use_mongo:
             try:
-                self.mongo_memory = MongoMemory(connection_string=connection_string)
+                if (mongo_backend or settings.MEMORY_MONGO_BACKEND) == "async":
+                    # Connects in start()
+                    self.mongo_memory = AsyncMongoMemory(connection_string=connection_string, client=mongo_client)
+                else:
+                    # With the circuit breaker, connects in start() so it can recover if MongoDB is down
+                    self.mongo_memory = MongoMemory(
+                        connection_string=connection_string,
+                        connect=not settings.MEMORY_BREAKER_ENABLED
+                    )
                 logger.info("Initialized MongoDB memory")
             except Exception as e:
                 logger.error(f"Failed to initialize MongoDB memory: {str(e)}")
                 logger.warning("Falling back to buffer memory only")
                 self.use_mongo = False
 
+        # Fail fast while MongoDB is down and reconnect in the background
+        self.breaker = None
+        if self.mongo_memory and settings.MEMORY_BREAKER_ENABLED:
+            self.breaker = CircuitBreaker(
+                "mongodb",
+                probe=self.mongo_memory.initialize,
+                failure_threshold=settings.MEMORY_BREAKER_FAILURE_THRESHOLD,
+                failure_types=(ConnectionFailure,),
+                probe_base_delay=settings.MEMORY_BREAKER_PROBE_BASE_DELAY,
+                probe_max_delay=settings.MEMORY_BREAKER_PROBE_MAX_DELAY,
+                on_close=self._on_reconnect
+            )
+        # Written to MongoDB once it's back: direct saves that failed, and clears
+        self._unsaved: Deque[Tuple[Message, str]] = deque(maxlen=settings.MEMORY_WRITE_BEHIND_MAX_QUEUE)
+        self._uncleared: List[str] = []
+        # Replays _unsaved after a reconnect, or after a replay was cut short
+        self._replay_task: Optional[asyncio.Task] = None
+        self._replaying = False
+
+        # Rolling summaries read on the request path: conversation -> (summary document or None, loaded at)
+        self._summaries: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+
+        # Recent history is served from process memory, revalidated with MongoDB version counters
+        self.cache = None
+        if self.mongo_memory and settings.MEMORY_CACHE_ENABLED:
+            self.cache = ConversationCache()
+
+        # MongoDB writes happen in the background, in batches
+        self.write_queue = None
+        if self.mongo_memory and settings.MEMORY_WRITE_BEHIND_ENABLED:
+            self.write_queue = WriteBehindQueue(
+                self.mongo_memory,
+                on_written=self._on_written if self.cache is not None else None,
+                breaker=self.breaker
+            )
+
+    async def start(self) -> None:
+        """
+        Connect the MongoDB backend.
+
+        If MongoDB is unavailable, buffer memory is used until the circuit
+        breaker reconnects (or for good, without the breaker).
+        """
+        if not isinstance(self.mongo_memory, AsyncMongoMemory) and self.breaker is None:
+            # Already connected in __init__
+            return
+        try:
+            await self.mongo_memory.initialize()
+        except Exception as e:
+            logger.error(f"Failed to initialize MongoDB memory: {str(e)}")
+            if self.breaker is not None:
+                logger.warning("Using buffer memory until MongoDB is reachable")
+                self.breaker.trip(e)
+                return
+            logger.warning("Falling back to buffer memory only")
+            await self.mongo_memory.close()
+            self.use_mongo = False
+            self.mongo_memory = None
+            self.write_queue = None
+            self.cache = None
+
+    async def close(self) -> None:
+        """Persist queued messages and close the MongoDB connections before shutdown."""
+        mongo_down = self.breaker is not None and not self.breaker.is_closed
+        if self.breaker is not None:
+            await self.breaker.stop()
+        if self._replay_task is not None and not self._replay_task.done():
+            await self._replay_task
+        if self.write_queue is not None:
+            # No point waiting for a queue that can't drain
+            await self.write_queue.close(timeout=0 if mongo_down else None)
+        if self._unsaved or self._uncleared:
+            logger.error(
+                f"MongoDB unavailable at shutdown, {len(self._unsaved)} messages and "
+                f"{len(self._uncleared)} clears were not applied"
+            )
+        if isinstance(self.mongo_memory, AsyncMongoMemory):
+            await self.mongo_memory.close()
+
     async def save_message(self, message: Message, conversation_id: str = "default") -> None:
         """
         Save a message to both short and long term memory
@@ -54,10 +159,31 @@ class MemoryService:
         # Save to MongoDB if enabled
 
         if self.use_mongo and self.mongo_memory:
+            if self.cache is not None:
+                self.cache.append(conversation_id, message)
             try:
-                await self.mongo_memory.save_message(message, conversation_id)
+                if self.write_queue is not None:
+                    await self.write_queue.enqueue(message, conversation_id)
+                elif self._unsaved:
+                    # Earlier messages still waiting for MongoDB; keep the order
+                    self._unsaved.append((message, conversation_id))
+                    if not self._replaying and (self.breaker is None or self.breaker.is_closed):
+                        # A replay was cut short; nothing else would ever drain the queue
+                        self._replaying = True
+                        self._replay_task = asyncio.ensure_future(self._replay_in_background())
+                else:
+                    await self._mongo(self.mongo_memory.save_message, message, conversation_id)
+                    if self.cache is not None:
+                        await self._on_written([conversation_id], True)
             except Exception as e:
-                logger.error(f"Failed to save message to MongoDB: {str(e)}")
+                if self.breaker is not None and not self.breaker.is_closed:
+                    # Saved once MongoDB is back
+                    self._unsaved.append((message, conversation_id))
+                    logger.debug(f"MongoDB unavailable, message for conversation {conversation_id} will be saved later")
+                else:
+                    logger.error(f"Failed to save message to MongoDB: {str(e)}")
+                if self.cache is not None:
+                    self.cache.invalidate(conversation_id, "write_failed")
 
     
     async def load_recent_messages(self, conversation_id: str = "default", limit: int = 20) -> List[Message]:
@@ -73,13 +199,82 @@ class MemoryService:
         """
         if self.use_mongo and self.mongo_memory:
             try:
-                return await self.mongo_memory.load_recent_messages(conversation_id, limit)
+                if self.cache is not None:
+                    return await self._load_recent_cached(conversation_id, limit)
+                return await self._load_recent_from_mongo(conversation_id, limit)
+            except CircuitOpenError:
+                logger.debug("MongoDB unavailable, loading from buffer memory")
             except Exception as e:
                 logger.error(f"Failed to load messages from MongoDB: {str(e)}")
                 logger.warning("falling back to buffer memory")
 
         # Fall back to buffer memory
         return await self.buffer_memory.load_messages(conversation_id, limit)
+
+    async def _load_recent_cached(self, conversation_id: str, limit: int) -> List[Message]:
+        """Serve recent messages from the cache, loading the conversation from MongoDB on a miss."""
+        if limit > self.cache.max_messages:
+            self.cache.record("bypass")
+            return await self._load_recent_from_mongo(conversation_id, limit)
+
+        if self.cache.get(conversation_id, limit) is not None:
+            if self.cache.needs_version_check(conversation_id):
+                version = await self._mongo(self.mongo_memory.get_conversation_version, conversation_id)
+                self.cache.validate(conversation_id, version)
+            # Read again: our own saves may have been appended during the check
+            messages = self.cache.get(conversation_id, limit)
+            if messages is not None:
+                self.cache.record("hit")
+                return messages
+            self.cache.record("stale")
+        else:
+            self.cache.record("miss")
+
+        fill = self.cache.begin_fill(conversation_id)
+        try:
+            # Version first: writes that land during the load make the entry look stale, not current
+            version = await self._mongo(self.mongo_memory.get_conversation_version, conversation_id)
+            messages = await self._load_recent_from_mongo(conversation_id, self.cache.max_messages)
+        except Exception:
+            self.cache.end_fill(conversation_id, fill)
+            raise
+        self.cache.put(
+            conversation_id, fill, messages, version,
+            complete=len(messages) < self.cache.max_messages
+        )
+        return messages[-limit:]
+
+    async def _load_recent_from_mongo(self, conversation_id: str, limit: int) -> List[Message]:
+        """Recent messages from MongoDB, including those still queued for it."""
+        pending = self.write_queue.pending(conversation_id) if self.write_queue is not None else []
+        if not pending:
+            return await self._mongo(self.mongo_memory.load_recent_messages, conversation_id, limit)
+
+        # Add the messages that are still queued for MongoDB
+        docs = await self._mongo(self.mongo_memory.load_recent_documents, conversation_id, limit)
+        persisted = {doc["_id"] for doc in docs}
+        docs += [doc for doc in pending if doc["_id"] not in persisted]
+        return [self.mongo_memory.doc_to_message(doc) for doc in docs[-limit:]]
+
+    async def _on_written(self, conversation_ids: List[str], persisted: bool) -> None:
+        """
+        Bump the MongoDB versions of conversations whose messages were just persisted.
+
+        Args:
+            conversation_ids: Conversations written to
+            persisted: False if the messages were dropped instead
+        """
+        for conversation_id in conversation_ids:
+            if not persisted:
+                # The cache has messages MongoDB never got
+                self.cache.invalidate(conversation_id, "write_failed")
+                continue
+            try:
+                version = await self._mongo(self.mongo_memory.increment_conversation_version, conversation_id)
+                self.cache.confirm_version(conversation_id, version)
+            except Exception as e:
+                logger.error(f"Failed to update version of conversation {conversation_id}: {str(e)}")
+                self.cache.invalidate(conversation_id, "version_error")
     
     async def load_all_messages(self, conversation_id: str = "default") -> List[Message]:
         """
@@ -95,7 +290,12 @@ class MemoryService:
         """
         if self.use_mongo and self.mongo_memory:
             try:
-                return await self.mongo_memory.load_messages(conversation_id)
+                self._check_available()
+                if self.write_queue is not None:
+                    await self.write_queue.flush()
+                return await self._mongo(self.mongo_memory.load_messages, conversation_id)
+            except CircuitOpenError:
+                logger.debug("MongoDB unavailable, loading from buffer memory")
             except Exception as e:
                 logger.error(f"Failed to load messages from MongoDB: {str(e)}")
                 logger.warning("Falling back to buffer memory")
@@ -115,10 +315,102 @@ class MemoryService:
 
         if self.use_mongo and self.mongo_memory:
             try:
-                await self.mongo_memory.clear_conversation(conversation_id)
+                self._check_available()
+                if self.write_queue is not None:
+                    # Queued messages would otherwise be written after the delete
+                    await self.write_queue.flush()
+                await self._clear_in_mongo(conversation_id)
             except Exception as e:
-                logger.error(f"Failed to clear conversation in MongoDB: {str(e)}")
+                if self.breaker is not None and not self.breaker.is_closed:
+                    # Cleared once MongoDB is back, before the writes queued after this
+                    if self.write_queue is not None:
+                        self.write_queue.discard(conversation_id)
+                    self._unsaved = deque(
+                        (item for item in self._unsaved if item[1] != conversation_id),
+                        maxlen=self._unsaved.maxlen
+                    )
+                    if conversation_id not in self._uncleared:
+                        self._uncleared.append(conversation_id)
+                    logger.warning(f"MongoDB unavailable, conversation {conversation_id} will be cleared there later")
+                else:
+                    logger.error(f"Failed to clear conversation in MongoDB: {str(e)}")
+            if self.cache is not None:
+                self.cache.invalidate(conversation_id, "cleared")
+        self._summaries.pop(conversation_id, None)
+
+
+    async def load_persisted_messages(self, conversation_id: str = "default", skip: int = 0) -> Optional[List[Message]]:
+        """
+        Load a conversation's messages from MongoDB only, without falling back to buffer memory.
+
+        Used where message positions matter (e.g. summarization high-water
+        marks), which the bounded buffer can't provide.
 
+        Args:
+            conversation_id: Unique ID for the conversation
+            skip: Number of oldest messages to skip
+
+        Returns:
+            List of messages (oldest first), or None if MongoDB is unavailable
+        """
+        if not (self.use_mongo and self.mongo_memory):
+            return None
+        try:
+            self._check_available()
+            if self.write_queue is not None:
+                await self.write_queue.flush()
+            return await self._mongo(self.mongo_memory.load_messages, conversation_id, None, skip)
+        except Exception as e:
+            logger.warning(f"Couldn't load messages of conversation {conversation_id} from MongoDB: {str(e)}")
+            return None
+
+    async def get_summary(self, conversation_id: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Get a conversation's rolling summary.
+
+        Summaries are kept in process memory and reloaded from MongoDB after
+        SUMMARY_CACHE_TTL_SECONDS, so other workers' summaries are picked up.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+
+        Returns:
+            The summary document, or None
+        """
+        if not (self.use_mongo and self.mongo_memory):
+            return None
+
+        cached = self._summaries.get(conversation_id)
+        if cached is not None and time.monotonic() - cached[1] < settings.SUMMARY_CACHE_TTL_SECONDS:
+            self._summaries.move_to_end(conversation_id)
+            return cached[0]
+
+        try:
+            summary = await self._mongo(self.mongo_memory.load_summary, conversation_id)
+        except CircuitOpenError:
+            return cached[0] if cached is not None else None
+        except Exception as e:
+            logger.error(f"Failed to load summary from MongoDB: {str(e)}")
+            return cached[0] if cached is not None else None
+        self._remember_summary(conversation_id, summary)
+        return summary
+
+    async def save_summary(self, conversation_id: str, summary: Dict[str, Any]) -> None:
+        """
+        Store a conversation's rolling summary.
+
+        Args:
+            conversation_id: Unique ID for the conversation
+            summary: Summary document (without _id)
+        """
+        await self._mongo(self.mongo_memory.save_summary, conversation_id, summary)
+        self._remember_summary(conversation_id, summary)
+
+    def _remember_summary(self, conversation_id: str, summary: Optional[Dict[str, Any]]) -> None:
+        self._summaries[conversation_id] = (summary, time.monotonic())
+        self._summaries.move_to_end(conversation_id)
+        while len(self._summaries) > settings.MEMORY_CACHE_MAX_CONVERSATIONS:
+            self._summaries.popitem(last=False)
 
     async def get_conversation_ids(self) -> List[str]:
         """
@@ -129,13 +421,107 @@ class MemoryService:
         """
         if self.use_mongo and self.mongo_memory:
             try:
-                return await self.mongo_memory.get_all_conversation_ids()
+                return await self._mongo(self.mongo_memory.get_all_conversation_ids)
+            except CircuitOpenError:
+                logger.debug("MongoDB unavailable, can't list conversations")
             except Exception as e:
                 logger.error(f"Failed to get conversation IDs from MongoDB: {str(e)}")
         
         logger.warning("Cannot retrieve all conversation IDs from MongoDB")
         return []
     
+    async def _mongo(self, func: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Call a MongoDB backend method through the circuit breaker."""
+        if self.breaker is None:
+            return await func(*args)
+        return await self.breaker.call(func, *args)
+
+    def _check_available(self) -> None:
+        """Fail fast before waiting on the write queue, which can't drain while MongoDB is down."""
+        if self.breaker is not None and not self.breaker.is_closed:
+            raise CircuitOpenError("MongoDB is unavailable")
+
+    async def _clear_in_mongo(self, conversation_id: str) -> None:
+        await self._mongo(self.mongo_memory.clear_conversation, conversation_id)
+        if self.cache is not None:
+            # Other processes drop their cached copy on their next version check
+            await self._mongo(self.mongo_memory.increment_conversation_version, conversation_id)
+
+    async def _on_reconnect(self) -> None:
+        """
+        Apply the changes made while MongoDB was down.
+
+        Runs before the write queue resumes, so clears land before the
+        messages saved after them.
+        """
+        while self._uncleared:
+            await self._clear_in_mongo(self._uncleared[0])
+            self._uncleared.pop(0)
+
+        self._replaying = True
+        await self._replay_unsaved()
+
+        if self.cache is not None:
+            # Entries may predate writes by other processes while we couldn't check
+            self.cache.clear()
+
+    async def _replay_in_background(self) -> None:
+        try:
+            await self._replay_unsaved()
+        except Exception as e:
+            logger.error(f"Failed to save queued messages to MongoDB: {str(e)}")
+
+    async def _replay_unsaved(self) -> None:
+        """
+        Save the messages queued while MongoDB was down, in order.
+
+        Stops (keeping the queue) if MongoDB goes away again. A message MongoDB
+        rejects for any other reason is dropped, so it can't block the ones
+        behind it.
+        """
+        replayed = 0
+        dropped = 0
+        try:
+            while self._unsaved:
+                message, conversation_id = self._unsaved[0]
+                try:
+                    await self._mongo(self.mongo_memory.save_message, message, conversation_id)
+                except (ConnectionFailure, CircuitOpenError):
+                    raise
+                except Exception as e:
+                    self._unsaved.popleft()
+                    dropped += 1
+                    metrics.inc("memory_replay_dropped_total")
+                    logger.error(f"Dropped a queued message for conversation {conversation_id}, MongoDB rejected it: {str(e)}")
+                    if self.cache is not None:
+                        self.cache.invalidate(conversation_id, "write_failed")
+                    continue
+                self._unsaved.popleft()
+                replayed += 1
+                if self.cache is not None:
+                    await self._on_written([conversation_id], True)
+        finally:
+            self._replaying = False
+            if replayed or dropped:
+                logger.info(
+                    f"Saved {replayed} messages to MongoDB that were written while it was down"
+                    + (f", dropped {dropped}" if dropped else "")
+                )
+
+    def breaker_state(self) -> Optional[Dict[str, Any]]:
+        """
+        State of the MongoDB circuit breaker.
+
+        Returns:
+            Breaker snapshot plus messages waiting for MongoDB, or None without MongoDB or the breaker
+        """
+        if self.breaker is None:
+            return None
+        state = self.breaker.snapshot()
+        state["pending_writes"] = len(self._unsaved) + (self.write_queue.depth if self.write_queue is not None else 0)
+        state["pending_clears"] = len(self._uncleared)
+        return state
+
     def get_langchain_memory(self, conversation_id: str = "default") -> Any:
         """
         Get the LangChain memory object for use with Langchain Components.
@@ -148,5 +534,23 @@ class MemoryService:
             Langchain-compatible memory object"""
         return self.buffer_memory.get_langchain_memory(conversation_id)
 
+    def buffer_stats(self) -> Dict[str, Any]:
+        """
+        Occupancy and eviction counts of the in-process buffer memory.
+
+        Returns:
+            Dict with conversation/message/byte counts, limits and evictions by reason
+        """
+        return self.buffer_memory.stats()
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Hit rate and occupancy of the recent-history cache.
+
+        Returns:
+            Dict with request counts by result, hit rate and invalidations, or None if disabled
+        """
+        return self.cache.stats() if self.cache is not None else None
+
             
 
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from app.models.schemas import Message
 
 class BaseModelHandler(ABC):
@@ -33,4 +33,41 @@ class BaseModelHandler(ABC):
             - content: The generated text
             - usage: Token usage information (if available)
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def generate_stream(
+        self,
+        messages: List[Message],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a response from the model as incremental chunks.
+        
+        Handlers without native streaming fall back to a single chunk
+        containing the full completion.
+        
+        Args:
+            messages: List of message objects with role and content
+            model: The specific model to use
+            temperature: Controls randomness (0-1)
+            max_tokens: Maximum number of tokens to generate
+            kwargs: Additional model-specific parameters
+            
+        Yields:
+            Dicts with:
+            - content: The next piece of generated text
+            - done: True on the final chunk
+            - usage: Token usage information (final chunk only)
+        """
+        response = await self.generate(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        yield {"content": response["content"], "done": False}
+        yield {"content": "", "done": True, "usage": response.get("usage", {})}
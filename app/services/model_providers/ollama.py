@@ -1,9 +1,11 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 import asyncio
 from functools import partial
 from ollama import Client
 
 from app.services.model_providers.base import BaseModelHandler
+from app.services.model_providers.transport import get_async_client
+from app.services.model_providers.usage import ollama_usage, record_usage
 from app.models.schemas import Message
 from app.config import settings
 from app.utils.logger import get_logger
@@ -13,23 +15,61 @@ logger = get_logger(__name__)
 class OllamaModelHandler(BaseModelHandler):
     """Handler for Ollama-based models."""
     
-    def __init__(self, host: Optional[str] = None):
+    def __init__(self, host: Optional[str] = None, transport: Optional[str] = None):
         """
         Initialize the Ollama model handler.
         
         Args:
             host: Ollama API host (defaults to settings.OLLAMA_HOST)
+            transport: "async" or "executor" (defaults to settings.OLLAMA_TRANSPORT)
         """
         self.host = host or settings.OLLAMA_HOST
-        
-        # Initialize Ollama client
-        self.client = Client(host=self.host)
-        logger.info(f"Initialized Ollama model handler with host: {self.host}")
+        self.transport = (transport or settings.OLLAMA_TRANSPORT).lower()
+
+        if self.transport == "async":
+            # Shared, connection-pooled async client - no executor hop per request
+            self.async_client = get_async_client(self.host)
+            self.client = None
+        else:
+            # Legacy synchronous client, run in the default thread pool
+            self.async_client = None
+            self.client = Client(host=self.host)
+
+        logger.info(f"Initialized Ollama model handler with host: {self.host} (transport: {self.transport})")
     
     def _convert_to_ollama_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
         """Convert our Message objects to the dict format Ollama expects."""
         return [{"role": msg.role, "content": msg.content} for msg in messages]
     
+    async def _chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Dict[str, Any],
+        keep_alive: Optional[int] = None
+    ):
+        """Send a non-streaming chat request over the configured transport."""
+        if self.async_client is not None:
+            return await self.async_client.chat(
+                model=model,
+                messages=messages,
+                options=options,
+                keep_alive=keep_alive
+            )
+
+        # Ollama's sync client doesn't have native async support, so run in a thread pool
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(
+                self.client.chat,
+                model=model,
+                messages=messages,
+                options=options,
+                keep_alive=keep_alive
+            )
+        )
+
     async def generate(
         self,
         messages: List[Message],
@@ -43,29 +83,28 @@ class OllamaModelHandler(BaseModelHandler):
         
         # Convert messages to Ollama format
         ollama_messages = self._convert_to_ollama_messages(messages)
+
+        # keep_alive is a request field, not a model option
+        keep_alive = kwargs.pop("keep_alive", None)
         
         try:
-            # Ollama doesn't have native async support, so run in a thread pool
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                partial(
-                    self.client.chat,
-                    model=model,
-                    messages=ollama_messages,
-                    options={
-                        "temperature": temperature,
-                        "num_predict": max_tokens,
-                        **kwargs
-                    }
-                )
+            response = await self._chat(
+                model=model,
+                messages=ollama_messages,
+                options={
+                    "temperature": temperature,
+                    "num_predict": max_tokens,
+                    **kwargs
+                },
+                keep_alive=keep_alive
             )
             
             # Extract the response content
             content = response["message"]["content"]
             
-            # Extract token usage if available
-            usage = response.get("usage", {})
+            # Ollama reports token counts and timings on the response itself
+            usage = ollama_usage(response)
+            record_usage(f"ollama:{model}", usage)
             
             return {
                 "content": content,
@@ -75,4 +114,65 @@ class OllamaModelHandler(BaseModelHandler):
             }
         except Exception as e:
             logger.error(f"Error calling Ollama API: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    async def generate_stream(
+        self,
+        messages: List[Message],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a response from Ollama token by token.
+        
+        Closing this generator (e.g. when the client disconnects) closes the
+        underlying HTTP stream, which makes Ollama stop generating.
+        """
+        if self.async_client is None:
+            # The executor transport has no streaming support
+            async for chunk in super().generate_stream(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs
+            ):
+                yield chunk
+            return
+
+        logger.debug(f"Streaming response with Ollama model: {model}")
+
+        keep_alive = kwargs.pop("keep_alive", None)
+
+        stream = await self.async_client.chat(
+            model=model,
+            messages=self._convert_to_ollama_messages(messages),
+            options={
+                "temperature": temperature,
+                "num_predict": max_tokens,
+                **kwargs
+            },
+            keep_alive=keep_alive,
+            stream=True
+        )
+
+        try:
+            async for part in stream:
+                if part.get("done"):
+                    usage = ollama_usage(part)
+                    record_usage(f"ollama:{model}", usage)
+                    yield {
+                        "content": part["message"]["content"] if part.get("message") else "",
+                        "done": True,
+                        "usage": usage
+                    }
+                    break
+                yield {"content": part["message"]["content"], "done": False}
+        except Exception as e:
+            logger.error(f"Error streaming from Ollama API: {str(e)}")
+            raise
+        finally:
+            # Release the HTTP stream so Ollama stops generating
+            await stream.aclose()
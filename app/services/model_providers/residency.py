@@ -0,0 +1,252 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from app.services.model_providers.transport import get_async_client
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+def normalize_model_name(model: str) -> str:
+    """Ollama reports untagged models as "<name>:latest"."""
+    if model.startswith("ollama:"):
+        model = model.split(":", 1)[1]
+    return model if ":" in model else f"{model}:latest"
+
+
+class _ModelTraffic:
+    """Observed traffic for one model."""
+
+    __slots__ = ("requests", "last_used", "mean_gap")
+
+    def __init__(self):
+        self.requests = 0
+        self.last_used: Optional[float] = None
+        # Exponentially weighted mean gap between requests (seconds)
+        self.mean_gap: Optional[float] = None
+
+    def record(self, now: float) -> None:
+        if self.last_used is not None:
+            gap = now - self.last_used
+            self.mean_gap = gap if self.mean_gap is None else 0.7 * self.mean_gap + 0.3 * gap
+        self.last_used = now
+        self.requests += 1
+
+
+class OllamaResidencyManager:
+    """
+    Keeps the routed model set warm in Ollama and manages what stays loaded.
+
+    - Preloads configured models at startup
+    - Tracks loaded models through Ollama's /api/ps
+    - Picks a keep_alive per model from its observed request gaps
+    - Under a memory budget, evicts the least-recently-used loaded model on
+      purpose before loading another one, instead of leaving it to Ollama
+    """
+
+    def __init__(self, host: Optional[str] = None):
+        """
+        Initialize the residency manager.
+
+        Args:
+            host: Ollama API host (defaults to settings.OLLAMA_HOST)
+        """
+        self.host = host or settings.OLLAMA_HOST
+        self.client = get_async_client(self.host)
+
+        self.min_keep_alive = settings.RESIDENCY_MIN_KEEP_ALIVE
+        self.max_keep_alive = settings.RESIDENCY_MAX_KEEP_ALIVE
+        self.memory_budget = settings.RESIDENCY_MEMORY_BUDGET_BYTES
+
+        # name -> {"size": bytes, "expires_at": str} as last reported by /api/ps
+        self.loaded: Dict[str, Dict[str, Any]] = {}
+        # name -> size in bytes, remembered even after unload
+        self.known_sizes: Dict[str, int] = {}
+        self.traffic: Dict[str, _ModelTraffic] = {}
+        self.pinned: set = set()
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=100)
+        self.last_refresh: Optional[float] = None
+
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        logger.info(f"Initialized OllamaResidencyManager (budget={self.memory_budget})")
+
+    def preload_models(self) -> List[str]:
+        """Models to load at startup."""
+        models = settings.RESIDENCY_PRELOAD_MODELS
+        if models is None:
+            models = [settings.DEFAULT_MODEL]
+        # Only Ollama models can be made resident
+        return [normalize_model_name(m) for m in models if m.startswith("ollama:")]
+
+    async def start(self) -> None:
+        """Preload configured models and start tracking residency in the background."""
+        await self.refresh()
+        for model in self.preload_models():
+            self.pinned.add(model)
+            await self.load(model, reason="preload")
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background refresh loop."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def refresh(self) -> None:
+        """Update the loaded model set from /api/ps."""
+        try:
+            response = await self.client.ps()
+            loaded = {}
+            for entry in response.get("models", []) or []:
+                name = normalize_model_name(entry.get("model") or entry.get("name"))
+                size = entry.get("size_vram") or entry.get("size") or 0
+                expires_at = entry.get("expires_at")
+                loaded[name] = {
+                    "size": size,
+                    "expires_at": expires_at.isoformat() if isinstance(expires_at, datetime) else expires_at
+                }
+                self.known_sizes[name] = size
+            self.loaded = loaded
+            self.last_refresh = time.time()
+            metrics.set_gauge("ollama_loaded_models", len(loaded))
+            metrics.set_gauge("ollama_loaded_bytes", sum(m["size"] for m in loaded.values()))
+        except Exception as e:
+            logger.warning(f"Could not refresh Ollama residency from /api/ps: {str(e)}")
+
+    def keep_alive_for(self, model: str) -> int:
+        """
+        Choose a keep_alive (seconds) for a model based on its traffic.
+
+        Ollama resets the timer on every request, so it only has to cover the
+        typical gap until the next request. Models used less often than
+        max_keep_alive get the minimum so they free memory quickly.
+        """
+        model = normalize_model_name(model)
+        if model in self.pinned:
+            return self.max_keep_alive
+
+        traffic = self.traffic.get(model)
+        if traffic is None or traffic.mean_gap is None:
+            return self.min_keep_alive
+        if traffic.mean_gap > self.max_keep_alive:
+            return self.min_keep_alive
+        return int(max(self.min_keep_alive, min(self.max_keep_alive, 2 * traffic.mean_gap)))
+
+    async def before_request(self, model: str) -> int:
+        """
+        Record a request for a model and make room for it if needed.
+
+        Returns:
+            The keep_alive to send with the request
+        """
+        model = normalize_model_name(model)
+        self.traffic.setdefault(model, _ModelTraffic()).record(time.time())
+
+        if model not in self.loaded:
+            if self.memory_budget:
+                await self._make_room(model)
+            # This request loads it; /api/ps will confirm on the next refresh
+            self.loaded[model] = {"size": self._estimated_size(model), "expires_at": None}
+
+        return self.keep_alive_for(model)
+
+    async def load(self, model: str, reason: str = "request") -> None:
+        """Load a model into Ollama's memory without generating anything."""
+        model = normalize_model_name(model)
+        if self.memory_budget:
+            await self._make_room(model)
+
+        keep_alive = self.keep_alive_for(model)
+        started = time.perf_counter()
+        try:
+            await self.client.generate(model=model, prompt="", keep_alive=keep_alive)
+            elapsed = time.perf_counter() - started
+            metrics.observe("ollama_preload_seconds", elapsed, model=model)
+            self._decide("load", model, f"{reason}, keep_alive={keep_alive}s, took {elapsed:.2f}s")
+            await self.refresh()
+        except Exception as e:
+            self._decide("load_failed", model, f"{reason}: {str(e)}")
+            logger.warning(f"Failed to load model {model}: {str(e)}")
+
+    async def unload(self, model: str, reason: str) -> None:
+        """Ask Ollama to unload a model now (keep_alive=0)."""
+        model = normalize_model_name(model)
+        try:
+            await self.client.generate(model=model, prompt="", keep_alive=0)
+            self.loaded.pop(model, None)
+            metrics.inc("ollama_evictions_total", model=model)
+            self._decide("evict", model, reason)
+        except Exception as e:
+            logger.warning(f"Failed to unload model {model}: {str(e)}")
+
+    def status(self) -> Dict[str, Any]:
+        """Residency state and recent decisions, for the API."""
+        now = time.time()
+        return {
+            "memory_budget_bytes": self.memory_budget,
+            "loaded_bytes": sum(m["size"] for m in self.loaded.values()),
+            "last_refresh": self.last_refresh,
+            "loaded": self.loaded,
+            "pinned": sorted(self.pinned),
+            "models": {
+                model: {
+                    "requests": traffic.requests,
+                    "seconds_since_last_use": now - traffic.last_used if traffic.last_used else None,
+                    "mean_gap_seconds": traffic.mean_gap,
+                    "keep_alive_seconds": self.keep_alive_for(model),
+                    "loaded": model in self.loaded
+                }
+                for model, traffic in self.traffic.items()
+            },
+            "decisions": list(self.decisions)
+        }
+
+    async def _make_room(self, model: str) -> None:
+        """Evict least-recently-used models until `model` fits in the budget."""
+        async with self._lock:
+            needed = self._estimated_size(model)
+            used = sum(m["size"] for name, m in self.loaded.items() if name != model)
+
+            candidates = sorted(
+                (name for name in self.loaded if name != model and name not in self.pinned),
+                key=lambda name: self.traffic[name].last_used if name in self.traffic and self.traffic[name].last_used else 0.0
+            )
+            for victim in candidates:
+                if used + needed <= self.memory_budget:
+                    break
+                used -= self.loaded[victim]["size"]
+                await self.unload(victim, reason=f"LRU eviction to fit {model} in memory budget")
+
+    def _estimated_size(self, model: str) -> int:
+        """Size of a model, or the average known size if it has never been loaded."""
+        if model in self.known_sizes:
+            return self.known_sizes[model]
+        if self.known_sizes:
+            return int(sum(self.known_sizes.values()) / len(self.known_sizes))
+        return 0
+
+    async def _refresh_loop(self) -> None:
+        """Periodically resync with /api/ps."""
+        while True:
+            await asyncio.sleep(settings.RESIDENCY_REFRESH_SECONDS)
+            await self.refresh()
+
+    def _decide(self, action: str, model: str, reason: str) -> None:
+        self.decisions.append({
+            "time": time.time(),
+            "action": action,
+            "model": model,
+            "reason": reason
+        })
+        logger.info(f"Residency decision: {action} {model} ({reason})")
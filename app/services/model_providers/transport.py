@@ -0,0 +1,71 @@
+from typing import Dict, Optional
+import httpx
+from ollama import AsyncClient
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# One pooled client per Ollama host, shared by every component in the process
+_shared_clients: Dict[str, AsyncClient] = {}
+
+
+def build_limits() -> httpx.Limits:
+    """Connection pool limits for the Ollama transport."""
+    return httpx.Limits(
+        max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY
+    )
+
+
+def build_timeout() -> httpx.Timeout:
+    """Per-phase timeouts for the Ollama transport."""
+    return httpx.Timeout(
+        connect=settings.OLLAMA_CONNECT_TIMEOUT,
+        read=settings.OLLAMA_READ_TIMEOUT,
+        write=settings.OLLAMA_WRITE_TIMEOUT,
+        pool=settings.OLLAMA_POOL_TIMEOUT
+    )
+
+
+def get_async_client(host: Optional[str] = None) -> AsyncClient:
+    """
+    Get the shared async Ollama client for a host.
+
+    The underlying httpx.AsyncClient keeps a keep-alive connection pool,
+    so every caller reuses the same sockets instead of opening new ones.
+
+    Args:
+        host: Ollama API host (defaults to settings.OLLAMA_HOST)
+
+    Returns:
+        A pooled ollama.AsyncClient
+    """
+    host = host or settings.OLLAMA_HOST
+
+    if host not in _shared_clients:
+        _shared_clients[host] = AsyncClient(
+            host=host,
+            timeout=build_timeout(),
+            limits=build_limits()
+        )
+        logger.info(
+            f"Created pooled Ollama client for {host} "
+            f"(max_connections={settings.OLLAMA_MAX_CONNECTIONS}, "
+            f"max_keepalive={settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS})"
+        )
+
+    return _shared_clients[host]
+
+
+async def close_async_clients() -> None:
+    """Close every shared Ollama client and release its connections."""
+    for host, client in list(_shared_clients.items()):
+        try:
+            await client._client.aclose()
+            logger.info(f"Closed pooled Ollama client for {host}")
+        except Exception as e:
+            logger.error(f"Error closing Ollama client for {host}: {str(e)}")
+    _shared_clients.clear()
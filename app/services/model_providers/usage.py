@@ -0,0 +1,82 @@
+from typing import Any, Dict, Mapping, Optional
+
+from app.models.schemas import TokenUsage
+from app.utils.metrics import metrics
+
+# Histogram buckets for non-time values
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500, 1000)
+TOKEN_COUNT_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _ms(nanoseconds: Optional[int]) -> Optional[float]:
+    """Ollama reports durations in nanoseconds."""
+    return nanoseconds / 1_000_000 if nanoseconds is not None else None
+
+
+def _rate(count: Optional[int], nanoseconds: Optional[int]) -> Optional[float]:
+    if not count or not nanoseconds:
+        return None
+    return count / (nanoseconds / 1_000_000_000)
+
+
+def ollama_usage(response: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Build usage info from the stats Ollama attaches to a finished response.
+
+    Ollama has no "usage" field; it reports prompt_eval_count, eval_count and
+    load/prompt_eval/eval/total durations (in nanoseconds) on the final message.
+
+    Args:
+        response: Final (done) Ollama chat response, or LangChain generation info
+
+    Returns:
+        TokenUsage fields as a dict, without the ones Ollama didn't report
+    """
+    prompt_tokens = response.get("prompt_eval_count")
+    completion_tokens = response.get("eval_count")
+    prompt_eval_duration = response.get("prompt_eval_duration")
+    eval_duration = response.get("eval_duration")
+
+    total_tokens = None
+    if prompt_tokens is not None or completion_tokens is not None:
+        total_tokens = (prompt_tokens or 0) + (completion_tokens or 0)
+
+    usage = TokenUsage(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=total_tokens,
+        load_duration_ms=_ms(response.get("load_duration")),
+        prompt_eval_duration_ms=_ms(prompt_eval_duration),
+        eval_duration_ms=_ms(eval_duration),
+        total_duration_ms=_ms(response.get("total_duration")),
+        prompt_tokens_per_second=_rate(prompt_tokens, prompt_eval_duration),
+        tokens_per_second=_rate(completion_tokens, eval_duration)
+    )
+    return usage.model_dump(exclude_none=True)
+
+
+def record_usage(model: str, usage: Dict[str, Any]) -> None:
+    """
+    Aggregate a generation's usage into the per-model metrics.
+
+    Args:
+        model: Model name used as the metric label
+        usage: Usage dict as returned by ollama_usage()
+    """
+    if not usage:
+        return
+
+    if usage.get("prompt_tokens") is not None:
+        metrics.inc("model_prompt_tokens_total", usage["prompt_tokens"], model=model)
+        metrics.observe("model_prompt_tokens", usage["prompt_tokens"], buckets=TOKEN_COUNT_BUCKETS, model=model)
+    if usage.get("completion_tokens") is not None:
+        metrics.inc("model_completion_tokens_total", usage["completion_tokens"], model=model)
+
+    if usage.get("tokens_per_second") is not None:
+        metrics.observe("model_tokens_per_second", usage["tokens_per_second"], buckets=TOKENS_PER_SECOND_BUCKETS, model=model)
+    if usage.get("prompt_tokens_per_second") is not None:
+        metrics.observe("model_prompt_tokens_per_second", usage["prompt_tokens_per_second"], buckets=TOKENS_PER_SECOND_BUCKETS, model=model)
+    if usage.get("prompt_eval_duration_ms") is not None:
+        metrics.observe("model_prompt_eval_seconds", usage["prompt_eval_duration_ms"] / 1000, model=model)
+    if usage.get("load_duration_ms") is not None:
+        metrics.observe("model_load_seconds", usage["load_duration_ms"] / 1000, model=model)
@@ -1,8 +1,12 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
 from app.models.schemas import Message
 from app.config import settings
 from app.utils.logger import get_logger
 from app.services.chains.model_chains import CodeLlamaChain
+from app.services.response_cache import ResponseCache
+from app.services.scheduler import GenerationScheduler
+from app.utils.single_flight import SingleFlight
+from contextlib import asynccontextmanager
 import importlib
 
 logger = get_logger(__name__)
@@ -15,12 +19,33 @@ class ModelService:
     and provides a unified interface for generating responses.
     """
     
-    def __init__(self):
-        """Initialize the model service with available model handlers."""
+    def __init__(
+        self,
+        response_cache: Optional[ResponseCache] = None,
+        scheduler: Optional[GenerationScheduler] = None
+    ):
+        """
+        Initialize the model service with available model handlers.
+        
+        Args:
+            response_cache: Cache for deterministic generations (created from settings if omitted)
+            scheduler: Admission control for generations (created from settings if omitted)
+        """
         # Dictionary to store initialized model handlers
         self.model_handlers = {}
 
         self.model_chains = {}
+
+        self.response_cache = response_cache or ResponseCache()
+
+        # Coalesces concurrent identical generations into one upstream call
+        self.single_flight = SingleFlight("generate")
+
+        # Limits how many generations hit the providers at once
+        self.scheduler = scheduler or GenerationScheduler()
+
+        # Keeps the routed Ollama models loaded (set up with the Ollama handler)
+        self.residency = None
         
         # Register available model providers
         self._register_model_handlers()
@@ -38,6 +63,10 @@ class ModelService:
             from app.services.model_providers.ollama import OllamaModelHandler
             self.model_handlers["ollama"] = OllamaModelHandler()
             logger.info("Registered Ollama model handler")
+
+            if settings.RESIDENCY_ENABLED:
+                from app.services.model_providers.residency import OllamaResidencyManager
+                self.residency = OllamaResidencyManager()
         except ImportError:
             logger.warning("Ollama handler could not be registered")
         
@@ -61,6 +90,29 @@ class ModelService:
 
         #more chains added here
     
+    async def start(self) -> None:
+        """Warm up the configured models."""
+        if self.residency is not None:
+            await self.residency.start()
+
+    async def close(self) -> None:
+        """Release pooled connections held by the model providers."""
+        if self.residency is not None:
+            await self.residency.stop()
+
+        from app.services.model_providers.transport import close_async_clients
+        from app.services.chains.factory import chain_factory
+        # Cached chains hold the pooled clients, drop them too
+        chain_factory.clear()
+        await close_async_clients()
+
+    async def _with_keep_alive(self, model_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Let the residency manager see the request and pick its keep_alive."""
+        if self.residency is None or self._get_provider_from_model(model_name) != "ollama":
+            return params
+        keep_alive = await self.residency.before_request(self._get_model_name(model_name))
+        return {**params, "keep_alive": keep_alive}
+    
     def _get_provider_from_model(self, model: str) -> str:
         """
         Determine the provider from the model name.
@@ -110,6 +162,9 @@ class ModelService:
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        use_cache: Optional[bool] = None,
+        priority: str = "interactive",
+        conversation_id: Optional[str] = None,
         **additional_params
     ) -> Dict[str, Any]:
         """
@@ -120,14 +175,70 @@ class ModelService:
             model: Name of the model to use (defaults to configured default)
             temperature: Creativity parameter (0-1)
             max_tokens: Maximum number of tokens to generate
+            use_cache: Response cache override - False bypasses it, True forces it,
+                None (default) caches only low-temperature requests
+            priority: Scheduling class, "interactive" or "batch"
+            conversation_id: Conversation the request belongs to (for scheduling fairness)
             additional_params: Any additional model-specific parameters
             
         Returns:
             Dict containing response content, model name, and usage information
+
+        Raises:
+            SchedulerRejectedError: If the generation could not be admitted in time
         """
         # Use default model if none specified
         model_name = model or settings.DEFAULT_MODEL
 
+        key = self.response_cache.make_key(model_name, messages, temperature, max_tokens, additional_params)
+        cacheable = self.response_cache.should_cache(temperature, use_cache)
+
+        if cacheable:
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                logger.info(f"Serving cached response for model {model_name}")
+                return dict(cached)
+
+        async def generate_and_cache() -> Dict[str, Any]:
+            async with self._generation_slot(model_name, priority, conversation_id):
+                response = await self._generate(
+                    messages=messages,
+                    model_name=model_name,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **additional_params
+                )
+            if cacheable:
+                await self.response_cache.set(key, response)
+            return response
+
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return await generate_and_cache()
+
+        # Concurrent identical requests share one generation
+        response = await self.single_flight.do(f"{key}:{cacheable}", generate_and_cache)
+        return dict(response)
+
+    @asynccontextmanager
+    async def _generation_slot(self, model_name: str, priority: str, conversation_id: Optional[str]):
+        """Hold a scheduler slot for a generation (no-op when scheduling is disabled)."""
+        if not settings.SCHEDULER_ENABLED:
+            yield
+            return
+        async with self.scheduler.slot(model_name, priority=priority, conversation_id=conversation_id):
+            yield
+
+    async def _generate(
+        self,
+        messages: List[Message],
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        **additional_params
+    ) -> Dict[str, Any]:
+        """Generate a response with the chain or provider handler for the model."""
+        additional_params = await self._with_keep_alive(model_name, additional_params)
+
         if self._should_use_specialized_chain(model_name):
             # get the chain here
             chain = self._get_specialized_chain(model_name)
@@ -174,4 +285,152 @@ class ModelService:
             }
         except Exception as e:
             logger.error(f"Error generating response with model {model_name}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    async def generate_stream(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        use_cache: Optional[bool] = None,
+        priority: str = "interactive",
+        conversation_id: Optional[str] = None,
+        **additional_params
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a response using the specified model.
+        
+        Args:
+            messages: List of message objects with role and content
+            model: Name of the model to use (defaults to configured default)
+            temperature: Creativity parameter (0-1)
+            max_tokens: Maximum number of tokens to generate
+            use_cache: Response cache override (see generate)
+            priority: Scheduling class, "interactive" or "batch"
+            conversation_id: Conversation the request belongs to (for scheduling fairness)
+            additional_params: Any additional model-specific parameters
+            
+        Yields:
+            Dicts with the next piece of "content" and a "done" flag. The final
+            chunk also carries the full model name and usage information.
+        """
+        model_name = model or settings.DEFAULT_MODEL
+
+        key = self.response_cache.make_key(model_name, messages, temperature, max_tokens, additional_params)
+        cacheable = self.response_cache.should_cache(temperature, use_cache)
+
+        if cacheable:
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                logger.info(f"Serving cached response for model {model_name}")
+                yield {"content": cached["content"], "done": False}
+                yield {"content": "", "done": True, "model": cached["model"], "usage": cached.get("usage", {})}
+                return
+
+        def open_stream() -> AsyncIterator[Dict[str, Any]]:
+            return self._generate_stream(
+                messages=messages,
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                cache_key=key if cacheable else None,
+                priority=priority,
+                conversation_id=conversation_id,
+                **additional_params
+            )
+
+        if settings.SINGLE_FLIGHT_ENABLED:
+            # Concurrent identical requests share one upstream stream
+            stream = self.single_flight.stream(f"{key}:{cacheable}", open_stream)
+        else:
+            stream = open_stream()
+
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            # Detach from (and possibly cancel) the upstream generation
+            await stream.aclose()
+
+    async def _generate_stream(
+        self,
+        messages: List[Message],
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        cache_key: Optional[str] = None,
+        priority: str = "interactive",
+        conversation_id: Optional[str] = None,
+        **additional_params
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream from the chain or provider handler, caching the completed reply if requested."""
+        # The slot is held for the whole stream
+        async with self._generation_slot(model_name, priority, conversation_id):
+            async for chunk in self._stream_upstream(
+                messages=messages,
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                cache_key=cache_key,
+                **additional_params
+            ):
+                yield chunk
+
+    async def _stream_upstream(
+        self,
+        messages: List[Message],
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        cache_key: Optional[str] = None,
+        **additional_params
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream from the chain or provider handler for the model."""
+        additional_params = await self._with_keep_alive(model_name, additional_params)
+
+        if self._should_use_specialized_chain(model_name):
+            chain = self._get_specialized_chain(model_name)
+            logger.info(f"Streaming with specialized chain {chain.__class__.__name__} for model {model_name}")
+            upstream = chain.stream(
+                messages=messages,
+                model=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **additional_params
+            )
+        else:
+            provider = self._get_provider_from_model(model_name)
+            actual_model = self._get_model_name(model_name)
+
+            if provider not in self.model_handlers:
+                raise ValueError(f"Unsupported model provider: {provider}")
+
+            upstream = self.model_handlers[provider].generate_stream(
+                messages=messages,
+                model=actual_model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **additional_params
+            )
+
+        parts = []
+        try:
+            async for chunk in upstream:
+                parts.append(chunk.get("content", ""))
+                if chunk.get("done"):
+                    if cache_key is not None:
+                        await self.response_cache.set(cache_key, {
+                            "content": "".join(parts),
+                            "model": model_name,
+                            "usage": chunk.get("usage", {})
+                        })
+                    yield {**chunk, "model": model_name, "usage": chunk.get("usage", {})}
+                else:
+                    yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming response with model {model_name}: {str(e)}")
+            raise
+        finally:
+            # Propagate cancellation upstream (e.g. client disconnected)
+            await upstream.aclose()
\ No newline at end of file
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.schemas import Message
+from app.services.context_budget import ContextBudget, count_tokens
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class _ConversationPrefix:
+    """What was last sent to the model for one conversation."""
+
+    __slots__ = ("model", "temperature", "max_tokens", "transcript", "pending")
+
+    def __init__(self, model: str, temperature: float, max_tokens: int):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        # Messages exactly as sent on previous turns, replies included
+        self.transcript: List[Message] = []
+        # Prompt of the turn currently being generated
+        self.pending: Optional[List[Message]] = None
+
+
+class PrefixStableLayout:
+    """
+    Prompt assembly that keeps each conversation's prompt prefix byte-stable.
+
+    Ollama reuses its KV cache for the longest common prefix between the new
+    prompt and the previous one for the same model. The default layout breaks
+    that prefix on every turn: the RAG context is inserted before the newest
+    user message and then disappears from the next turn's history, and
+    sliding-window truncation shifts the start of the prompt.
+
+    This layout instead:
+    - re-sends every previous turn exactly as it was sent, including its RAG
+      context, so each turn only adds new tokens at the end
+    - appends the new retrieval context after the newest user message
+    - when the budget is exceeded, drops a large block of the oldest turns at
+      once, so the new prefix then stays stable for many turns
+    - pins each conversation to the model and options of its first turn
+    """
+
+    def __init__(self, context_budget: Optional[ContextBudget] = None, max_conversations: Optional[int] = None):
+        """
+        Initialize the layout.
+
+        Args:
+            context_budget: Used for the per-task token budget
+            max_conversations: Max conversations tracked (least recently used are forgotten)
+        """
+        self.context_budget = context_budget or ContextBudget()
+        self.max_conversations = max_conversations or settings.PROMPT_LAYOUT_MAX_CONVERSATIONS
+        self._conversations: "OrderedDict[str, _ConversationPrefix]" = OrderedDict()
+
+    def pinned(self, conversation_id: str) -> Optional[Tuple[str, float, int]]:
+        """The (model, temperature, max_tokens) a conversation is pinned to, if any."""
+        state = self._conversations.get(conversation_id)
+        if state is None:
+            return None
+        return state.model, state.temperature, state.max_tokens
+
+    def pin(self, conversation_id: str, model: str, temperature: float, max_tokens: int) -> None:
+        """Pin a conversation to a model and options (re-pinning keeps the transcript)."""
+        state = self._conversations.get(conversation_id)
+        if state is None:
+            state = _ConversationPrefix(model, temperature, max_tokens)
+            self._conversations[conversation_id] = state
+        else:
+            if state.model != model:
+                logger.info(f"Conversation {conversation_id} re-pinned from {state.model} to {model}")
+            state.model, state.temperature, state.max_tokens = model, temperature, max_tokens
+        self._conversations.move_to_end(conversation_id)
+
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+
+    def assemble(
+        self,
+        conversation_id: str,
+        history: List[Message],
+        new_messages: List[Message],
+        model: str,
+        task_type: str,
+        max_tokens: int,
+        context_message: Optional[Message] = None
+    ) -> Tuple[List[Message], Dict[str, Any]]:
+        """
+        Build the prompt for a turn.
+
+        Args:
+            conversation_id: Conversation the turn belongs to (must be pinned)
+            history: Prior conversation messages from memory, oldest first
+            new_messages: Messages from the current request
+            model: Full model name
+            task_type: Key into settings.TASK_PARAMS
+            max_tokens: Tokens reserved for the reply
+            context_message: Optional RAG context for this turn
+
+        Returns:
+            Tuple of (messages to send, layout/budget decisions for telemetry)
+        """
+        state = self._conversations[conversation_id]
+        budget = self.context_budget.budget_for(model, task_type, max_tokens)
+
+        prefix = state.transcript
+        reused = self._matches_history(prefix, history)
+        if not reused:
+            # First turn in this process, or memory changed underneath us
+            prefix = list(history)
+
+        tail = list(new_messages) + ([context_message] if context_message is not None else [])
+        tail_tokens = count_tokens(tail)
+        prefix_tokens = count_tokens(prefix)
+
+        decision: Dict[str, Any] = {
+            "layout": "prefix_stable",
+            "budget_tokens": budget,
+            "prefix_reused": reused,
+            "prefix_messages": len(prefix),
+            "history_messages_dropped": 0
+        }
+
+        if prefix_tokens + tail_tokens > budget:
+            # Drop a block of the oldest turns so that the prompt falls well
+            # below the budget; the new prefix then stays stable for a while
+            target = int(budget * settings.PROMPT_LAYOUT_TRUNCATE_TO) - tail_tokens
+            dropped = 0
+            while prefix and prefix_tokens > max(target, 0):
+                turn_length = self._first_turn_length(prefix)
+                prefix_tokens -= count_tokens(prefix[:turn_length])
+                prefix = prefix[turn_length:]
+                dropped += turn_length
+            decision["history_messages_dropped"] = dropped
+            decision["prefix_messages"] = len(prefix)
+            metrics.inc("prompt_layout_block_truncations_total", model=model)
+            logger.info(f"Dropped a block of {dropped} messages from conversation {conversation_id} to fit {budget} tokens")
+
+        prompt = prefix + tail
+        decision["prompt_tokens"] = prefix_tokens + tail_tokens
+        decision["prefix_tokens"] = prefix_tokens if reused else 0
+
+        state.pending = prompt
+        return prompt, decision
+
+    def record_reply(self, conversation_id: str, content: str) -> None:
+        """Extend the conversation's transcript with the reply to the pending prompt."""
+        state = self._conversations.get(conversation_id)
+        if state is None or state.pending is None:
+            return
+        state.transcript = state.pending + [Message(role="assistant", content=content)]
+        state.pending = None
+
+    @staticmethod
+    def _matches_history(transcript: List[Message], history: List[Message]) -> bool:
+        """Whether the transcript (without context messages) ends with the stored history."""
+        if not transcript:
+            return False
+        conversation = [msg for msg in transcript if msg.role.lower() != "system"]
+        stored = [msg for msg in history if msg.role.lower() != "system"]
+        # Memory only returns the most recent messages, the transcript may be longer or truncated
+        overlap = min(len(conversation), len(stored))
+        if overlap == 0:
+            return not stored
+        return conversation[-overlap:] == stored[-overlap:]
+
+    @staticmethod
+    def _first_turn_length(messages: List[Message]) -> int:
+        """Number of messages up to (not including) the second user message."""
+        for i in range(1, len(messages)):
+            if messages[i].role.lower() == "user":
+                return i
+        return len(messages)
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
+import numpy as np
 from langchain.schema import Document
 from app.models.rag_schemas import DocumentChunk
 from app.utils.logger import get_logger
@@ -37,6 +38,30 @@ class BaseEmbeddings(ABC):
         """
         pass
 
+    async def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for a list of documents as a float32 matrix.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            One row per text
+        """
+        return np.asarray(await self.embed_documents(texts), dtype=np.float32)
+
+    async def embed_query_array(self, text: str) -> np.ndarray:
+        """
+        Generate an embedding for a single query text as a float32 array.
+
+        Args:
+            text: Query text to embed
+
+        Returns:
+            Embedding vector (empty for blank text)
+        """
+        return np.asarray(await self.embed_query(text), dtype=np.float32)
+
 class BaseVectorStore(ABC):
     """Abstract base class for vector stores."""
 
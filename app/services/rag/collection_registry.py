@@ -0,0 +1,264 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.services.rag.base import BaseEmbeddings
+from app.services.rag.vector_store import FAISSVectorStore
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from app.utils.single_flight import SingleFlight
+
+logger = get_logger(__name__)
+
+
+class _ResidentCollection:
+    """A loaded collection and its bookkeeping."""
+
+    __slots__ = ("store", "bytes", "pinned", "checked_at")
+
+    def __init__(self, store: FAISSVectorStore, pinned: bool):
+        self.store = store
+        self.bytes = 0
+        self.pinned = pinned
+        self.checked_at = time.monotonic()
+
+
+class CollectionRegistry:
+    """
+    Loaded FAISS collections, shared by all requests.
+
+    A collection is loaded from disk on first use and then stays resident, so
+    later requests search it without reading index.faiss/index.pkl again.
+    Concurrent first uses share one load.
+
+    Resident collections are unloaded least recently used first once their
+    approximate size exceeds `max_bytes`; pinned collections (the default one)
+    and collections being written to are never unloaded. A resident
+    collection is checked against its files at most every
+    `reload_check_seconds` and reloaded if another process changed them.
+    """
+
+    def __init__(
+        self,
+        embedding_service: BaseEmbeddings,
+        persist_directory: str,
+        max_bytes: Optional[int] = None,
+        reload_check_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the registry.
+
+        Args:
+            embedding_service: Service for generating embeddings
+            persist_directory: Directory holding one subdirectory per collection
+            max_bytes: Approximate RAM budget for resident collections
+            reload_check_seconds: Min interval between checks of a collection's files
+        """
+        self.embedding_service = embedding_service
+        self.persist_directory = persist_directory
+        self.max_bytes = max_bytes or settings.RAG_REGISTRY_MAX_BYTES
+        self.reload_check_seconds = (
+            settings.RAG_REGISTRY_RELOAD_CHECK_SECONDS if reload_check_seconds is None else reload_check_seconds
+        )
+
+        # Least recently used first
+        self._resident: "OrderedDict[str, _ResidentCollection]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._loads = SingleFlight("rag_collections")
+
+    def pin(self, store: FAISSVectorStore) -> None:
+        """
+        Make an existing store the resident copy of its collection, never unloaded.
+
+        Args:
+            store: Vector store (loaded lazily on first use)
+        """
+        self._resident[store.collection_name] = _ResidentCollection(store, pinned=True)
+        self._collection_stats(store.collection_name)
+
+    async def get(self, collection_name: str) -> FAISSVectorStore:
+        """
+        The loaded store for a collection.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            The resident vector store, loaded first if needed
+        """
+        entry = self._resident.get(collection_name)
+        if entry is None:
+            self._record(collection_name, "miss")
+            return await self._loads.do(collection_name, lambda: self._load(collection_name))
+
+        self._resident.move_to_end(collection_name)
+        if entry.store.faiss_index is None:
+            # Pinned, and not loaded yet (or deleted since)
+            self._record(collection_name, "miss")
+            await self._loads.do(collection_name, lambda: self._fill(collection_name, entry, reload=False))
+        elif self._changed_on_disk(entry):
+            self._record(collection_name, "stale")
+            await self._loads.do(collection_name, lambda: self._fill(collection_name, entry, reload=True))
+        else:
+            self._record(collection_name, "hit")
+        return entry.store
+
+    async def refresh(self, collection_name: str) -> None:
+        """
+        Update a collection's size after documents were added, unloading others if over budget.
+
+        Args:
+            collection_name: Name of the collection
+        """
+        entry = self._resident.get(collection_name)
+        if entry is None:
+            return
+        entry.bytes = await self._measure(entry.store)
+        self._enforce_budget(keep=collection_name)
+
+    async def delete(self, collection_name: str) -> None:
+        """
+        Delete a collection's files and unload it.
+
+        Args:
+            collection_name: Name of the collection
+        """
+        entry = self._resident.get(collection_name)
+        if entry is not None and entry.pinned:
+            await entry.store.delete_collection()
+            entry.bytes = 0
+            self._update_gauges()
+            return
+
+        store = entry.store if entry is not None else FAISSVectorStore(
+            embedding_service=self.embedding_service,
+            persist_directory=self.persist_directory,
+            collection_name=collection_name
+        )
+        self._unload(collection_name)
+        self._stats.pop(collection_name, None)
+        await store.delete_collection()
+
+    def stats(self) -> Dict[str, Any]:
+        """Resident size against the budget, plus per-collection hits, loads and load times."""
+        collections = {}
+        for collection_name, stats in self._stats.items():
+            entry = self._resident.get(collection_name)
+            requests = stats["hits"] + stats["misses"]
+            collections[collection_name] = {
+                **stats,
+                "resident": entry is not None,
+                "pinned": entry is not None and entry.pinned,
+                "bytes": entry.bytes if entry is not None else 0,
+                "vectors": entry.store.vector_count if entry is not None else 0,
+                "persistence": entry.store.persistence_stats() if entry is not None else None,
+                "hit_rate": round(stats["hits"] / requests, 4) if requests else 0.0
+            }
+        return {
+            "resident_collections": len(self._resident),
+            "resident_bytes": self._resident_bytes(),
+            "max_bytes": self.max_bytes,
+            "reload_check_seconds": self.reload_check_seconds,
+            "collections": collections
+        }
+
+    async def _load(self, collection_name: str) -> FAISSVectorStore:
+        """Load a collection from disk and make it resident."""
+        store = FAISSVectorStore(
+            embedding_service=self.embedding_service,
+            persist_directory=self.persist_directory,
+            collection_name=collection_name
+        )
+        entry = _ResidentCollection(store, pinned=False)
+        await self._fill(collection_name, entry, reload=False)
+        self._resident[collection_name] = entry
+        self._enforce_budget(keep=collection_name)
+        return store
+
+    async def _fill(self, collection_name: str, entry: _ResidentCollection, reload: bool) -> None:
+        """Load (or reload) an entry's index, recording its size and load time."""
+        started = time.perf_counter()
+        if reload:
+            await entry.store.reload()
+        else:
+            await entry.store.load()
+        elapsed = time.perf_counter() - started
+        entry.bytes = await self._measure(entry.store)
+        entry.checked_at = time.monotonic()
+        if collection_name in self._resident:
+            self._enforce_budget(keep=collection_name)
+
+        stats = self._collection_stats(collection_name)
+        stats["reloads" if reload else "loads"] += 1
+        stats["last_load_seconds"] = round(elapsed, 4)
+        stats["total_load_seconds"] = round(stats["total_load_seconds"] + elapsed, 4)
+        metrics.observe("rag_collection_load_seconds", elapsed, collection=collection_name)
+        logger.info(
+            f"{'Reloaded' if reload else 'Loaded'} collection {collection_name} "
+            f"in {elapsed:.3f}s ({entry.bytes} bytes)"
+        )
+
+    def _changed_on_disk(self, entry: _ResidentCollection) -> bool:
+        """Whether a resident collection's files were changed by someone else (checked at most every interval)."""
+        now = time.monotonic()
+        if entry.store.writing or now - entry.checked_at < self.reload_check_seconds:
+            return False
+        entry.checked_at = now
+        return entry.store.disk_signature() != entry.store.loaded_signature
+
+    async def _measure(self, store: FAISSVectorStore) -> int:
+        """Estimate a store's memory footprint in a worker thread (walks the docstore)."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, store.memory_bytes)
+
+    def _enforce_budget(self, keep: str) -> None:
+        """Unload least recently used collections until within the budget."""
+        for collection_name in list(self._resident):
+            if self._resident_bytes() <= self.max_bytes:
+                break
+            entry = self._resident[collection_name]
+            if collection_name == keep or entry.pinned or entry.store.writing:
+                continue
+            self._unload(collection_name, "budget")
+
+        if self._resident_bytes() > self.max_bytes:
+            logger.warning(
+                f"Resident collections use {self._resident_bytes()} bytes, over the "
+                f"{self.max_bytes} byte budget, with nothing left to unload"
+            )
+        self._update_gauges()
+
+    def _unload(self, collection_name: str, reason: Optional[str] = None) -> None:
+        if self._resident.pop(collection_name, None) is None:
+            return
+        if reason is not None:
+            self._collection_stats(collection_name)["evictions"] += 1
+            metrics.inc("rag_collection_evictions_total", reason=reason)
+            logger.info(f"Unloaded collection {collection_name} ({reason})")
+        self._update_gauges()
+
+    def _record(self, collection_name: str, result: str) -> None:
+        """Count a lookup: "hit", "miss" (loaded from disk) or "stale" (reloaded)."""
+        stats = self._collection_stats(collection_name)
+        stats["hits" if result == "hit" else "misses"] += 1
+        metrics.inc("rag_collection_requests_total", result=result)
+
+    def _collection_stats(self, collection_name: str) -> Dict[str, Any]:
+        return self._stats.setdefault(collection_name, {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "reloads": 0,
+            "evictions": 0,
+            "last_load_seconds": None,
+            "total_load_seconds": 0.0
+        })
+
+    def _resident_bytes(self) -> int:
+        return sum(entry.bytes for entry in self._resident.values())
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("rag_collections_resident", len(self._resident))
+        metrics.set_gauge("rag_collections_resident_bytes", self._resident_bytes())
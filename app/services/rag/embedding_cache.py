@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Max host parameters per statement (SQLite's default limit is 999 before 3.32)
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    dimensions INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, hash)
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('bytes', 0);
+"""
+
+
+def content_hash(text: str) -> bytes:
+    """SHA-256 of a chunk's text, the content address of its embedding."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class DocumentEmbeddingCache:
+    """
+    Persistent, content-addressed cache of document chunk embeddings.
+
+    Vectors are stored in a SQLite database in WAL mode, keyed by embedding
+    model and the SHA-256 of the chunk text, as raw float32 blobs. Re-uploaded
+    or overlapping documents only send chunks that aren't cached yet to
+    Ollama. The cache survives restarts, and several workers can share the
+    file: WAL lets readers run alongside a writer, and writes wait for each
+    other (busy timeout) rather than fail. Entries are immutable, so
+    concurrent writers of the same chunk just store the same vector.
+
+    Once the stored vectors exceed `max_bytes`, the least recently used ones
+    are deleted down to `low_water` of the budget, and the freed pages are
+    returned to the file system.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        low_water: float = 0.9
+    ):
+        """
+        Initialize the cache, creating the database if needed.
+
+        Args:
+            path: SQLite database file
+            max_bytes: Budget for stored vectors
+            low_water: Fraction of the budget eviction goes down to
+        """
+        self.path = path or settings.EMBEDDING_CACHE_PATH
+        self.max_bytes = max_bytes or settings.EMBEDDING_CACHE_MAX_BYTES
+        self.low_water = low_water
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+        logger.info(f"Initialized DocumentEmbeddingCache at {self.path} (max_bytes={self.max_bytes})")
+
+    async def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up the embeddings of a batch of chunks.
+
+        Args:
+            model: Embedding model name
+            texts: Chunk texts
+
+        Returns:
+            One float32 vector per text, None where it isn't cached
+        """
+        loop = asyncio.get_event_loop()
+        vectors = await loop.run_in_executor(None, partial(self._get_many, model, texts))
+
+        hits = sum(vector is not None for vector in vectors)
+        self.hits += hits
+        self.misses += len(vectors) - hits
+        metrics.inc("embedding_cache_hits_total", hits)
+        metrics.inc("embedding_cache_misses_total", len(vectors) - hits)
+        return vectors
+
+    async def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Any]) -> None:
+        """
+        Store the embeddings of a batch of chunks.
+
+        Args:
+            model: Embedding model name
+            texts: Chunk texts
+            vectors: Their embeddings
+        """
+        if not texts:
+            return
+        loop = asyncio.get_event_loop()
+        evicted = await loop.run_in_executor(None, partial(self._put_many, model, texts, vectors))
+        if evicted:
+            self.evictions += evicted
+            metrics.inc("embedding_cache_evictions_total", evicted)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Stored vectors and bytes against the budget, plus this process's hits and misses."""
+        loop = asyncio.get_event_loop()
+        entries, size = await loop.run_in_executor(None, self._usage)
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions
+        }
+
+    def close(self) -> None:
+        """Close the connections of all threads."""
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection (a connection is only ever used by one thread at a time)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Waits up to 30s for other writers, including other processes
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connection())
+
+    def _get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        hashes = [content_hash(text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        connection = self._connection()
+        for start in range(0, len(hashes), _QUERY_CHUNK):
+            chunk = list(dict.fromkeys(hashes[start:start + _QUERY_CHUNK]))
+            placeholders = ",".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model, *chunk]
+            ).fetchall()
+            for digest, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype="<f4")
+
+        if found:
+            # Recency for eviction; entries used together share a timestamp
+            now = time.time()
+            with self._transaction() as connection:
+                connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                    [(now, model, digest) for digest in found]
+                )
+        return [found.get(digest) for digest in hashes]
+
+    def _put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Any]) -> int:
+        now = time.time()
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            digest = content_hash(text)
+            blob = np.asarray(vector, dtype="<f4").tobytes()
+            rows[digest] = (model, digest, len(blob) // 4, blob, now)
+
+        with self._transaction() as connection:
+            # Only count vectors that weren't stored yet
+            added = 0
+            for row in rows.values():
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO embeddings (model, hash, dimensions, vector, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount:
+                    added += len(row[3])
+            connection.execute("UPDATE meta SET value = value + ? WHERE key = 'bytes'", (added,))
+            size = connection.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()[0]
+
+        if size <= self.max_bytes:
+            return 0
+        return self._evict(size)
+
+    def _evict(self, size: int) -> int:
+        """Delete least recently used vectors until under the low-water mark."""
+        target = int(self.max_bytes * self.low_water)
+        evicted = 0
+        with self._transaction() as connection:
+            victims = []
+            freed = 0
+            cursor = connection.execute(
+                "SELECT model, hash, length(vector) FROM embeddings ORDER BY last_used"
+            )
+            for model, digest, length in cursor:
+                if size - freed <= target:
+                    break
+                victims.append((model, digest))
+                freed += length
+            cursor.close()
+            connection.executemany("DELETE FROM embeddings WHERE model = ? AND hash = ?", victims)
+            connection.execute("UPDATE meta SET value = value - ? WHERE key = 'bytes'", (freed,))
+            evicted = len(victims)
+        self._connection().execute("PRAGMA incremental_vacuum")
+        logger.info(f"Evicted {evicted} embeddings ({freed} bytes) from the embedding cache")
+        return evicted
+
+    def _usage(self) -> Tuple[int, int]:
+        connection = self._connection()
+        entries = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        size = connection.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()[0]
+        return entries, size
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on an autocommit connection."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        # Take the write lock up front, so concurrent writers wait instead of deadlocking
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
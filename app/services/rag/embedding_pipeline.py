@@ -0,0 +1,209 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class EmbeddingPipeline:
+    """
+    Embeds large batches of documents as concurrent, adaptively sized requests.
+
+    The texts are cut into batches that up to `concurrency` workers send
+    through `embed_batch` (e.g. Ollama's /api/embed) at once. The batch size
+    is tuned from observed latency (AIMD): it grows by `increase` after a
+    full batch that finished within `target_batch_seconds`, and halves after
+    a slower or failed one, within [min_batch_size, max_batch_size]. Until
+    the first slow batch it doubles instead (slow start), so it ramps up
+    quickly from a small initial size. Only batches cut at the current size
+    count, so concurrent slow batches halve it once. The size carries over
+    between calls, so each upload starts from what worked last.
+
+    A failed batch is retried on its own, with exponential backoff, up to
+    `max_retries` times. If it still fails, embed() raises and the other
+    batches are cancelled; `on_batch` has seen every batch that succeeded
+    by then, so the caller can keep them (the embedding service stores them
+    in the document embedding cache, so a retried upload resumes).
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[Sequence[Sequence[float]]]],
+        name: str = "default",
+        batch_size: Optional[int] = None,
+        min_batch_size: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        increase: Optional[int] = None,
+        target_batch_seconds: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_base_delay: Optional[float] = None
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            embed_batch: Coroutine function embedding one batch of texts
+            name: Label for logs and metrics (e.g. the embedding model)
+            batch_size: Initial batch size
+            min_batch_size: Smallest batch size
+            max_batch_size: Largest batch size
+            increase: Batch size added after a fast batch
+            target_batch_seconds: Batch latency the size is tuned towards
+            concurrency: Max batches in flight at once
+            max_retries: Retries per failed batch
+            retry_base_delay: Seconds before the first retry, doubled per retry
+        """
+        self.embed_batch = embed_batch
+        self.name = name
+        self.min_batch_size = min_batch_size or settings.EMBEDDING_MIN_BATCH_SIZE
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_MAX_BATCH_SIZE
+        self.batch_size = self._clamp(batch_size or settings.EMBEDDING_BATCH_SIZE)
+        self.increase = increase or settings.EMBEDDING_BATCH_INCREASE
+        self.target_batch_seconds = target_batch_seconds or settings.EMBEDDING_TARGET_BATCH_SECONDS
+        self.concurrency = concurrency or settings.EMBEDDING_CONCURRENCY
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_base_delay = retry_base_delay or settings.EMBEDDING_RETRY_BASE_DELAY
+
+        self._batches = 0
+        self._chunks = 0
+        self._retries = 0
+        self._failures = 0
+        self._busy_seconds = 0.0
+        self._last_chunks_per_second: Optional[float] = None
+        self._slow_start = True
+
+    async def embed(
+        self,
+        texts: List[str],
+        on_batch: Optional[Callable[[List[str], List[np.ndarray]], Awaitable[None]]] = None
+    ) -> np.ndarray:
+        """
+        Embed texts in concurrent batches.
+
+        Args:
+            texts: Texts to embed
+            on_batch: Awaited with each batch's texts and vectors as soon as it succeeds
+
+        Returns:
+            One float32 row per text, in order
+
+        Raises:
+            Exception: A batch still failed after its retries
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        cursor = 0
+        started = time.perf_counter()
+
+        async def worker() -> None:
+            nonlocal cursor
+            while cursor < len(texts):
+                # Each batch is cut at the current size, so tuning applies right away
+                start, size = cursor, self.batch_size
+                cursor = min(len(texts), start + size)
+                batch = texts[start:cursor]
+                vectors = await self._run_batch(batch, size)
+                results[start:start + len(batch)] = vectors
+                if on_batch is not None:
+                    await on_batch(batch, vectors)
+
+        workers = [
+            asyncio.ensure_future(worker())
+            for _ in range(min(self.concurrency, -(-len(texts) // self.min_batch_size)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Embedded {len(texts)} texts in {elapsed:.2f}s "
+            f"({len(texts) / elapsed:.1f}/s, batch size now {self.batch_size})"
+        )
+        return np.asarray(results, dtype=np.float32)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current batch size, totals and throughput."""
+        return {
+            "batch_size": self.batch_size,
+            "min_batch_size": self.min_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "target_batch_seconds": self.target_batch_seconds,
+            "concurrency": self.concurrency,
+            "batches": self._batches,
+            "chunks": self._chunks,
+            "retries": self._retries,
+            "failures": self._failures,
+            "last_batch_chunks_per_second": self._last_chunks_per_second,
+            "mean_batch_chunks_per_second": (
+                round(self._chunks / self._busy_seconds, 2) if self._busy_seconds else None
+            )
+        }
+
+    async def _run_batch(self, batch: List[str], size: int) -> List[np.ndarray]:
+        """Embed one batch (cut at `size`), retrying it on failure, and tune the batch size."""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                vectors = await self.embed_batch(batch)
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Expected {len(batch)} embeddings, got {len(vectors)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._decrease(size)
+                if attempt >= self.max_retries:
+                    self._failures += 1
+                    metrics.inc("embedding_batch_failures_total", model=self.name)
+                    logger.error(f"Embedding batch of {len(batch)} failed after {attempt} retries: {str(e)}")
+                    raise
+                delay = self.retry_base_delay * (2 ** attempt)
+                attempt += 1
+                self._retries += 1
+                metrics.inc("embedding_batch_retries_total", model=self.name)
+                logger.warning(f"Embedding batch of {len(batch)} failed, retry {attempt} in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+
+            elapsed = time.perf_counter() - started
+            self._record(len(batch), elapsed)
+            if elapsed > self.target_batch_seconds:
+                self._decrease(size)
+            elif size == self.batch_size and len(batch) == size:
+                grown = self.batch_size * 2 if self._slow_start else self.batch_size + self.increase
+                self.batch_size = self._clamp(grown)
+            metrics.set_gauge("embedding_batch_size", self.batch_size, model=self.name)
+            return [np.asarray(vector, dtype=np.float32) for vector in vectors]
+
+    def _record(self, size: int, elapsed: float) -> None:
+        """Per-batch throughput metrics."""
+        self._batches += 1
+        self._chunks += size
+        self._busy_seconds += elapsed
+        self._last_chunks_per_second = round(size / elapsed, 2) if elapsed > 0 else None
+        metrics.observe("embedding_batch_seconds", elapsed, model=self.name)
+        metrics.inc("embedding_chunks_total", size, model=self.name)
+        if elapsed > 0:
+            metrics.observe("embedding_batch_chunks_per_second", size / elapsed, model=self.name)
+
+    def _decrease(self, size: int) -> None:
+        """Halve the batch size, unless another batch cut at `size` already did."""
+        if size == self.batch_size:
+            self._slow_start = False
+            self.batch_size = self._clamp(self.batch_size // 2)
+
+    def _clamp(self, batch_size: int) -> int:
+        return max(self.min_batch_size, min(self.max_batch_size, batch_size))
@@ -1,10 +1,17 @@
 import asyncio
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 from functools import partial
+import numpy as np
 from langchain_ollama import OllamaEmbeddings
 from app.services.rag.base import BaseEmbeddings
+from app.services.rag.query_embedding_cache import QueryEmbeddingCache
+from app.services.rag.embedding_cache import DocumentEmbeddingCache
+from app.services.rag.embedding_pipeline import EmbeddingPipeline
+from app.services.model_providers.transport import get_async_client
 from app.config import settings
 from app.utils.logger import get_logger
+from app.utils.single_flight import SingleFlight
 
 logger = get_logger(__name__)
 
@@ -21,6 +28,8 @@ class OllamaEmbeddingService(BaseEmbeddings):
             model_name: str = "nomic-embed-text",
             base_url: Optional[str] = None,
             dimensions: Optional[int] = None,
+            query_cache: Optional[QueryEmbeddingCache] = None,
+            document_cache: Optional[DocumentEmbeddingCache] = None
     ):
         """
         Initialize the Ollama embedding service.
@@ -28,7 +37,9 @@ class OllamaEmbeddingService(BaseEmbeddings):
         Args:
             model_name: Name of the embedding model in Ollama
             base_url: URL for ollama API(defaults to settings.OLLAMA_HOST)
-            dimensions: output dimensions for embeddings (model-dependent)"""
+            dimensions: output dimensions for embeddings (model-dependent)
+            query_cache: Cache for query embeddings (created from settings if omitted)
+            document_cache: Persistent cache for document embeddings (created from settings if omitted)"""
         
         self.model_name = model_name
         self.base_url = base_url or settings.OLLAMA_HOST
@@ -40,6 +51,20 @@ class OllamaEmbeddingService(BaseEmbeddings):
             base_url=self.base_url
         )
 
+        # Repeated queries reuse their vector; concurrent identical ones share one call
+        self.query_cache = None
+        if settings.QUERY_EMBEDDING_CACHE_ENABLED:
+            self.query_cache = query_cache or QueryEmbeddingCache()
+        self.single_flight = SingleFlight("embed_query")
+
+        # Document embeddings are sent in concurrent, adaptively sized batches
+        self.pipeline = EmbeddingPipeline(self._embed_batch, name=self.model_name)
+
+        # Chunks embedded before (by any worker, before any restart) aren't sent again
+        self.document_cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.document_cache = document_cache or DocumentEmbeddingCache()
+
         logger.info(f"Initialized OllamaEmbeddingService with model: {model_name}")
 
     async def embed_documents(self, texts: List[str]) -> List[List[float]]:
@@ -53,20 +78,80 @@ class OllamaEmbeddingService(BaseEmbeddings):
             List of embedding vectors (as a list of floats)"""
         if not texts:
             return []
-        
+        return (await self.embed_documents_array(texts)).tolist()
+
+    async def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for a list of documents as a float32 matrix.
+
+        Chunks found in the document embedding cache aren't sent to Ollama,
+        and identical chunks in the batch are embedded once.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            One row per text
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.document_cache is None:
+            return await self._embed_documents(texts)
+
         try:
-            # Run in thread pool as Ollama embeddings are synchronous
-            loop= asyncio.get_event_loop()
-            embeddings = await loop.run_in_executor(
-                None,
-                partial(self.ollama_embeddings.embed_documents, texts)
-            )
+            cached = await self.document_cache.get_many(self.model_name, texts)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed, embedding every chunk: {str(e)}")
+            cached = [None] * len(texts)
+
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        fresh: Dict[str, Any] = {}
+        if missing:
+            # Stored batch by batch, so if the upload fails partway, a retry only embeds the rest
+            vectors = await self._embed_documents(missing, on_batch=self._store_batch)
+            fresh = dict(zip(missing, vectors))
+
+        logger.info(f"Embedded {len(missing)} chunks, {len(texts) - len(missing)} from the embedding cache")
+        return np.asarray(
+            [vector if vector is not None else fresh[text] for text, vector in zip(texts, cached)],
+            dtype=np.float32
+        )
+
+    async def _store_batch(self, texts: List[str], vectors: List[np.ndarray]) -> None:
+        """Put one embedded batch into the document embedding cache."""
+        try:
+            await self.document_cache.put_many(self.model_name, texts, vectors)
+        except Exception as e:
+            logger.warning(f"Could not store embeddings in the cache: {str(e)}")
+
+    async def _embed_documents(
+        self,
+        texts: List[str],
+        on_batch: Optional[Callable[[List[str], List[np.ndarray]], Awaitable[None]]] = None
+    ) -> np.ndarray:
+        """Embed documents through Ollama, in batches, passing each finished batch to on_batch."""
+        try:
+            embeddings = await self.pipeline.embed(texts, on_batch=on_batch)
             logger.debug(f"Generated embeddings for {len(texts)} documents")
             return embeddings
         except Exception as e:
             logger.error(f"Error generating document embeddings: {str(e)}")
             raise
 
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch with a single /api/embed request."""
+        if settings.OLLAMA_TRANSPORT == "async":
+            # Shared, pooled client, so concurrent batches reuse connections
+            response = await get_async_client(self.base_url).embed(model=self.model_name, input=texts)
+            return response["embeddings"]
+
+        # Run in thread pool as Ollama embeddings are synchronous
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(self.ollama_embeddings.embed_documents, texts)
+        )
+
     async def embed_query(self, text: str) -> List[float]:
         """
         Generate an embedding for single query text.
@@ -77,20 +162,60 @@ class OllamaEmbeddingService(BaseEmbeddings):
         Returns:
             Embedding vector as a list of floats
         """
+        return (await self.embed_query_array(text)).tolist()
+
+    async def embed_query_array(self, text: str) -> np.ndarray:
+        """
+        Generate an embedding for single query text as a float32 array.
+
+        Served from the query cache when the same (normalized) query was
+        embedded recently. The array is shared with the cache: don't modify it.
+
+        Args:
+            text: Query text to embed
+
+        Returns:
+            Embedding vector (empty for blank text)
+        """
         if not text.strip():
-            return []
-        
+            return np.empty(0, dtype=np.float32)
+
+        key = QueryEmbeddingCache.make_key(self.model_name, text)
+        if self.query_cache is not None:
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                return cached
+        return await self.single_flight.do(key, lambda: self._fetch_query(key, text))
+
+    async def _fetch_query(self, key: str, text: str) -> np.ndarray:
+        """Embed a query through Ollama and cache the vector."""
         try:
+            started = time.perf_counter()
             # Run in thread pool as Ollama embeddings are synchronous
             loop = asyncio.get_event_loop()
             embedding = await loop.run_in_executor(
                 None,
                 partial(self.ollama_embeddings.embed_query, text)
             )
+            elapsed = time.perf_counter() - started
             logger.debug("Generated embedding for query")
 
-            return embedding
-        
+            if self.query_cache is not None:
+                return self.query_cache.set(key, embedding, elapsed)
+            return np.asarray(embedding, dtype=np.float32)
+
         except Exception as e:
             logger.error(f"Error generating query embedding: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def pipeline_stats(self) -> Dict[str, Any]:
+        """Batch size, retries and throughput of the document embedding pipeline."""
+        return self.pipeline.stats()
+
+    async def document_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Document embedding cache statistics, or None when it's disabled."""
+        return await self.document_cache.stats() if self.document_cache is not None else None
+
+    def query_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Query embedding cache statistics, or None when it's disabled."""
+        return self.query_cache.stats() if self.query_cache is not None else None
\ No newline at end of file
@@ -0,0 +1,353 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+MANIFEST = "manifest.json"
+# Base written by FAISS.save_local before segments existed
+LEGACY_BASE = "index"
+_LOCK_FILE = ".lock"
+_STAGING_PREFIX = ".staging-"
+# Staging directories older than this are left over from a crash
+_STAGING_MAX_AGE_SECONDS = 3600.0
+# A concurrent compaction may delete the base being read; read the new manifest and retry
+_LOAD_ATTEMPTS = 3
+
+
+class SegmentWrite:
+    """Signatures of a collection's files before and after a write, and its segment stats."""
+
+    __slots__ = ("before", "after", "stats")
+
+    def __init__(self, before: Optional[Tuple[int, ...]], after: Optional[Tuple[int, ...]], stats: Dict[str, Any]):
+        self.before = before
+        self.after = after
+        self.stats = stats
+
+
+class IndexSegments:
+    """
+    Segmented on-disk format of a FAISS collection.
+
+    A collection is a base index (`<base>.faiss` and `<base>.pkl`, as written
+    by FAISS.save_local) plus delta segments, each holding the ids, texts,
+    metadata and vectors of one upload. `manifest.json` lists the base and the
+    segments in order. Adding documents appends a segment, so persisting an
+    upload costs the size of the upload rather than of the collection; loading
+    reads the base and replays the segments.
+
+    Every file is written under a temporary name, fsynced and renamed into
+    place, and the manifest is replaced last, so a crash mid-write leaves the
+    previous manifest intact and at worst some unreferenced files, which are
+    removed later. Compaction merges the base and segments into a new base; it
+    reads and writes outside the lock, so uploads continue meanwhile.
+
+    Writers take turns on the manifest through a thread lock and, where
+    available, flock on `.lock`, which also covers other workers on the same
+    host. A collection saved in the old format (just index.faiss/index.pkl)
+    becomes the base of its first manifest.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the segment files of a collection.
+
+        Args:
+            path: The collection's directory
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def signature(self) -> Optional[Tuple[int, ...]]:
+        """
+        Identity of the collection's current state on disk.
+
+        Returns:
+            A tuple that changes whenever the manifest (or, for an old-format
+            collection, its index files) does, or None if there is no index
+        """
+        try:
+            # Replaced on every write, so the inode changes even if the size doesn't
+            stat = os.stat(os.path.join(self.path, MANIFEST))
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+
+        signature = []
+        for file_name in (f"{LEGACY_BASE}.faiss", f"{LEGACY_BASE}.pkl"):
+            try:
+                stat = os.stat(os.path.join(self.path, file_name))
+            except FileNotFoundError:
+                return None
+            signature.extend((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def exists(self) -> bool:
+        """Whether there is a persisted index."""
+        return self.signature() is not None
+
+    def load(self, embeddings: Any) -> Tuple[FAISS, Dict[str, Any]]:
+        """
+        Read the base index and replay the segments.
+
+        Args:
+            embeddings: LangChain embeddings the index is created with
+
+        Returns:
+            The index and its segment stats
+        """
+        for attempt in range(_LOAD_ATTEMPTS):
+            manifest = self._read_manifest() or self._new_manifest(LEGACY_BASE)
+            try:
+                return self._replay(manifest, embeddings), self._stats(manifest)
+            except FileNotFoundError:
+                if attempt == _LOAD_ATTEMPTS - 1:
+                    raise
+                logger.info(f"Files of {self.path} were compacted while loading, retrying")
+
+    def persist(
+        self,
+        faiss_index: FAISS,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        vectors: Sequence[Any],
+        full: bool = False
+    ) -> SegmentWrite:
+        """
+        Persist documents just added to the index.
+
+        Appends them as a segment, or writes the whole index as a new base if
+        there is none yet or `full` is set.
+
+        Args:
+            faiss_index: The index the documents were added to
+            ids: Their docstore ids
+            texts: Their texts
+            metadatas: Their metadata
+            vectors: Their embeddings
+            full: Rewrite the whole index instead of appending
+
+        Returns:
+            Signatures before and after, and the segment stats
+        """
+        with self._locked():
+            before = self.signature()
+            manifest = self._read_manifest() or self._new_manifest(LEGACY_BASE)
+            if full or before is None:
+                self._install_base(self._stage_base(faiss_index), manifest, replaced_segments=len(manifest["segments"]))
+            else:
+                name = f"segment-{manifest['next_segment']:08d}.pkl"
+                segment = {
+                    "ids": list(ids),
+                    "texts": list(texts),
+                    "metadatas": list(metadatas),
+                    "vectors": np.asarray(vectors, dtype=np.float32)
+                }
+                self._write_file(name, pickle.dumps(segment, protocol=pickle.HIGHEST_PROTOCOL))
+                manifest["segments"].append(name)
+                manifest["next_segment"] += 1
+                self._write_manifest(manifest)
+            return SegmentWrite(before, self.signature(), self._stats(manifest))
+
+    def needs_compaction(self, stats: Dict[str, Any]) -> bool:
+        """
+        Whether the segments should be merged into the base.
+
+        Args:
+            stats: Segment stats from load(), persist() or compact()
+
+        Returns:
+            True once there are too many segments or they are large relative to the base
+        """
+        if not stats["segments"]:
+            return False
+        return (
+            stats["segments"] >= settings.RAG_COMPACT_MAX_SEGMENTS
+            or stats["segment_bytes"] >= stats["base_bytes"] * settings.RAG_COMPACT_SEGMENT_RATIO
+        )
+
+    def compact(self, embeddings: Any) -> Optional[SegmentWrite]:
+        """
+        Merge the base and the current segments into a new base.
+
+        Segments appended while compacting are kept after the new base.
+
+        Args:
+            embeddings: LangChain embeddings the index is created with
+
+        Returns:
+            Signatures before and after the swap, and the segment stats, or
+            None if there was nothing to do or another writer compacted first
+        """
+        with self._locked():
+            manifest = self._read_manifest()
+        if manifest is None or not manifest["segments"]:
+            return None
+
+        staged = self._stage_base(self._replay(manifest, embeddings))
+
+        with self._locked():
+            before = self.signature()
+            current = self._read_manifest()
+            merged = len(manifest["segments"])
+            if (
+                current is None
+                or current["base"] != manifest["base"]
+                or current["segments"][:merged] != manifest["segments"]
+            ):
+                shutil.rmtree(staged[1], ignore_errors=True)
+                logger.info(f"Skipped compaction of {self.path}, it was rewritten meanwhile")
+                return None
+            self._install_base(staged, current, replaced_segments=merged)
+            return SegmentWrite(before, self.signature(), self._stats(current))
+
+    def _replay(self, manifest: Dict[str, Any], embeddings: Any) -> FAISS:
+        """Build the index from a manifest's base and segments."""
+        faiss_index = FAISS.load_local(
+            self.path,
+            embeddings,
+            index_name=manifest["base"],
+            allow_dangerous_deserialization=True # Allow loading of potentially unsafe data
+        )
+        for name in manifest["segments"]:
+            with open(os.path.join(self.path, name), "rb") as f:
+                segment = pickle.load(f)
+            faiss_index.add_embeddings(
+                list(zip(segment["texts"], segment["vectors"])),
+                metadatas=segment["metadatas"],
+                ids=segment["ids"]
+            )
+        return faiss_index
+
+    def _stage_base(self, faiss_index: FAISS) -> Tuple[str, str]:
+        """Write an index to a staging directory; returns its base name and the directory."""
+        name = f"base-{uuid.uuid4().hex[:12]}"
+        staging = os.path.join(self.path, f"{_STAGING_PREFIX}{name}")
+        faiss_index.save_local(staging, index_name=name)
+        for extension in (".faiss", ".pkl"):
+            self._fsync(os.path.join(staging, name + extension))
+        return name, staging
+
+    def _install_base(self, staged: Tuple[str, str], manifest: Dict[str, Any], replaced_segments: int) -> None:
+        """Move a staged base into place and make it the manifest's base (under the lock)."""
+        name, staging = staged
+        for extension in (".faiss", ".pkl"):
+            os.replace(os.path.join(staging, name + extension), os.path.join(self.path, name + extension))
+        os.rmdir(staging)
+
+        manifest["base"] = name
+        manifest["segments"] = manifest["segments"][replaced_segments:]
+        self._write_manifest(manifest)
+        self._remove_unreferenced(manifest)
+
+    def _remove_unreferenced(self, manifest: Dict[str, Any]) -> None:
+        """Delete bases and segments the manifest no longer lists, and leftovers of crashed writes."""
+        referenced = {f"{manifest['base']}.faiss", f"{manifest['base']}.pkl", *manifest["segments"]}
+        now = time.time()
+        for file_name in os.listdir(self.path):
+            path = os.path.join(self.path, file_name)
+            try:
+                if file_name.startswith(_STAGING_PREFIX):
+                    # Possibly another worker's compaction in progress
+                    if now - os.stat(path).st_mtime > _STAGING_MAX_AGE_SECONDS:
+                        shutil.rmtree(path, ignore_errors=True)
+                elif file_name in referenced or file_name in (MANIFEST, _LOCK_FILE):
+                    continue
+                elif (
+                    file_name.startswith(("base-", "segment-", f"{LEGACY_BASE}."))
+                    or file_name.endswith(".tmp")
+                ):
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+
+    def _stats(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """Number and size of the segments, and the size of the base."""
+        return {
+            "base_bytes": sum(
+                self._size(f"{manifest['base']}{extension}") for extension in (".faiss", ".pkl")
+            ),
+            "segments": len(manifest["segments"]),
+            "segment_bytes": sum(self._size(name) for name in manifest["segments"])
+        }
+
+    def _size(self, file_name: str) -> int:
+        try:
+            return os.path.getsize(os.path.join(self.path, file_name))
+        except FileNotFoundError:
+            return 0
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path, MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _new_manifest(self, base: str) -> Dict[str, Any]:
+        return {"format": 1, "base": base, "segments": [], "next_segment": 1}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        self._write_file(MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+        self._fsync_directory()
+
+    def _write_file(self, file_name: str, data: bytes) -> None:
+        """Write a file atomically: temporary file, fsync, rename."""
+        path = os.path.join(self.path, file_name)
+        temporary = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def _fsync(self, path: str) -> None:
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+    def _fsync_directory(self) -> None:
+        """Make the renames durable (not supported on every platform)."""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive access to the manifest, for this process's threads and other workers."""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, _LOCK_FILE), "a") as lock_file:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if FCNTL_AVAILABLE:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
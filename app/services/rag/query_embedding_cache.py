@@ -0,0 +1,156 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _CachedEmbedding:
+    """A query vector, when it expires and what it cost to compute."""
+
+    __slots__ = ("vector", "expires_at", "fetch_seconds")
+
+    def __init__(self, vector: np.ndarray, expires_at: float, fetch_seconds: float):
+        self.vector = vector
+        self.expires_at = expires_at
+        self.fetch_seconds = fetch_seconds
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU + TTL cache of query embeddings.
+
+    Keyed by embedding model and normalized query text (Unicode NFC, runs of
+    whitespace collapsed, ends stripped), so retries and repeated lookups of
+    the same question skip the Ollama round trip. Vectors are kept as
+    read-only float32 arrays, about a quarter of the size of a list of floats.
+
+    Every hit counts the latency of the call that filled the entry as saved.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Max cached vectors (least recently used are evicted)
+            ttl_seconds: How long a vector is reused
+        """
+        self.max_entries = max_entries or settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+
+        # Least recently used first
+        self._entries: "OrderedDict[str, _CachedEmbedding]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """
+        Build a cache key from the embedding model and the normalized query.
+
+        Args:
+            model: Embedding model name
+            text: Query text
+
+        Returns:
+            Cache key
+        """
+        normalized = _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+        return f"{model}\0{normalized}"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up a query vector.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            The cached vector, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._record(True, entry.fetch_seconds)
+                return entry.vector
+            del self._entries[key]
+        self._record(False)
+        return None
+
+    def set(self, key: str, vector: np.ndarray, fetch_seconds: float) -> np.ndarray:
+        """
+        Store a query vector.
+
+        Args:
+            key: Key from make_key()
+            vector: The embedding
+            fetch_seconds: How long computing it took
+
+        Returns:
+            The stored (float32, read-only) vector
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self._entries[key] = _CachedEmbedding(vector, time.monotonic() + self.ttl_seconds, fetch_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            metrics.inc("query_embedding_cache_evictions_total")
+        metrics.set_gauge("query_embedding_cache_entries", len(self._entries))
+        return vector
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+        metrics.set_gauge("query_embedding_cache_entries", 0)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy, hit rate and the Ollama time saved by hits."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "bytes": sum(entry.vector.nbytes for entry in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+            "saved_seconds": round(self.saved_seconds, 4)
+        }
+
+    def _record(self, hit: bool, saved_seconds: float = 0.0) -> None:
+        """Update hit/miss counters."""
+        if hit:
+            self.hits += 1
+            self.saved_seconds += saved_seconds
+            metrics.inc("query_embedding_cache_hits_total")
+            metrics.inc("query_embedding_cache_saved_seconds_total", saved_seconds)
+        else:
+            self.misses += 1
+            metrics.inc("query_embedding_cache_misses_total")
+        metrics.set_gauge("query_embedding_cache_hit_ratio", self.hit_rate)
@@ -1,15 +1,21 @@
 import os
+import sys
 import asyncio
 import tempfile
 import shutil
-from typing import List, Optional, Dict, Any
+import time
+from typing import List, Optional, Dict, Any, Tuple
 from functools import partial
 
+import numpy as np
 from langchain.schema import Document
 from langchain_community.vectorstores import FAISS
 from app.services.rag.base import BaseVectorStore, BaseEmbeddings
 from app.services.rag.embeddings import OllamaEmbeddingService
+from app.services.rag.index_segments import IndexSegments, SegmentWrite
+from app.config import settings
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
 
 logger = get_logger(__name__)
 
@@ -41,6 +47,10 @@ class FAISSVectorStore(BaseVectorStore):
         self.collection_name = collection_name
         self.index_kwargs = index_kwargs or {}
         self.faiss_index = None
+        # Signature of the files the index was loaded from or last saved to
+        self.loaded_signature: Optional[Tuple[int, ...]] = None
+        # Serializes writes; concurrent adds to a shared index would race
+        self._write_lock = asyncio.Lock()
 
         # Create directory for persisting if needed
         if self.persist_directory and not os.path.exists(self.persist_directory):
@@ -48,28 +58,104 @@ class FAISSVectorStore(BaseVectorStore):
             logger.info(f"Created persistent directory at {self.persist_directory}")
 
         self.index_path = os.path.join(self.persist_directory, self.collection_name) if self.persist_directory else None
+        # Base index + delta segments on disk; uploads append a segment
+        self.segments = IndexSegments(self.index_path) if self.index_path else None
+        self._segment_stats: Dict[str, Any] = {}
+        self._compaction: Optional[asyncio.Future] = None
+        self._compactions = 0
+        self._last_persist_seconds: Optional[float] = None
 
         logger.info(f"Initialized FAISS vector store with collection: {self.collection_name}")
 
+    @property
+    def writing(self) -> bool:
+        """Whether documents are being added or segments compacted (and the files on disk are about to change)."""
+        return self._write_lock.locked() or self.compacting
+
+    @property
+    def compacting(self) -> bool:
+        """Whether a background compaction is running."""
+        return self._compaction is not None and not self._compaction.done()
+
+    def disk_signature(self) -> Optional[Tuple[int, ...]]:
+        """
+        Identity of the persisted index (its manifest, or the files of an old-format index).
+
+        Returns:
+            A tuple that changes whenever the files do, or None if there are none
+        """
+        if self.segments is None:
+            return None
+        return self.segments.signature()
+
+    def persistence_stats(self) -> Dict[str, Any]:
+        """Segments and their size against the base, compactions and the last upload's persist time."""
+        return {
+            **self._segment_stats,
+            "segmented": settings.RAG_SEGMENTED_PERSISTENCE,
+            "compacting": self.compacting,
+            "compactions": self._compactions,
+            "last_persist_seconds": self._last_persist_seconds
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the loaded index: vectors plus document texts."""
+        if self.faiss_index is None:
+            return 0
+        index = self.faiss_index.index
+        size = index.ntotal * index.d * 4  # float32 vectors
+        for document in self.faiss_index.docstore._dict.values():
+            size += sys.getsizeof(document.page_content) + sys.getsizeof(document.metadata)
+        return size
+
+    @property
+    def vector_count(self) -> int:
+        """Number of vectors in the loaded index."""
+        return self.faiss_index.index.ntotal if self.faiss_index is not None else 0
+
+    async def load(self) -> None:
+        """Load the index now rather than on first use."""
+        await self._init_or_load_index()
+
+    async def reload(self) -> None:
+        """
+        Load the persisted index again, e.g. after another process changed it.
+
+        Searches already running keep using the previous index. If the files
+        are gone, the index is dropped and the next use starts a new one.
+        """
+        async with self._write_lock:
+            signature = self.disk_signature()
+            if signature is None:
+                self.faiss_index = None
+                self.loaded_signature = None
+                logger.info(f"FAISS index {self.index_path} was deleted, dropped the loaded copy")
+                return
+            self.faiss_index = await self._load_local()
+            self.loaded_signature = signature
+        logger.info(f"Reloaded FAISS index from {self.index_path}")
+
+    async def _load_local(self) -> FAISS:
+        """Read the persisted base index and replay its segments in a worker thread."""
+        # Use a thread pool as FAISS operations are CPU-bound
+        loop = asyncio.get_event_loop()
+        faiss_index, self._segment_stats = await loop.run_in_executor(
+            None,
+            partial(self.segments.load, self.embedding_service.ollama_embeddings)
+        )
+        return faiss_index
+
     async def _init_or_load_index(self):
         """Initialize or load the FAISS index if it doesn't exist."""
         if self.faiss_index is not None:
             return
         
         # Check if we have a persisted index to load
-        if self.index_path and os.path.exists(self.index_path):
+        if self.segments is not None and self.segments.exists():
             try:
-                # Use a thread pool as FAISS operations are CPU-bound
-                loop = asyncio.get_event_loop()
-                self.faiss_index = await loop.run_in_executor(
-                    None,
-                    partial(
-                        FAISS.load_local,
-                        self.index_path,
-                        self.embedding_service.ollama_embeddings,
-                        allow_dangerous_deserialization=True # Allow loading of potentially unsafe data
-                    )
-                )
+                signature = self.disk_signature()
+                self.faiss_index = await self._load_local()
+                self.loaded_signature = signature
                 logger.info(f"Loading existing FAISS index from {self.index_path}")
             except Exception as e:
                 logger.error(f"Error loading FAISS index: {str(e)}")
@@ -101,27 +187,94 @@ class FAISSVectorStore(BaseVectorStore):
             return
         
         try:
-            await self._init_or_load_index()
+            # Embedded through the service (and its embedding cache) before
+            # taking the write lock, so searches and other writes aren't held up
+            texts = [document.page_content for document in documents]
+            vectors = await self.embedding_service.embed_documents_array(texts)
+            ids = [document.id for document in documents]
+            metadatas = [document.metadata for document in documents]
 
-            # Use a thread pool FAISS operations cpu-bound
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                partial(self.faiss_index.add_documents, documents)
-            )
+            async with self._write_lock:
+                await self._init_or_load_index()
 
-            # Persist index if a directory is specified
-            if self.persist_directory:
-                await loop.run_in_executor(
+                # Use a thread pool FAISS operations cpu-bound
+                loop = asyncio.get_event_loop()
+                ids = await loop.run_in_executor(
                     None,
-                    partial(self.faiss_index.save_local, self.index_path)
+                    partial(
+                        self.faiss_index.add_embeddings,
+                        list(zip(texts, vectors)),
+                        metadatas=metadatas,
+                        ids=ids if any(ids) else None
+                    )
                 )
-            
+
+                # Persist index if a directory is specified
+                if self.segments is not None:
+                    await self._persist(ids, texts, metadatas, vectors)
+
             logger.info(f"Added {len(documents)} documents to FAISS index")
         except Exception as e:
             logger.error(f"Error adding documents to FAISS index: {str(e)}")
             raise
 
+    async def _persist(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]], vectors: Any) -> None:
+        """Append the added documents as a segment (or rewrite the index), then compact if due."""
+        started = time.perf_counter()
+        loop = asyncio.get_event_loop()
+        write = await loop.run_in_executor(
+            None,
+            partial(
+                self.segments.persist,
+                self.faiss_index,
+                ids,
+                texts,
+                metadatas,
+                vectors,
+                # A fresh index (new collection, or the files failed to load) replaces whatever is on disk
+                full=not settings.RAG_SEGMENTED_PERSISTENCE or self.loaded_signature is None
+            )
+        )
+        self._last_persist_seconds = round(time.perf_counter() - started, 4)
+        metrics.observe(
+            "rag_persist_seconds",
+            self._last_persist_seconds,
+            mode="segment" if settings.RAG_SEGMENTED_PERSISTENCE else "full"
+        )
+        self._record_write(write)
+
+        if not self.compacting and self.segments.needs_compaction(write.stats):
+            self._compaction = asyncio.ensure_future(self._compact())
+
+    async def _compact(self) -> None:
+        """Merge the segments into a new base in a worker thread; uploads carry on meanwhile."""
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_event_loop()
+            write = await loop.run_in_executor(
+                None,
+                partial(self.segments.compact, self.embedding_service.ollama_embeddings)
+            )
+        except Exception as e:
+            logger.error(f"Error compacting FAISS index {self.index_path}: {str(e)}")
+            return
+        if write is None:
+            return
+
+        elapsed = time.perf_counter() - started
+        self._compactions += 1
+        self._record_write(write)
+        metrics.inc("rag_compactions_total")
+        metrics.observe("rag_compaction_seconds", elapsed)
+        logger.info(f"Compacted FAISS index {self.index_path} in {elapsed:.2f}s")
+
+    def _record_write(self, write: SegmentWrite) -> None:
+        """Track our own write, unless another worker had changed the files before it."""
+        self._segment_stats = write.stats
+        # Otherwise the loaded index is missing their changes; keep it stale so it's reloaded
+        if write.before == self.loaded_signature:
+            self.loaded_signature = write.after
+
     async def similarity_search(self, query: str, k: int = 4) -> List[Document]:
         """
         Perform similarity search for the query.
@@ -139,14 +292,9 @@ class FAISSVectorStore(BaseVectorStore):
             return []
 
         try:
-            await self._init_or_load_index()
-
-            # Use a thread pool as FAISS operations are CPU-bound
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(
-                None,
-                partial(self.faiss_index.similarity_search, query, k)
-            )
+            # Embedded through the service so repeated queries hit its cache
+            vector = await self.embedding_service.embed_query_array(query)
+            results = await self.similarity_search_by_vector(vector, k)
             
             logger.info(f"Found {len(results)} documents for query: {query[:50]}...")
             return results
@@ -154,12 +302,36 @@ class FAISSVectorStore(BaseVectorStore):
             logger.error(f"Error during similarity search: {str(e)}")
             raise
 
+    async def similarity_search_by_vector(self, vector: np.ndarray, k: int = 4) -> List[Document]:
+        """
+        Perform similarity search for an already embedded query.
+
+        Args:
+            vector: The query embedding
+            k: Number of docs to return
+
+        Returns:
+            List of docs sorted by relevance
+        """
+        await self._init_or_load_index()
+
+        # Use a thread pool as FAISS operations are CPU-bound
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            partial(self.faiss_index.similarity_search_by_vector, vector, k)
+        )
+
 
 
     async def delete_collection(self) -> None:
         """Delete the entire collection from the vector store."""
         try:
+            if self.compacting:
+                # Would otherwise write into the directory being deleted
+                await asyncio.shield(self._compaction)
             self.faiss_index = None
+            self.loaded_signature = None
     
             if self.persist_directory and os.path.exists(os.path.join(self.persist_directory, self.collection_name)):
                 collection_dir = os.path.join(self.persist_directory, self.collection_name)
@@ -1,13 +1,14 @@
 from typing import List, Dict, Any, Optional, Union, BinaryIO
 import asyncio
 from langchain.schema import Document
-from langchain.chains import RetrievalQA
+from langchain.chains.question_answering import load_qa_chain
 from langchain_community.llms import Ollama
 from pathlib import Path
 
 from app.models.rag_schemas import DocumentChunk, DocumentMetadata, RAGRequest, RAGResponse
 from app.services.rag.embeddings import OllamaEmbeddingService
 from app.services.rag.vector_store import FAISSVectorStore
+from app.services.rag.collection_registry import CollectionRegistry
 from app.services.rag.document_store import FileSystemDocumentStore
 from app.services.rag.retriever import VectorStoreRetriever
 from app.utils.document_processors.text_splitter import DocumentSplitter
@@ -59,6 +60,13 @@ class RAGService:
         self.default_collection = default_collection
         self.persist_directory = persist_directory
 
+        # Loaded collections stay resident and are shared across requests
+        self.collections = CollectionRegistry(
+            embedding_service=self.embedding_service,
+            persist_directory=persist_directory
+        )
+        self.collections.pin(self.vector_store)
+
         logger.info(f"Initialized RAG service with collection: {default_collection}")
 
     async def process_file(
@@ -162,17 +170,11 @@ class RAGService:
             )
 
         # Use the specified collection's vector store
-        vector_store = (
-            self.vector_store if collection_name == self.default_collection
-            else FAISSVectorStore(
-                embedding_service=self.embedding_service,
-                persist_directory=self.persist_directory,
-                collection_name=collection_name
-            )
-        )
+        vector_store = await self.collections.get(collection_name)
 
         #Store documents in vector Database
         await vector_store.add_documents(langchain_docs)
+        await self.collections.refresh(collection_name)
         logger.info(f"Added {len(langchain_docs)} documents to vector store collection: {collection_name}")
         return document_ids
 
@@ -196,18 +198,9 @@ class RAGService:
         """
         logger.info(f"Retrieving relevant documents for query: {query[:50]}...")
 
-        # If a different collection is specified, create a retriever for it
-        if collection_name and collection_name != self.default_collection:
-            vector_store = FAISSVectorStore(
-                embedding_service=self.embedding_service,
-                persist_directory=self.persist_directory,
-                collection_name=collection_name
-            )
-            retriever = VectorStoreRetriever(vector_store=vector_store)
-        else:
-            # use the default retriever
-            retriever = VectorStoreRetriever(vector_store=self.vector_store)
-
+        # Use the collection's resident vector store (the default one if none is specified)
+        vector_store = await self.collections.get(collection_name or self.default_collection)
+        retriever = VectorStoreRetriever(vector_store=vector_store)
 
         # Retrieve documents
         documents = await retriever.retrieve(query, top_k=top_k)
@@ -252,34 +245,25 @@ class RAGService:
                 embedding_model=self.embedding_service.model_name
             )
         
-        # Create a retriever object
-
-        retriever = VectorStoreRetriever(
-            vector_store=self.vector_store
-        )
-
-        # Set up a RetrievalQA chain
+        # Set up a QA chain over the retrieved documents (a RetrievalQA
+        # chain would embed the query and search the index a second time)
         llm = Ollama(model=model_name)
-        qa_chain = RetrievalQA.from_chain_type(
+        qa_chain = load_qa_chain(
             llm=llm,
-            chain_type="stuff", # Simple method that stuffs all documents into prompts
-            retriever=retriever.vector_store.faiss_index.as_retriever(
-                search_kwargs={"k": request.num_results}
-            ),
-            return_source_documents=True
+            chain_type="stuff" # Simple method that stuffs all documents into prompts
         )
 
-        # Generate response (run synchronously as LangChain's RetrievalQA does not support async)
+        # Generate response (run synchronously as LangChain's QA chains do not support async)
         loop = asyncio.get_event_loop()
         chain_response = await loop.run_in_executor(
             None,
-            lambda: qa_chain({"query": request.query})
+            lambda: qa_chain({"input_documents": documents, "question": request.query})
         )
 
 
         # Extract answer and source documents
-        answer = chain_response.get("result", "")
-        source_docs = chain_response.get("source_documents", [])
+        answer = chain_response.get("output_text", "")
+        source_docs = documents
 
         # Convert source documents to DocumentChunk objects
         sources = []
@@ -316,15 +300,8 @@ class RAGService:
         """
         logger.info(f"Deleting collection: {collection_name}")
 
-        # Create a vector store instance for the collection
-
-        vector_store = FAISSVectorStore(
-            embedding_service=self.embedding_service,
-            persist_directory=self.persist_directory,
-            collection_name=collection_name
-        )
-
-        await vector_store.delete_collection()
+        # Unload the collection and delete its files
+        await self.collections.delete(collection_name)
 
         # Note This doesn't delete documents from the document store
         # as that would require tracking which document IDs belong to which collection
@@ -355,4 +332,43 @@ class RAGService:
             logger.error(f"Error listing collections: {str(e)}")
             return []
 
+    def collection_stats(self) -> Dict[str, Any]:
+        """
+        Resident collections and their memory use, hits and load times.
+
+        Returns:
+            Collection registry statistics
+        """
+        return self.collections.stats()
+
+    async def embedding_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Document embedding cache size, hit rate and evictions.
+
+        Returns:
+            Cache statistics, or None when the cache is disabled
+        """
+        document_cache_stats = getattr(self.embedding_service, "document_cache_stats", None)
+        return await document_cache_stats() if document_cache_stats is not None else None
+
+    def embedding_pipeline_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Current batch size, retries and throughput of document embedding.
+
+        Returns:
+            Pipeline statistics, or None if the embedding service has no pipeline
+        """
+        pipeline_stats = getattr(self.embedding_service, "pipeline_stats", None)
+        return pipeline_stats() if pipeline_stats is not None else None
+
+    def query_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Query embedding cache hit rate and the embedding time it saved.
+
+        Returns:
+            Cache statistics, or None when the cache is disabled
+        """
+        query_cache_stats = getattr(self.embedding_service, "query_cache_stats", None)
+        return query_cache_stats() if query_cache_stats is not None else None
+
 
@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.models.schemas import Message
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class ResponseCache:
+    """
+    Cache for deterministic model generations.
+
+    Two tiers:
+    - a bounded in-memory LRU (always on)
+    - an optional on-disk tier of JSON files, shared across restarts
+
+    Entries expire after a TTL in both tiers; an entry promoted from disk to
+    memory keeps its original expiry. The disk tier isn't size-bounded or
+    swept: expired files are only deleted when they are read.
+    """
+
+    def __init__(
+            self,
+            max_entries: Optional[int] = None,
+            ttl_seconds: Optional[float] = None,
+            max_temperature: Optional[float] = None,
+            disk_path: Optional[str] = None,
+            enabled: Optional[bool] = None
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries: Max entries in the in-memory tier (defaults to settings)
+            ttl_seconds: Time-to-live for cached responses (defaults to settings)
+            max_temperature: Highest temperature cached by default (defaults to settings)
+            disk_path: Directory for the on-disk tier, None disables it (defaults to settings)
+            enabled: Master switch (defaults to settings)
+        """
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.RESPONSE_CACHE_TTL_SECONDS
+        self.max_temperature = (
+            max_temperature if max_temperature is not None else settings.RESPONSE_CACHE_MAX_TEMPERATURE
+        )
+        self.enabled = enabled if enabled is not None else settings.RESPONSE_CACHE_ENABLED
+
+        disk_path = disk_path if disk_path is not None else settings.RESPONSE_CACHE_DISK_PATH
+        self.disk_path = Path(disk_path) if disk_path else None
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+
+        # key -> (expires_at, value), ordered from least to most recently used
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+        logger.info(
+            f"Initialized ResponseCache (enabled={self.enabled}, max_entries={self.max_entries}, "
+            f"ttl={self.ttl_seconds}s, disk={self.disk_path})"
+        )
+
+    @staticmethod
+    def make_key(
+            model: str,
+            messages: List[Message],
+            temperature: Optional[float],
+            max_tokens: Optional[int],
+            additional_params: Dict[str, Any]
+    ) -> str:
+        """
+        Build a cache key from everything that influences the generation.
+
+        Messages are normalized (role case, surrounding whitespace, line endings)
+        so trivially different prompts share an entry.
+        """
+        payload = {
+            "model": model,
+            "messages": [
+                [msg.role.strip().lower(), msg.content.replace("\r\n", "\n").strip()]
+                for msg in messages
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "params": additional_params
+        }
+        raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def should_cache(self, temperature: Optional[float], use_cache: Optional[bool] = None) -> bool:
+        """
+        Decide whether a request may use the cache.
+
+        Args:
+            temperature: Sampling temperature of the request
+            use_cache: Per-request override - False bypasses the cache, True forces it,
+                None caches only low-temperature (near-deterministic) requests
+        """
+        if not self.enabled or use_cache is False:
+            return False
+        if use_cache:
+            return True
+        return temperature is not None and temperature <= self.max_temperature
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Returns:
+            The cached response dict, or None on a miss
+        """
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._record(True, "memory")
+                return value
+            del self._entries[key]
+
+        if self.disk_path:
+            entry = await self._read_disk(key, now)
+            if entry is not None:
+                # Promote to the memory tier, keeping the entry's expiry
+                expires_at, value = entry
+                self._store_memory(key, value, expires_at)
+                self._record(True, "disk")
+                return value
+
+        self._record(False, "memory")
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response in every enabled tier."""
+        expires_at = time.time() + self.ttl_seconds
+        self._store_memory(key, value, expires_at)
+
+        if self.disk_path:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None,
+                    partial(self._write_json_file, self._disk_file(key), {"expires_at": expires_at, "value": value})
+                )
+            except Exception as e:
+                logger.error(f"Error writing response cache entry to disk: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop every in-memory entry (the disk tier is left untouched)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy."""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def _store_memory(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            metrics.inc("response_cache_evictions_total")
+
+    def _record(self, hit: bool, tier: str) -> None:
+        """Update hit/miss counters."""
+        if hit:
+            self.hits += 1
+            metrics.inc("response_cache_hits_total", tier=tier)
+        else:
+            self.misses += 1
+            metrics.inc("response_cache_misses_total")
+
+    def _disk_file(self, key: str) -> Path:
+        return self.disk_path / f"{key}.json"
+
+    async def _read_disk(self, key: str, now: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Read an entry (expires_at, value) from the disk tier, deleting it if expired."""
+        file_path = self._disk_file(key)
+        if not file_path.exists():
+            return None
+
+        try:
+            loop = asyncio.get_event_loop()
+            data = await loop.run_in_executor(None, partial(self._read_json_file, file_path))
+            if data.get("expires_at", 0) > now:
+                return data["expires_at"], data.get("value")
+            await loop.run_in_executor(None, partial(file_path.unlink, missing_ok=True))
+        except Exception as e:
+            logger.error(f"Error reading response cache entry from disk: {str(e)}")
+        return None
+
+    def _write_json_file(self, file_path: Path, data: Dict) -> None:
+        """Write JSON atomically so concurrent readers never see partial files."""
+        # Unique per write: threads of one process may write the same key at once
+        tmp_path = file_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+
+    def _read_json_file(self, file_path: Path) -> Dict:
+        """Read JSON data from a file."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
@@ -0,0 +1,171 @@
+import string
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.keywords import (PROGRAMMING_LANGUAGES, CODE_RELATED_TERMS, GENERIC_REQUEST_PATTERNS,
+                                 TRANSLATION_TERMS, MATH_TERMS, CREATIVE_TERMS)
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Keyword sets per task category, in tie-break order (earlier wins a tie)
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "CODE": PROGRAMMING_LANGUAGES + CODE_RELATED_TERMS,
+    "CREATIVE": CREATIVE_TERMS,
+    "MATH": MATH_TERMS,
+    "TRANSLATION": TRANSLATION_TERMS
+}
+
+# Points per keyword match; generic request patterns count half, so "write a
+# poem" is creative even though "write a" is listed as a code pattern
+KEYWORD_WEIGHT = 2
+GENERIC_KEYWORD_WEIGHT = 1
+
+# Everything except letters, digits, "_", "+" and "#" separates tokens, so
+# "c++" and "c#" stay whole. Tokenizing runs in C, which matters for whole
+# files pasted into the chat. The ASCII separators are replaced in the UTF-8
+# bytes, since str.translate is several times slower once the text has a
+# non-ASCII character in it; non-ASCII bytes are left alone.
+_TOKEN_CHARS = set(string.ascii_lowercase + string.digits + "_+#")
+_ASCII_SEPARATORS = bytes(i for i in range(128) if chr(i) not in _TOKEN_CHARS)
+_SEPARATORS = bytes.maketrans(_ASCII_SEPARATORS, b" " * len(_ASCII_SEPARATORS))
+# Typographic quotes/dashes and non-breaking spaces
+_UNICODE_SEPARATORS = "\u00a0\u2013\u2014\u2018\u2019\u201c\u201d\u2026"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text."""
+    text = text.lower()
+    if not text.isascii():
+        for separator in _UNICODE_SEPARATORS:
+            text = text.replace(separator, " ")
+    # str.split also splits on non-ASCII whitespace
+    return text.encode("utf-8").translate(_SEPARATORS).decode("utf-8").split()
+
+# Categories a keyword belongs to, with the points it scores in each
+_Matches = Tuple[Tuple[str, int], ...]
+# Trie node: token -> (child node, matches of phrases ending here)
+_Node = Dict[str, Tuple[dict, _Matches]]
+
+
+class KeywordRouter:
+    """
+    Scores a message against every keyword category in a single pass.
+
+    Keywords are compiled at startup: single words into a lookup table and
+    multi-word phrases into a token trie. The message is tokenized once and
+    its tokens counted, so single words are looked up once per distinct
+    token rather than once per occurrence, and only tokens that start a
+    phrase are walked through the trie. Matching is linear in the message length regardless of
+    the number of keywords, and keywords only match whole words ("art"
+    doesn't match "start", "js" doesn't match "json").
+    """
+
+    def __init__(
+        self,
+        category_keywords: Optional[Dict[str, List[str]]] = None,
+        generic_keywords: Optional[List[str]] = None
+    ):
+        """
+        Compile the keyword sets.
+
+        Args:
+            category_keywords: Category -> keyword phrases, in tie-break order
+                (defaults to CATEGORY_KEYWORDS)
+            generic_keywords: Phrases that score GENERIC_KEYWORD_WEIGHT instead
+                of KEYWORD_WEIGHT (defaults to GENERIC_REQUEST_PATTERNS)
+        """
+        self.category_keywords = category_keywords or CATEGORY_KEYWORDS
+        self.categories = list(self.category_keywords.keys())
+        generic = {
+            tuple(tokenize(keyword))
+            for keyword in (GENERIC_REQUEST_PATTERNS if generic_keywords is None else generic_keywords)
+        }
+        self._words: Dict[str, _Matches] = {}
+        self._root: _Node = {}
+
+        phrases = 0
+        for category, keywords in self.category_keywords.items():
+            for keyword in keywords:
+                tokens = tokenize(keyword)
+                if not tokens:
+                    continue
+                weight = GENERIC_KEYWORD_WEIGHT if tuple(tokens) in generic else KEYWORD_WEIGHT
+                if len(tokens) == 1:
+                    matches = self._words.get(tokens[0], ())
+                    if category not in (c for c, _ in matches):
+                        self._words[tokens[0]] = matches + ((category, weight),)
+                else:
+                    self._add(tokens, category, weight)
+                phrases += 1
+
+        # Tokens that can contribute to a score at all
+        self._starts = frozenset(self._words) | frozenset(self._root)
+
+        logger.info(f"Compiled keyword router with {phrases} phrases in {len(self.categories)} categories")
+
+    def scores(self, text: str) -> Dict[str, int]:
+        """
+        Score a message against every category.
+
+        Every occurrence of a keyword scores KEYWORD_WEIGHT, or
+        GENERIC_KEYWORD_WEIGHT for generic request patterns, whatever its
+        length, so a specific word beats a generic phrase.
+
+        Returns:
+            Category -> score (0 for categories without matches)
+        """
+        scores = dict.fromkeys(self.categories, 0)
+        tokens = tokenize(text)
+        if self._starts.isdisjoint(tokens):
+            return scores
+
+        # Counting and intersecting run in C; Python only sees distinct matches
+        counts = Counter(tokens)
+        for token in counts.keys() & self._words.keys():
+            for category, weight in self._words[token]:
+                scores[category] += weight * counts[token]
+
+        # Only occurrences of tokens that start a phrase need the trie walk;
+        # list.index finds them in C
+        for first in counts.keys() & self._root.keys():
+            start = -1
+            for _ in range(counts[first]):
+                start = tokens.index(first, start + 1)
+                node = self._root
+                position = start
+                while position < len(tokens):
+                    entry = node.get(tokens[position])
+                    if entry is None:
+                        break
+                    node, matched = entry
+                    position += 1
+                    for category, weight in matched:
+                        scores[category] += weight
+
+        return scores
+
+    def classify(self, text: str) -> Tuple[Optional[str], Dict[str, int]]:
+        """
+        Pick the highest-scoring category for a message.
+
+        Returns:
+            Tuple of (winning category or None if nothing matched, scores)
+        """
+        scores = self.scores(text)
+        best = None
+        for category in self.categories:
+            # Strictly greater, so ties go to the earlier category
+            if scores[category] > 0 and (best is None or scores[category] > scores[best]):
+                best = category
+        return best, scores
+
+    def _add(self, tokens: List[str], category: str, weight: int) -> None:
+        """Insert a multi-word keyword phrase into the trie."""
+        node = self._root
+        for i, token in enumerate(tokens):
+            child, matched = node.get(token, ({}, ()))
+            if i == len(tokens) - 1 and category not in (c for c, _ in matched):
+                matched = matched + ((category, weight),)
+            node[token] = (child, matched)
+            node = child
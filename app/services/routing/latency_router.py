@@ -0,0 +1,211 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.services.model_providers.residency import OllamaResidencyManager, normalize_model_name
+from app.services.scheduler import GenerationScheduler
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class LatencyAwareRouter:
+    """
+    Moves requests off a busy model when its predicted latency would miss the SLO.
+
+    The predicted latency of a request on a model is
+
+        queue wait + load time (if not loaded) + prompt eval + generation
+
+    built from what the app has observed: per-model tokens/sec and load times
+    (the model_* usage metrics), the scheduler's in-flight/queued counts and
+    average service time, and the residency manager's loaded models. Models
+    without observations use the ROUTING_DEFAULT_* estimates.
+
+    When the category's preferred model is predicted to exceed the SLO, the
+    fastest configured fallback for the category is used instead, provided it
+    is actually predicted to be faster.
+    """
+
+    def __init__(
+        self,
+        scheduler: Optional[GenerationScheduler] = None,
+        residency: Optional[OllamaResidencyManager] = None,
+        slo_seconds: Optional[float] = None,
+        fallback_models: Optional[Dict[str, List[str]]] = None,
+        max_decisions: int = 50
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            scheduler: Source of in-flight/queued counts and service times
+            residency: Source of which models are loaded (unknown if omitted)
+            slo_seconds: Predicted latency above which a fallback is considered
+            fallback_models: Category -> fallback models, in preference order
+            max_decisions: Number of recent decisions kept for debugging
+        """
+        self.scheduler = scheduler
+        self.residency = residency
+        self.slo_seconds = slo_seconds or settings.ROUTING_LATENCY_SLO_SECONDS
+        self.fallback_models = fallback_models if fallback_models is not None else dict(settings.ROUTING_FALLBACK_MODELS)
+        self._decisions: Deque[Dict[str, Any]] = deque(maxlen=max_decisions)
+
+    def predict(self, model: str, prompt_tokens: int = 0, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Predict the latency of one more request on a model.
+
+        Args:
+            model: Full model name (e.g. "ollama:codellama:7b")
+            prompt_tokens: Estimated prompt size
+            max_tokens: Max tokens the request may generate
+
+        Returns:
+            The decision inputs and the predicted latency ("predicted_seconds")
+        """
+        tokens_per_second = self._observed_median("model_tokens_per_second", model)
+        prompt_tokens_per_second = self._observed_median("model_prompt_tokens_per_second", model)
+        load_seconds = self._observed_median("model_load_seconds", model, skip_warm=True)
+
+        # Typical reply length for the model, capped by the request's limit
+        completion_tokens = self._average_completion_tokens(model) or settings.ROUTING_DEFAULT_COMPLETION_TOKENS
+        if max_tokens:
+            completion_tokens = min(completion_tokens, max_tokens)
+
+        loaded = self._is_loaded(model)
+        generation = (
+            prompt_tokens / (prompt_tokens_per_second or settings.ROUTING_DEFAULT_PROMPT_TOKENS_PER_SECOND)
+            + completion_tokens / (tokens_per_second or settings.ROUTING_DEFAULT_TOKENS_PER_SECOND)
+        )
+        load = 0.0 if loaded is not False else (load_seconds or settings.ROUTING_DEFAULT_LOAD_SECONDS)
+
+        in_flight, queued, limit, service_time = 0, 0, 1, None
+        if self.scheduler is not None:
+            in_flight = self.scheduler.in_flight.get(model, 0)
+            queued = self.scheduler.queued_for(model)
+            limit = self.scheduler.model_limit(model)
+            service_time = self.scheduler.service_time(model)
+
+        # Requests that have to finish before this one gets a slot, drained
+        # `limit` at a time
+        ahead = in_flight + queued - limit + 1
+        queue_wait = ahead * (service_time or generation) / limit if ahead > 0 else 0.0
+
+        return {
+            "model": model,
+            "predicted_seconds": round(queue_wait + load + generation, 3),
+            "queue_wait_seconds": round(queue_wait, 3),
+            "load_seconds": round(load, 3),
+            "generation_seconds": round(generation, 3),
+            "tokens_per_second": tokens_per_second,
+            "prompt_tokens_per_second": prompt_tokens_per_second,
+            "expected_completion_tokens": completion_tokens,
+            "prompt_tokens": prompt_tokens,
+            "in_flight": in_flight,
+            "queued": queued,
+            "concurrency_limit": limit,
+            "service_time_seconds": service_time,
+            "loaded": loaded
+        }
+
+    def route(
+        self,
+        category: str,
+        preferred_model: str,
+        prompt_tokens: int = 0,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Decide which model serves a request of a category.
+
+        Args:
+            category: Task category (e.g. "CODE")
+            preferred_model: Model the category is normally routed to
+            prompt_tokens: Estimated prompt size
+            max_tokens: Max tokens the request may generate
+
+        Returns:
+            Decision with "model" (the chosen model), "preferred_model",
+            "reason" ("within_slo", "slo_fallback", "over_slo_no_fallback" or
+            "over_slo_fallbacks_slower"), "detail" for fallbacks, and the
+            predictions for every candidate
+        """
+        preferred = self.predict(preferred_model, prompt_tokens, max_tokens)
+        decision: Dict[str, Any] = {
+            "category": category,
+            "preferred_model": preferred_model,
+            "model": preferred_model,
+            "slo_seconds": self.slo_seconds,
+            "predictions": [preferred]
+        }
+
+        fallbacks = [model for model in self.fallback_models.get(category, []) if model != preferred_model]
+        if preferred["predicted_seconds"] <= self.slo_seconds:
+            decision["reason"] = "within_slo"
+        elif not fallbacks:
+            decision["reason"] = "over_slo_no_fallback"
+        else:
+            candidates = [self.predict(model, prompt_tokens, max_tokens) for model in fallbacks]
+            decision["predictions"] += candidates
+            fastest = min(candidates, key=lambda prediction: prediction["predicted_seconds"])
+            if fastest["predicted_seconds"] < preferred["predicted_seconds"]:
+                decision["model"] = fastest["model"]
+                decision["reason"] = "slo_fallback"
+                decision["detail"] = (
+                    f"{preferred_model} predicted {preferred['predicted_seconds']:.1f}s > "
+                    f"{self.slo_seconds:.0f}s SLO, {fastest['model']} predicted {fastest['predicted_seconds']:.1f}s"
+                )
+                metrics.inc("routing_latency_fallbacks_total", category=category, model=fastest["model"])
+                logger.info(f"Routing {category.lower()} request to fallback: {decision['detail']}")
+            else:
+                decision["reason"] = "over_slo_fallbacks_slower"
+
+        self._decisions.append(dict(decision, timestamp=time.time()))
+        return decision
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current decision inputs per configured model and the recent decisions."""
+        models = {
+            settings.DEFAULT_MODEL, settings.CODE_MODEL, settings.CREATIVE_MODEL,
+            settings.MATH_MODEL, settings.TRANSLATION_MODEL
+        }
+        for fallbacks in self.fallback_models.values():
+            models.update(fallbacks)
+        return {
+            "slo_seconds": self.slo_seconds,
+            "fallback_models": self.fallback_models,
+            "models": {model: self.predict(model) for model in sorted(models)},
+            "recent_decisions": list(self._decisions)
+        }
+
+    def _is_loaded(self, model: str) -> Optional[bool]:
+        """Whether Ollama has the model loaded (None if unknown)."""
+        if self.residency is None or not model.startswith("ollama:"):
+            return None
+        return normalize_model_name(model) in self.residency.loaded
+
+    @staticmethod
+    def _observed_median(name: str, model: str, skip_warm: bool = False) -> Optional[float]:
+        """
+        Median of a model's recent observations of a usage metric, if any.
+
+        skip_warm ignores near-zero observations, e.g. the load_duration
+        Ollama reports for requests to an already loaded model.
+        """
+        histogram = metrics.get_histogram(name, model=model)
+        if histogram is None:
+            return None
+        if not skip_warm:
+            return histogram.quantile(0.5)
+        ordered = sorted(value for value in histogram.samples if value > 0.1)
+        return ordered[len(ordered) // 2] if ordered else None
+
+    @staticmethod
+    def _average_completion_tokens(model: str) -> Optional[float]:
+        """Average completion tokens per generation observed for a model."""
+        generations = metrics.get_histogram("model_tokens_per_second", model=model)
+        if generations is None or not generations.count:
+            return None
+        return metrics.get_counter("model_completion_tokens_total", model=model) / generations.count
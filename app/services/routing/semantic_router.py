@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.rag.embeddings import OllamaEmbeddingService
+from app.services.routing.keyword_router import KeywordRouter
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Labelled example prompts per task category. Their embeddings are averaged
+# into one centroid per category. prompts/prompts.txt is kept out of this
+# list so it can serve as a held-out set for benchmarks/router_report.py.
+CATEGORY_EXAMPLES: Dict[str, List[str]] = {
+    "CODE": [
+        "Write a function that checks whether a string is a palindrome.",
+        "Why does my loop throw an index out of range error?",
+        "Refactor this class so that it is easier to unit test.",
+        "How do I read a CSV file and group the rows by a column?",
+        "Explain what this SQL query does and how to make it faster.",
+        "Fix the bug in this recursive function, it never returns.",
+        "How do I set up a REST endpoint that accepts a JSON body?",
+        "Convert this callback based code to use async and await."
+    ],
+    "CREATIVE": [
+        "Write a short story about a robot who learns to paint.",
+        "Compose a haiku about the first snow of winter.",
+        "Come up with a name and backstory for a pirate captain.",
+        "Describe a city floating above the clouds in vivid detail.",
+        "Write song lyrics about leaving home for the first time.",
+        "Give me ideas for a plot twist in my mystery novel.",
+        "Write a funny limerick about a cat who loves coffee.",
+        "Imagine a dialogue between the sun and the moon."
+    ],
+    "MATH": [
+        "What is the integral of x squared times sine of x?",
+        "Solve the system of equations 2x + y = 7 and x - y = 2.",
+        "Prove that the square root of two is irrational.",
+        "What is the expected value of rolling two dice?",
+        "Simplify the expression (x^2 - 9) / (x - 3).",
+        "How many ways can 6 people sit around a round table?",
+        "Compute the determinant of a 3 by 3 matrix.",
+        "Find the limit of sin(x)/x as x approaches zero."
+    ],
+    "TRANSLATION": [
+        "Translate 'where is the train station' into Spanish.",
+        "How do you say good morning in Japanese?",
+        "Translate this paragraph from German to English.",
+        "What does 'je ne sais quoi' mean in English?",
+        "Please translate my email into French, keeping it formal.",
+        "Give me the Italian translation of this menu.",
+        "How would a native speaker say this sentence in Portuguese?",
+        "Translate the following text into Danish."
+    ],
+    "DEFAULT": [
+        "What is the capital of Canada?",
+        "Give me some tips for sleeping better.",
+        "Who was the first person to walk on the moon?",
+        "What should I pack for a week-long hiking trip?",
+        "Explain how vaccines work in simple terms.",
+        "What are the pros and cons of renting versus buying a home?",
+        "Summarize the causes of the First World War.",
+        "How can I prepare for a job interview?"
+    ]
+}
+
+
+class SemanticRouter:
+    """
+    Routes a message to the task category with the nearest embedding centroid.
+
+    Example prompts per category are embedded once and averaged into
+    centroids, which are persisted together with the embedding model and a
+    hash of the examples, so restarts only re-embed when either changes.
+    Each query costs one embedding call plus a dot product.
+
+    The keyword router is the fallback whenever the semantic decision can't
+    be trusted or is too slow: centroids not built, similarity below the
+    threshold, nearest two centroids too close, or the query embedding not
+    back within the latency budget.
+    """
+
+    def __init__(
+        self,
+        embedding_service: Optional[OllamaEmbeddingService] = None,
+        keyword_router: Optional[KeywordRouter] = None,
+        examples: Optional[Dict[str, List[str]]] = None,
+        centroids_path: Optional[str] = None,
+        threshold: Optional[float] = None,
+        min_margin: Optional[float] = None,
+        latency_budget_ms: Optional[float] = None
+    ):
+        """
+        Initialize the router. Call warm_up() to load or build the centroids.
+
+        Args:
+            embedding_service: Embeds examples and queries (share the RAG one to share its caches)
+            keyword_router: Fallback router
+            examples: Category -> example prompts (defaults to CATEGORY_EXAMPLES)
+            centroids_path: JSON file the centroids are persisted to
+            threshold: Min cosine similarity to accept the nearest centroid
+            min_margin: Min similarity lead over the runner-up centroid
+            latency_budget_ms: Max time to wait for the query embedding
+        """
+        self.embedding_service = embedding_service or OllamaEmbeddingService(
+            model_name=settings.SEMANTIC_ROUTER_EMBEDDING_MODEL
+        )
+        self.keyword_router = keyword_router or KeywordRouter()
+        self.examples = examples or CATEGORY_EXAMPLES
+        self.centroids_path = Path(centroids_path or settings.SEMANTIC_ROUTER_CENTROIDS_PATH)
+        self.threshold = settings.SEMANTIC_ROUTER_THRESHOLD if threshold is None else threshold
+        self.min_margin = settings.SEMANTIC_ROUTER_MIN_MARGIN if min_margin is None else min_margin
+        self.latency_budget_ms = (
+            settings.SEMANTIC_ROUTER_LATENCY_BUDGET_MS if latency_budget_ms is None else latency_budget_ms
+        )
+
+        self.categories: List[str] = []
+        # Unit-length centroids, one row per category
+        self._centroids: Optional[np.ndarray] = None
+        self._warm_up_lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the centroids are loaded."""
+        return self._centroids is not None
+
+    async def warm_up(self) -> bool:
+        """
+        Load the persisted centroids, or embed the examples and persist them.
+
+        Failures are logged, not raised: the router then keeps using keywords.
+
+        Returns:
+            Whether the centroids are ready
+        """
+        async with self._warm_up_lock:
+            if self.ready:
+                return True
+
+            fingerprint = self._fingerprint()
+            if self._load(fingerprint):
+                logger.info(f"Loaded semantic router centroids from {self.centroids_path}")
+                return True
+
+            started = time.perf_counter()
+            try:
+                categories = list(self.examples.keys())
+                texts = [text for category in categories for text in self.examples[category]]
+                vectors = np.asarray(await self.embedding_service.embed_documents(texts), dtype=np.float32)
+            except Exception as e:
+                logger.error(f"Error building semantic router centroids, using keyword routing: {str(e)}")
+                return False
+
+            rows = []
+            offset = 0
+            for category in categories:
+                count = len(self.examples[category])
+                rows.append(vectors[offset:offset + count].mean(axis=0))
+                offset += count
+
+            self.categories = categories
+            self._centroids = self._normalize(np.vstack(rows))
+            self._save(fingerprint)
+
+            elapsed = time.perf_counter() - started
+            metrics.observe("router_centroid_build_seconds", elapsed)
+            logger.info(f"Built semantic router centroids for {len(categories)} categories in {elapsed:.2f}s")
+            return True
+
+    async def classify(self, text: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Pick the task category for a message.
+
+        Args:
+            text: The message to route
+
+        Returns:
+            Tuple of (category or None if nothing matched, decision details:
+            "router" ("semantic" or "keyword"), "scores", and for semantic
+            decisions "similarity" and "margin", for fallbacks "fallback_reason")
+        """
+        started = time.perf_counter()
+        similarities = None
+        reason = None
+
+        if not self.ready:
+            reason = "not_ready"
+        else:
+            similarities, reason = await self._similarities(text)
+
+        if similarities is not None:
+            order = np.argsort(similarities)[::-1]
+            best = float(similarities[order[0]])
+            margin = best - float(similarities[order[1]]) if len(order) > 1 else best
+            if best < self.threshold:
+                reason = "low_similarity"
+            elif margin < self.min_margin:
+                reason = "ambiguous"
+            else:
+                category = self.categories[order[0]]
+                metrics.observe("router_seconds", time.perf_counter() - started, router="semantic")
+                metrics.inc("router_decisions_total", router="semantic", category=category)
+                return (None if category == "DEFAULT" else category), {
+                    "router": "semantic",
+                    "similarity": round(best, 4),
+                    "margin": round(margin, 4),
+                    "scores": {c: round(float(s), 4) for c, s in zip(self.categories, similarities)}
+                }
+
+        category, scores = self.keyword_router.classify(text)
+        metrics.inc("router_fallbacks_total", reason=reason)
+        metrics.observe("router_seconds", time.perf_counter() - started, router="keyword")
+        metrics.inc("router_decisions_total", router="keyword", category=category or "DEFAULT")
+        return category, {"router": "keyword", "fallback_reason": reason, "scores": scores}
+
+    async def _similarities(self, text: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """Cosine similarity of the query to every centroid, or (None, fallback reason)."""
+        # Shielded so a query that misses the budget still finishes (and
+        # lands in any query-embedding cache) for the next time it's asked
+        embedding = asyncio.ensure_future(self.embedding_service.embed_query_array(text))
+        try:
+            vector = await asyncio.wait_for(asyncio.shield(embedding), self.latency_budget_ms / 1000)
+        except asyncio.TimeoutError:
+            embedding.add_done_callback(_discard_result)
+            return None, "latency_budget"
+        except Exception as e:
+            logger.warning(f"Query embedding failed, using keyword routing: {str(e)}")
+            return None, "embedding_error"
+
+        if vector is None or len(vector) != self._centroids.shape[1]:
+            return None, "embedding_error"
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        return self._centroids @ query, None
+
+    def _fingerprint(self) -> Dict[str, str]:
+        """Identifies the centroids: embedding model plus a hash of the examples."""
+        raw = json.dumps(self.examples, sort_keys=True, ensure_ascii=False)
+        return {
+            "model": self.embedding_service.model_name,
+            "examples_sha256": hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        }
+
+    def _load(self, fingerprint: Dict[str, str]) -> bool:
+        """Load persisted centroids if they were built from the same model and examples."""
+        if not self.centroids_path.exists():
+            return False
+        try:
+            with open(self.centroids_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if any(data.get(key) != value for key, value in fingerprint.items()):
+                logger.info("Semantic router examples or embedding model changed, rebuilding centroids")
+                return False
+            self.categories = list(data["centroids"].keys())
+            self._centroids = self._normalize(np.asarray(list(data["centroids"].values()), dtype=np.float32))
+            return True
+        except Exception as e:
+            logger.warning(f"Could not load semantic router centroids: {str(e)}")
+            return False
+
+    def _save(self, fingerprint: Dict[str, str]) -> None:
+        """Persist the centroids (written to a temp file, then renamed into place)."""
+        temp_path = None
+        try:
+            os.makedirs(self.centroids_path.parent, exist_ok=True)
+            data = dict(fingerprint, centroids={
+                category: row.tolist() for category, row in zip(self.categories, self._centroids)
+            })
+            # Unique per write: workers starting together may build the centroids at once
+            temp_path = self.centroids_path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.centroids_path)
+        except Exception as e:
+            logger.warning(f"Could not persist semantic router centroids: {str(e)}")
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scale vectors (or rows) to unit length."""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def _discard_result(task: "asyncio.Future") -> None:
+    """Retrieve a late embedding's exception so it isn't reported as never retrieved."""
+    if not task.cancelled():
+        task.exception()
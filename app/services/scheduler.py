@@ -0,0 +1,300 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Priority classes, lower value is served first
+PRIORITIES = {
+    "interactive": 0,
+    "batch": 1
+}
+
+
+class SchedulerRejectedError(Exception):
+    """Raised when a generation is not admitted (queue full or deadline would be missed)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued request waiting for a generation slot."""
+
+    __slots__ = ("model", "priority", "conversation_id", "enqueued_at", "future")
+
+    def __init__(self, model: str, priority: str, conversation_id: str):
+        self.model = model
+        self.priority = priority
+        self.conversation_id = conversation_id
+        self.enqueued_at = time.perf_counter()
+        self.future: asyncio.Future = asyncio.get_event_loop().create_future()
+
+
+class GenerationScheduler:
+    """
+    Admission control and priority scheduling for model generations.
+
+    - At most `global_limit` generations run at once, and at most the per-model
+      limit for each model.
+    - Requests beyond that wait in a bounded queue, grouped by priority class
+      (interactive before batch).
+    - Within a priority class, conversations are served round-robin so one
+      chatty conversation cannot starve the others.
+    - Requests that would wait past their deadline are rejected fast.
+    """
+
+    def __init__(
+            self,
+            global_limit: Optional[int] = None,
+            model_limits: Optional[Dict[str, int]] = None,
+            default_model_limit: Optional[int] = None,
+            max_queue: Optional[int] = None,
+            deadlines: Optional[Dict[str, float]] = None
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            global_limit: Max concurrent generations across all models
+            model_limits: Per-model concurrency overrides, keyed by full model name
+            default_model_limit: Concurrency for models without an override
+            max_queue: Max number of queued (waiting) requests
+            deadlines: Max queue wait in seconds per priority class
+        """
+        self.global_limit = global_limit or settings.SCHEDULER_GLOBAL_CONCURRENCY
+        self.model_limits = model_limits if model_limits is not None else dict(settings.SCHEDULER_MODEL_CONCURRENCY)
+        self.default_model_limit = default_model_limit or settings.SCHEDULER_DEFAULT_MODEL_CONCURRENCY
+        self.max_queue = max_queue or settings.SCHEDULER_MAX_QUEUE
+        self.deadlines = deadlines if deadlines is not None else dict(settings.SCHEDULER_DEADLINES)
+
+        self.in_flight_total = 0
+        self.in_flight: Dict[str, int] = {}
+
+        # priority -> conversation_id -> FIFO of waiters; conversation order is the round-robin order
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {
+            level: OrderedDict() for level in sorted(set(PRIORITIES.values()))
+        }
+        self.queued = 0
+
+        # Exponentially weighted average service time per model (seconds)
+        self._service_time: Dict[str, float] = {}
+
+        logger.info(
+            f"Initialized GenerationScheduler (global={self.global_limit}, "
+            f"per_model={self.default_model_limit}, max_queue={self.max_queue})"
+        )
+
+    def model_limit(self, model: str) -> int:
+        """Concurrency limit for a model."""
+        return self.model_limits.get(model, self.default_model_limit)
+
+    def queued_for(self, model: str) -> int:
+        """Number of queued requests for a model."""
+        return sum(
+            1
+            for conversations in self._queues.values()
+            for waiters in conversations.values()
+            for waiter in waiters
+            if waiter.model == model
+        )
+
+    def service_time(self, model: str) -> Optional[float]:
+        """Average time a generation holds a slot for a model, if observed."""
+        return self._service_time.get(model)
+
+    def estimated_wait(self, model: str) -> float:
+        """
+        Rough queue wait estimate for the last request queued for a model.
+
+        Everything queued ahead of it or running for the model has to drain
+        through the model's concurrency limit first.
+        """
+        service_time = self._service_time.get(model)
+        if service_time is None:
+            return 0.0
+        ahead = self.queued_for(model) + self.in_flight.get(model, 0) - self.model_limit(model)
+        if ahead <= 0:
+            return 0.0
+        return ahead * service_time / self.model_limit(model)
+
+    @asynccontextmanager
+    async def slot(
+            self,
+            model: str,
+            priority: str = "interactive",
+            conversation_id: Optional[str] = None,
+            deadline: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """
+        Hold a generation slot for the duration of the block.
+
+        Args:
+            model: Full model name (e.g. "ollama:llama2")
+            priority: Priority class ("interactive" or "batch")
+            conversation_id: Used for round-robin fairness between conversations
+            deadline: Max seconds to wait in the queue (defaults to the priority's deadline)
+
+        Raises:
+            SchedulerRejectedError: If the request cannot be admitted in time
+        """
+        await self.acquire(model, priority, conversation_id, deadline)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(model, time.perf_counter() - started)
+
+    async def acquire(
+            self,
+            model: str,
+            priority: str = "interactive",
+            conversation_id: Optional[str] = None,
+            deadline: Optional[float] = None
+    ) -> None:
+        """Wait for a generation slot (see slot())."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        conversation_id = conversation_id or "default"
+        deadline = deadline if deadline is not None else self.deadlines.get(priority)
+
+        waiter = _Waiter(model, priority, conversation_id)
+        self._enqueue(waiter)
+        self._dispatch()
+
+        if not waiter.future.done():
+            # We have to queue - reject early instead of piling up
+            if self.queued > self.max_queue:
+                self._remove(waiter)
+                self._reject("queue_full", model, priority)
+                raise SchedulerRejectedError(
+                    f"Generation queue is full ({self.max_queue} waiting)",
+                    retry_after=self.estimated_wait(model) or 1.0
+                )
+
+            estimate = self.estimated_wait(model)
+            if deadline is not None and estimate > deadline:
+                self._remove(waiter)
+                self._reject("deadline", model, priority)
+                raise SchedulerRejectedError(
+                    f"Estimated queue wait {estimate:.1f}s for {model} exceeds the {deadline:.1f}s deadline",
+                    retry_after=estimate
+                )
+
+        if not waiter.future.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout=deadline)
+            except asyncio.TimeoutError:
+                self._remove(waiter)
+                if waiter.future.done():
+                    # Granted just as we timed out - hand the slot back
+                    self.release(model)
+                self._reject("deadline", model, priority)
+                raise SchedulerRejectedError(
+                    f"Timed out after {deadline:.1f}s waiting for a {model} generation slot",
+                    retry_after=self.estimated_wait(model) or 1.0
+                )
+            except asyncio.CancelledError:
+                self._remove(waiter)
+                if waiter.future.done():
+                    self.release(model)
+                raise
+
+        metrics.observe(
+            "scheduler_queue_seconds",
+            time.perf_counter() - waiter.enqueued_at,
+            model=model,
+            priority=priority
+        )
+
+    def release(self, model: str, service_time: Optional[float] = None) -> None:
+        """Give a slot back and admit the next eligible waiters."""
+        self.in_flight_total -= 1
+        self.in_flight[model] = self.in_flight.get(model, 1) - 1
+        metrics.set_gauge("scheduler_in_flight", self.in_flight[model], model=model)
+
+        if service_time is not None:
+            previous = self._service_time.get(model)
+            self._service_time[model] = service_time if previous is None else 0.8 * previous + 0.2 * service_time
+
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current scheduler state for debugging/metrics."""
+        return {
+            "global_limit": self.global_limit,
+            "in_flight_total": self.in_flight_total,
+            "in_flight": {model: count for model, count in self.in_flight.items() if count},
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "queued_by_priority": {
+                name: sum(len(waiters) for waiters in self._queues[level].values())
+                for name, level in PRIORITIES.items()
+            },
+            "avg_service_time": dict(self._service_time)
+        }
+
+    def _has_capacity(self, model: str) -> bool:
+        return (
+            self.in_flight_total < self.global_limit
+            and self.in_flight.get(model, 0) < self.model_limit(model)
+        )
+
+    def _start(self, model: str) -> None:
+        self.in_flight_total += 1
+        self.in_flight[model] = self.in_flight.get(model, 0) + 1
+        metrics.set_gauge("scheduler_in_flight", self.in_flight[model], model=model)
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        conversations = self._queues[PRIORITIES[waiter.priority]]
+        conversations.setdefault(waiter.conversation_id, deque()).append(waiter)
+        self.queued += 1
+        metrics.set_gauge("scheduler_queue_depth", self.queued)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        conversations = self._queues[PRIORITIES[waiter.priority]]
+        waiters = conversations.get(waiter.conversation_id)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del conversations[waiter.conversation_id]
+        self.queued -= 1
+        metrics.set_gauge("scheduler_queue_depth", self.queued)
+
+    def _dispatch(self) -> None:
+        """Grant slots to waiters in priority order, round-robin across conversations."""
+        while self.in_flight_total < self.global_limit and self.queued:
+            waiter = self._next_eligible()
+            if waiter is None:
+                return
+            self._remove(waiter)
+            self._start(waiter.model)
+            waiter.future.set_result(None)
+
+    def _next_eligible(self) -> Optional[_Waiter]:
+        """Find the next waiter whose model has capacity."""
+        for level in sorted(self._queues):
+            conversations = self._queues[level]
+            for conversation_id in list(conversations.keys()):
+                # Only the head of each conversation's queue, to keep per-conversation order
+                head = conversations[conversation_id][0]
+                if head.future.done():
+                    continue
+                if self.in_flight.get(head.model, 0) < self.model_limit(head.model):
+                    # Rotate the conversation to the back for round-robin fairness
+                    conversations.move_to_end(conversation_id)
+                    return head
+        return None
+
+    def _reject(self, reason: str, model: str, priority: str) -> None:
+        metrics.inc("scheduler_rejected_total", reason=reason, model=model, priority=priority)
+        logger.warning(f"Rejected {priority} generation for {model}: {reason}")
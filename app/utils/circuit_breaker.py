@@ -0,0 +1,198 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# circuit_breaker_state gauge values
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails calls to an unavailable dependency fast instead of waiting on it.
+
+    Calls go through call(). Once `failure_threshold` consecutive calls fail
+    with one of `failure_types`, the circuit opens: calls raise
+    CircuitOpenError immediately, and a background task runs `probe` with
+    exponential backoff. The circuit is half-open while a probe runs (calls
+    are still rejected) and closes when one succeeds.
+
+    `on_close` is awaited after the circuit closes but before wait_closed()
+    returns, so it can restore state (e.g. replay buffered writes) ahead of
+    anything that was waiting for the dependency to come back.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], Awaitable[Any]],
+        failure_threshold: int = 1,
+        failure_types: Tuple[Type[BaseException], ...] = (Exception,),
+        probe_base_delay: float = 1.0,
+        probe_max_delay: float = 30.0,
+        on_close: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        """
+        Initialize a closed circuit.
+
+        Args:
+            name: Dependency name, used for logs and metrics
+            probe: Coroutine function that succeeds once the dependency is back
+            failure_threshold: Consecutive failures that open the circuit
+            failure_types: Exceptions that count as the dependency being down
+            probe_base_delay: Seconds before the first probe, doubled after each failed one
+            probe_max_delay: Cap on the probe delay in seconds
+            on_close: Awaited when the circuit closes again
+        """
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.failure_types = failure_types
+        self.probe_base_delay = probe_base_delay
+        self.probe_max_delay = probe_max_delay
+        self.on_close = on_close
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._opened_at: Optional[float] = None
+        self._next_probe_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._closed = asyncio.Event()
+        self._closed.set()
+
+    @property
+    def is_closed(self) -> bool:
+        """Whether calls currently go through."""
+        return self.state == self.CLOSED
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Call the dependency, unless the circuit is open.
+
+        Args:
+            func: Coroutine function to call
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            What func returns
+
+        Raises:
+            CircuitOpenError: The circuit is open or half-open
+        """
+        if not self.is_closed:
+            metrics.inc("circuit_breaker_rejections_total", breaker=self.name)
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit {self.state})")
+
+        try:
+            result = await func(*args, **kwargs)
+        except self.failure_types as e:
+            self.record_failure(e)
+            raise
+        self._failures = 0
+        return result
+
+    def record_failure(self, error: BaseException) -> None:
+        """Count a failed call, opening the circuit at the threshold."""
+        self._failures += 1
+        self._last_error = str(error)
+        if self.is_closed and self._failures >= self.failure_threshold:
+            self.trip(error)
+
+    def trip(self, error: Optional[BaseException] = None) -> None:
+        """
+        Open the circuit and start probing.
+
+        Args:
+            error: What made the dependency look unavailable
+        """
+        if not self.is_closed:
+            return
+        if error is not None:
+            self._last_error = str(error)
+        self._trips += 1
+        self._opened_at = time.time()
+        self._next_probe_at = self._opened_at + self.probe_base_delay
+        self._closed.clear()
+        self._set_state(self.OPEN)
+        metrics.inc("circuit_breaker_trips_total", breaker=self.name)
+        logger.warning(f"Circuit for {self.name} opened: {self._last_error}")
+        self._probe_task = asyncio.ensure_future(self._probe_loop())
+
+    async def wait_closed(self) -> None:
+        """Wait until the circuit is closed (and on_close has run)."""
+        await self._closed.wait()
+
+    async def stop(self) -> None:
+        """Stop probing, e.g. on shutdown."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State, failure counts and probe timing."""
+        now = time.time()
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "trips": self._trips,
+            "open_for_seconds": round(now - self._opened_at, 3) if not self.is_closed else None,
+            "next_probe_in_seconds": (
+                round(max(self._next_probe_at - now, 0.0), 3)
+                if self.state == self.OPEN and self._next_probe_at is not None else None
+            ),
+            "last_error": self._last_error
+        }
+
+    async def _probe_loop(self) -> None:
+        """Probe with backoff until the dependency is back, then close the circuit."""
+        delay = self.probe_base_delay
+        while True:
+            self._next_probe_at = time.time() + delay
+            await asyncio.sleep(delay)
+
+            self._set_state(self.HALF_OPEN)
+            try:
+                await self.probe()
+                break
+            except Exception as e:
+                self._last_error = str(e)
+                self._set_state(self.OPEN)
+                delay = min(delay * 2, self.probe_max_delay)
+                logger.info(f"{self.name} still unavailable, next probe in {delay:.1f}s")
+
+        down_for = time.time() - self._opened_at
+        self._failures = 0
+        self._probe_task = None
+        self._set_state(self.CLOSED)
+        logger.info(f"Circuit for {self.name} closed after {down_for:.1f}s")
+        if self.on_close is not None:
+            try:
+                await self.on_close()
+            except Exception as e:
+                logger.error(f"Recovery after {self.name} came back failed: {str(e)}")
+        # Recovery may have found it down again
+        if self.is_closed:
+            self._closed.set()
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.set_gauge("circuit_breaker_state", _STATE_VALUES[state], breaker=self.name)
@@ -21,6 +21,10 @@ CODE_RELATED_TERMS = [
     "write a", "show me how", "example of", "implement", "create a"
 ]
 
+# Request patterns that open code and non-code requests alike ("write a poem",
+# "create a story"); they count for less than specific terms when routing
+GENERIC_REQUEST_PATTERNS = ["write a", "show me how", "example of", "create a"]
+
 # Translation-related terms
 TRANSLATION_TERMS = [
     # Basic translation terms
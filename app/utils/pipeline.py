@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# A stage gets the results of the stages it depends on, by stage name
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class _Stage:
+    """A named step of a pipeline and its run state."""
+
+    __slots__ = ("name", "func", "after", "background", "task", "started_at", "finished_at")
+
+    def __init__(self, name: str, func: StageFunc, after: Iterable[str], background: bool):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+        self.background = background
+        self.task: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+
+class StagePipeline:
+    """
+    Runs async stages concurrently, each one as soon as its dependencies are done.
+
+    Stages declare what they depend on; everything else runs in parallel.
+    Background stages are started like the others, but run() doesn't wait for
+    them; await wait(name) where their result (or completion) is needed.
+    Per-stage start offsets and durations are recorded for telemetry.
+
+    Example:
+        pipeline = StagePipeline("chat")
+        pipeline.add("load", load_history)
+        pipeline.add("retrieve", retrieve_documents)
+        pipeline.add("fit", fit_prompt, after=["load", "retrieve"])
+        results = await pipeline.run()
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize an empty pipeline.
+
+        Args:
+            name: Pipeline name, used as a metrics label
+        """
+        self.name = name
+        self._stages: Dict[str, _Stage] = {}
+        self._started_at: Optional[float] = None
+
+    def add(self, name: str, func: StageFunc, after: Iterable[str] = (), background: bool = False) -> None:
+        """
+        Add a stage.
+
+        Args:
+            name: Unique stage name
+            func: Coroutine function called with {dependency name: result}
+            after: Names of the stages that must finish first
+            background: Don't make run() wait for this stage
+        """
+        if name in self._stages:
+            raise ValueError(f"Duplicate pipeline stage: {name}")
+        self._stages[name] = _Stage(name, func, after, background)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Start every stage and wait for the non-background ones.
+
+        If a stage fails, the other unfinished foreground stages are cancelled
+        and the error is raised; stages depending on a failed one fail with it.
+
+        Returns:
+            Results of the foreground stages, by name
+        """
+        for stage in self._stages.values():
+            missing = [name for name in stage.after if name not in self._stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+        self._started_at = time.perf_counter()
+        for stage in self._stages.values():
+            stage.task = asyncio.ensure_future(self._run_stage(stage))
+            if stage.background:
+                stage.task.add_done_callback(self._log_background_failure)
+
+        foreground = [stage for stage in self._stages.values() if not stage.background]
+        try:
+            await asyncio.gather(*(stage.task for stage in foreground))
+        except BaseException:
+            for stage in foreground:
+                stage.task.cancel()
+            raise
+
+        return {stage.name: stage.task.result() for stage in foreground}
+
+    async def wait(self, name: str) -> Any:
+        """Wait for a (typically background) stage and return its result."""
+        task = self._stages[name].task
+        if task is None:
+            raise RuntimeError(f"Pipeline {self.name} hasn't been started")
+        return await task
+
+    def timings(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Start offset and duration (ms) of every stage that has started.
+
+        Unfinished stages have a duration of None.
+        """
+        timings = {}
+        for stage in self._stages.values():
+            if stage.started_at is None:
+                continue
+            timings[stage.name] = {
+                "start_ms": round((stage.started_at - self._started_at) * 1000, 3),
+                "duration_ms": (
+                    round((stage.finished_at - stage.started_at) * 1000, 3)
+                    if stage.finished_at is not None else None
+                )
+            }
+        return timings
+
+    async def _run_stage(self, stage: _Stage) -> Any:
+        """Wait for the stage's dependencies, then run it."""
+        inputs = {}
+        for name in stage.after:
+            inputs[name] = await asyncio.shield(self._stages[name].task)
+
+        stage.started_at = time.perf_counter()
+        try:
+            return await stage.func(inputs)
+        finally:
+            stage.finished_at = time.perf_counter()
+            metrics.observe(
+                "pipeline_stage_seconds",
+                stage.finished_at - stage.started_at,
+                pipeline=self.name,
+                stage=stage.name
+            )
+
+    def _log_background_failure(self, task: asyncio.Task) -> None:
+        """Background stages have no awaiting caller to see their errors."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background stage of pipeline {self.name} failed: {str(task.exception())}")
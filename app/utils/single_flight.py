@@ -0,0 +1,168 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class _Call:
+    """A shared in-flight call and the callers waiting on it."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        # Set when the last caller left; the task only reports cancelled once it has run again
+        self.abandoned = False
+
+        # Streaming state
+        self.chunks: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running attach to it and receive the same result (or the same stream
+    of chunks, replayed from the start). The work is reference-counted: one
+    caller being cancelled only detaches that caller, and the shared work is
+    cancelled only once every caller has gone. A caller arriving after that
+    (e.g. a client retrying after a disconnect) starts the work afresh.
+    """
+
+    def __init__(self, name: str = "default"):
+        """
+        Initialize the coalescer.
+
+        Args:
+            name: Label used for metrics
+        """
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing."""
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run factory() once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the work (e.g. a response cache key)
+            factory: Zero-argument callable returning the awaitable to run
+
+        Returns:
+            The shared result
+        """
+        call = self._calls.get(key)
+        if not self._joinable(call):
+            call = _Call()
+            call.task = asyncio.ensure_future(factory())
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            metrics.inc("single_flight_coalesced_total", group=self.name)
+            logger.debug(f"Coalesced request onto in-flight call ({self.name})")
+
+        call.waiters += 1
+        try:
+            # Shield so that cancelling this caller doesn't cancel the shared task
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                logger.debug(f"Last caller left, cancelling in-flight call ({self.name})")
+                self._abandon(self._calls, key, call)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Share one upstream stream between all concurrent callers with the same key.
+
+        Late joiners first receive every chunk produced so far, then follow
+        the live stream.
+
+        Args:
+            key: Identity of the work
+            factory: Zero-argument callable returning the upstream async iterator
+
+        Yields:
+            The upstream chunks
+        """
+        call = self._streams.get(key)
+        if not self._joinable(call):
+            call = _Call()
+            call.task = asyncio.ensure_future(self._produce(call, factory))
+            self._streams[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._streams, key, call))
+        else:
+            metrics.inc("single_flight_coalesced_total", group=self.name)
+            logger.debug(f"Coalesced stream onto in-flight call ({self.name})")
+
+        call.waiters += 1
+        index = 0
+        try:
+            while True:
+                if index < len(call.chunks):
+                    chunk = call.chunks[index]
+                    index += 1
+                    yield chunk
+                    continue
+
+                if call.finished:
+                    if call.error is not None:
+                        raise call.error
+                    return
+
+                async with call.changed:
+                    await call.changed.wait_for(
+                        lambda: index < len(call.chunks) or call.finished
+                    )
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                logger.debug(f"Last subscriber left, cancelling shared stream ({self.name})")
+                self._abandon(self._streams, key, call)
+
+    async def _produce(self, call: _Call, factory: Callable[[], AsyncIterator[Any]]) -> None:
+        """Drain the upstream iterator into the shared call."""
+        upstream = factory()
+        try:
+            async for chunk in upstream:
+                call.chunks.append(chunk)
+                async with call.changed:
+                    call.changed.notify_all()
+        except asyncio.CancelledError as e:
+            call.error = e
+            raise
+        except Exception as e:
+            call.error = e
+        finally:
+            call.finished = True
+            if hasattr(upstream, "aclose"):
+                await upstream.aclose()
+            async with call.changed:
+                call.changed.notify_all()
+
+    @staticmethod
+    def _joinable(call: Optional[_Call]) -> bool:
+        """Whether a new caller can attach to an existing call."""
+        return call is not None and not call.abandoned and not call.task.done()
+
+    def _abandon(self, calls: Dict[str, _Call], key: str, call: _Call) -> None:
+        """Cancel a call nobody waits for and free its key in the same step."""
+        call.abandoned = True
+        call.task.cancel()
+        self._forget(calls, key, call)
+
+    @staticmethod
+    def _forget(calls: Dict[str, _Call], key: str, call: _Call) -> None:
+        """Drop a finished call, unless a newer call already took its key."""
+        if calls.get(key) is call:
+            del calls[key]
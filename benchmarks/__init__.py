@@ -0,0 +1,7 @@
+"""
+Standalone performance benchmarks.
+
+Each module can be run with ``python -m benchmarks.<name>`` from the
+repository root. They run against local fakes (see ``fake_ollama``), so no
+model downloads or GPU are needed.
+"""
@@ -0,0 +1,115 @@
+"""
+Per-request chain overhead: building a chain on every request vs. the cached chain factory.
+
+"before" reproduces the old CodeLlamaChain.run: a new ChatPromptTemplate,
+ChatOllama and LLMChain per request, invoked in the default thread pool.
+"after" gets the chain from ChainFactory and runs it with ainvoke on the
+pooled Ollama client.
+
+Reports the chain setup cost alone and end-to-end chats against the fake
+Ollama server.
+
+    python -m benchmarks.chain_overhead --setup-iterations 2000 --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from functools import partial
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+SYSTEM_MESSAGE = "You are a professional programming assistant."
+INPUTS = {
+    "history": [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello! How can I help?"}],
+    "input": "Write a python function that reverses a string."
+}
+
+
+def _build_old_chain(host: str):
+    from langchain.chains import LLMChain
+    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain_community.chat_models import ChatOllama
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_MESSAGE),
+        MessagesPlaceholder(variable_name="history"),
+        ("human", "{input}")
+    ])
+    llm = ChatOllama(model="codellama:7b", base_url=host, temperature=0.2, num_predict=64)
+    return LLMChain(llm=llm, prompt=prompt)
+
+
+def _setup_cost(host: str, iterations: int) -> dict:
+    from app.services.chains.factory import ChainFactory
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        _build_old_chain(host)
+    before = (time.perf_counter() - started) / iterations
+
+    factory = ChainFactory(host=host)
+    # The first request builds the chain; every later one is a cache hit
+    factory.get("code_llama", "ollama:codellama:7b", 0.2, 64, SYSTEM_MESSAGE)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        factory.get("code_llama", "ollama:codellama:7b", 0.2, 64, SYSTEM_MESSAGE)
+    after = (time.perf_counter() - started) / iterations
+
+    return {"before_us": before * 1e6, "after_us": after * 1e6}
+
+
+async def _end_to_end(mode: str, host: str, concurrency: int, total: int) -> dict:
+    from app.services.chains.factory import ChainFactory
+    from app.services.model_providers.transport import close_async_clients
+
+    factory = ChainFactory(host=host)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_chat():
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "before":
+                chain = _build_old_chain(host)
+                await asyncio.get_event_loop().run_in_executor(None, partial(chain.invoke, INPUTS))
+            else:
+                chain = factory.get("code_llama", "ollama:codellama:7b", 0.2, 64, SYSTEM_MESSAGE)
+                await chain.ainvoke(INPUTS)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_chat() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    await close_async_clients()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "chats_per_sec": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--setup-iterations", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake per-chat latency in seconds")
+    parser.add_argument("--port", type=int, default=11530)
+    args = parser.parse_args()
+
+    with FakeOllamaServer(port=args.port, latency=args.latency, completion_tokens=16) as server:
+        setup = _setup_cost(server.host, args.setup_iterations)
+        print(f"chain setup per request: before {setup['before_us']:.0f} us, after {setup['after_us']:.0f} us")
+
+        print(f"{'mode':<8} {'chats/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in ("before", "after"):
+            result = asyncio.run(_end_to_end(mode, server.host, args.concurrency, args.requests))
+            print(f"{result['mode']:<8} {result['chats_per_sec']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Document embedding throughput: one request for every chunk vs. the batched pipeline.
+
+"single" is how FAISS.add_documents embedded uploads before: LangChain's
+OllamaEmbeddings.embed_documents with every chunk in one request, in an
+executor thread. The other rows run EmbeddingPipeline over the pooled async
+client with a fixed batch size (min = max), and "adaptive" starts at the
+smallest size and tunes itself from observed latency.
+
+The fake Ollama server charges a fixed latency per request plus a latency
+per input, and serves at most --parallelism embed requests at once (like
+OLLAMA_NUM_PARALLEL). Encoding and parsing the vectors as JSON costs real
+CPU on both sides, as with Ollama; use a small --dimensions to measure
+request overhead alone. The document embedding cache is disabled.
+
+    python -m benchmarks.embedding_pipeline --chunks 2000 --batch-sizes 8 32 128
+"""
+import argparse
+import asyncio
+import time
+from functools import partial
+from typing import Optional, Tuple
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+def _chunks(count: int, size: int):
+    """Distinct chunk texts of about `size` characters."""
+    filler = "lorem ipsum dolor sit amet consectetur adipiscing elit " * (size // 56 + 1)
+    return [f"chunk {i}: {filler[:size]}" for i in range(count)]
+
+
+async def _run(mode: str, host: str, texts, batch_size: Optional[int], args) -> Tuple[float, int, int]:
+    """Embed the chunks once; returns (seconds, batches, final batch size)."""
+    from app.config import settings
+    from app.services.rag.embeddings import OllamaEmbeddingService
+    from app.services.rag.embedding_pipeline import EmbeddingPipeline
+    from app.services.model_providers.transport import close_async_clients
+
+    settings.OLLAMA_HOST = host
+    settings.EMBEDDING_CACHE_ENABLED = False
+    service = OllamaEmbeddingService(base_url=host)
+
+    if mode == "single":
+        started = time.perf_counter()
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, partial(service.ollama_embeddings.embed_documents, texts))
+        return time.perf_counter() - started, 1, len(texts)
+
+    if mode == "adaptive":
+        pipeline = EmbeddingPipeline(
+            service._embed_batch,
+            batch_size=args.adaptive_start,
+            min_batch_size=args.adaptive_start,
+            concurrency=args.concurrency
+        )
+    else:
+        pipeline = EmbeddingPipeline(
+            service._embed_batch,
+            batch_size=batch_size,
+            min_batch_size=batch_size,
+            max_batch_size=batch_size,
+            concurrency=args.concurrency
+        )
+
+    started = time.perf_counter()
+    await pipeline.embed(texts)
+    elapsed = time.perf_counter() - started
+    await close_async_clients()
+    stats = pipeline.stats()
+    return elapsed, stats["batches"], stats["batch_size"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="Chunks to embed (~ a 500-page PDF)")
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--adaptive-start", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="Fake seconds per request")
+    parser.add_argument("--embed-item-latency", type=float, default=0.002, help="Fake seconds per chunk")
+    parser.add_argument("--parallelism", type=int, default=2, help="Fake server's concurrent embed requests")
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--port", type=int, default=11560)
+    args = parser.parse_args()
+
+    texts = _chunks(args.chunks, args.chunk_chars)
+    runs = [("single", None)] + [(f"batch {size}", size) for size in args.batch_sizes] + [("adaptive", None)]
+
+    with FakeOllamaServer(
+        port=args.port,
+        embed_latency=args.embed_latency,
+        embed_item_latency=args.embed_item_latency,
+        embed_parallelism=args.parallelism,
+        dimensions=args.dimensions
+    ) as server:
+        print(f"{args.chunks} chunks, concurrency {args.concurrency}, server parallelism {args.parallelism}")
+        print(f"{'mode':<12} {'seconds':>8} {'chunks/s':>9} {'batches':>8} {'final size':>11}")
+        for label, batch_size in runs:
+            mode = label.split()[0]
+            elapsed, batches, final_size = asyncio.run(_run(mode, server.host, texts, batch_size, args))
+            print(f"{label:<12} {elapsed:>8.2f} {args.chunks / elapsed:>9.1f} {batches:>8} {final_size:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+A minimal in-process stand-in for pymongo's AsyncMongoClient.
+
+It implements the subset AsyncMongoMemory uses (ping, create_index,
+insert_one/insert_many, find with projection/sort/skip/limit, find_one,
+find_one_and_update with $inc, replace_one, delete_one/delete_many, distinct)
+with MongoDB's semantics where the memory code depends on them: projections
+only return the requested fields plus _id, ordered insert_many stops at the
+first duplicate _id with a BulkWriteError reporting nInserted, and documents
+with equal sort keys come back in insertion order. Every call costs a fixed
+round-trip latency.
+
+    memory = AsyncMongoMemory(client=FakeMongoClient(read_latency=0.01))
+"""
+import asyncio
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+class _Result:
+    """Stand-in for pymongo's write results."""
+
+    def __init__(self, **fields: Any):
+        self.__dict__.update(fields)
+
+
+class FakeCursor:
+    """find() result: sort, skip and limit are applied lazily in to_list()."""
+
+    def __init__(self, collection: "FakeCollection", docs: List[Tuple[int, Dict[str, Any]]], projection: Optional[Dict[str, int]]):
+        self.collection = collection
+        self.docs = docs
+        self.projection = projection
+        self._sort: Optional[Tuple[str, int]] = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key: str, direction: int = 1) -> "FakeCursor":
+        self._sort = (key, direction)
+        return self
+
+    def skip(self, count: int) -> "FakeCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self._limit = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self.collection.client.read_latency)
+        docs = self.docs
+        if self._sort is not None:
+            key, direction = self._sort
+            # Ties keep insertion order (in the sort's direction), like ObjectId order
+            docs = sorted(docs, key=lambda item: (item[1].get(key), item[0]), reverse=direction < 0)
+        docs = docs[self._skip:]
+        count = len(docs)
+        for limit in (self._limit, length):
+            if limit:
+                count = min(count, limit)
+        return [_project(doc, self.projection) for _, doc in docs[:count]]
+
+
+class FakeCollection:
+    """One collection: documents in insertion order, plus the indexes created on it."""
+
+    def __init__(self, client: "FakeMongoClient", name: str):
+        self.client = client
+        self.name = name
+        self.indexes: List[List[Tuple[str, int]]] = []
+        self._docs: List[Tuple[int, Dict[str, Any]]] = []
+
+    @property
+    def documents(self) -> List[Dict[str, Any]]:
+        """Stored documents in insertion order."""
+        return [doc for _, doc in self._docs]
+
+    async def create_index(self, keys: List[Tuple[str, int]], **kwargs: Any) -> str:
+        await asyncio.sleep(self.client.write_latency)
+        if list(keys) not in self.indexes:
+            self.indexes.append(list(keys))
+        return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+    async def insert_one(self, doc: Dict[str, Any]) -> _Result:
+        await asyncio.sleep(self.client.write_latency)
+        return _Result(inserted_id=self._insert(doc))
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True) -> _Result:
+        await asyncio.sleep(self.client.write_latency)
+        inserted = []
+        errors = []
+        for index, doc in enumerate(docs):
+            try:
+                inserted.append(self._insert(doc))
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"nInserted": len(inserted), "writeErrors": errors})
+        return _Result(inserted_ids=inserted)
+
+    def find(self, filter: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> FakeCursor:
+        return FakeCursor(self, [item for item in self._docs if _matches(item[1], filter)], projection)
+
+    async def find_one(self, filter: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        await asyncio.sleep(self.client.read_latency)
+        for _, doc in self._docs:
+            if _matches(doc, filter):
+                return _project(doc, projection)
+        return None
+
+    async def find_one_and_update(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        upsert: bool = False,
+        return_document: Any = False
+    ) -> Optional[Dict[str, Any]]:
+        await asyncio.sleep(self.client.write_latency)
+        doc = next((doc for _, doc in self._docs if _matches(doc, filter)), None)
+        before = dict(doc) if doc is not None else None
+        if doc is None and not upsert:
+            return None
+        updated = dict(doc if doc is not None else filter)
+        for field, amount in update.get("$inc", {}).items():
+            updated[field] = updated.get(field, 0) + amount
+        if doc is None:
+            self._insert(updated)
+        else:
+            doc.update(updated)
+        # ReturnDocument.AFTER is True
+        return dict(updated) if return_document else before
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> _Result:
+        await asyncio.sleep(self.client.write_latency)
+        for index, (sequence, doc) in enumerate(self._docs):
+            if _matches(doc, filter):
+                self._docs[index] = (sequence, {**replacement, "_id": doc["_id"]})
+                return _Result(matched_count=1, upserted_id=None)
+        if upsert:
+            return _Result(matched_count=0, upserted_id=self._insert({**filter, **replacement}))
+        return _Result(matched_count=0, upserted_id=None)
+
+    async def delete_one(self, filter: Dict[str, Any]) -> _Result:
+        await asyncio.sleep(self.client.write_latency)
+        for index, (_, doc) in enumerate(self._docs):
+            if _matches(doc, filter):
+                del self._docs[index]
+                return _Result(deleted_count=1)
+        return _Result(deleted_count=0)
+
+    async def delete_many(self, filter: Dict[str, Any]) -> _Result:
+        await asyncio.sleep(self.client.write_latency)
+        kept = [item for item in self._docs if not _matches(item[1], filter)]
+        deleted = len(self._docs) - len(kept)
+        self._docs = kept
+        return _Result(deleted_count=deleted)
+
+    async def distinct(self, key: str) -> List[Any]:
+        await asyncio.sleep(self.client.read_latency)
+        return list(dict.fromkeys(doc[key] for _, doc in self._docs if key in doc))
+
+    def _insert(self, doc: Dict[str, Any]) -> Any:
+        # pymongo adds the generated _id to the caller's document
+        doc.setdefault("_id", ObjectId())
+        if any(existing["_id"] == doc["_id"] for _, existing in self._docs):
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id: {doc['_id']}")
+        self._docs.append((next(self.client.sequence), dict(doc)))
+        return doc["_id"]
+
+
+class _FakeDatabase:
+    def __init__(self, client: "FakeMongoClient"):
+        self.client = client
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self.client, name)
+        return self.collections[name]
+
+
+class _FakeAdmin:
+    def __init__(self, client: "FakeMongoClient"):
+        self.client = client
+
+    async def command(self, name: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.client.read_latency)
+        if name != "ping":
+            raise NotImplementedError(f"FakeMongoClient doesn't implement the {name} command")
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    """In-process AsyncMongoClient stand-in with fixed read and write latencies."""
+
+    def __init__(self, read_latency: float = 0.0, write_latency: float = 0.0):
+        self.read_latency = read_latency
+        self.write_latency = write_latency
+        self.sequence = itertools.count()
+        self.admin = _FakeAdmin(self)
+        self.databases: Dict[str, _FakeDatabase] = {}
+        self.closed = False
+
+    def __getitem__(self, name: str) -> _FakeDatabase:
+        if name not in self.databases:
+            self.databases[name] = _FakeDatabase(self)
+        return self.databases[name]
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _matches(doc: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Equality filters only."""
+    return all(doc.get(field) == value for field, value in filter.items())
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """Inclusion projections: the listed fields plus _id (unless excluded)."""
+    if not projection:
+        return dict(doc)
+    fields = {field for field, include in projection.items() if include}
+    if projection.get("_id", 1):
+        fields.add("_id")
+    return {field: value for field, value in doc.items() if field in fields}
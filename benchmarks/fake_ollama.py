@@ -0,0 +1,271 @@
+"""
+A minimal fake Ollama server for benchmarks.
+
+It implements just enough of the Ollama HTTP API (/api/chat, /api/generate,
+/api/embed, /api/ps, /api/tags) with configurable, deterministic latencies.
+It also emulates Ollama's per-model KV cache: only the part of a prompt that
+does not share a prefix with the previous prompt (plus its generated reply)
+for that model is counted in ``prompt_eval_count``.
+
+Run standalone:
+    python -m benchmarks.fake_ollama --port 11500 --latency 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def _tokens(text: str) -> List[str]:
+    """Rough tokenization used for the fake prompt accounting."""
+    return text.split()
+
+
+def create_app(
+        latency: float = 0.05,
+        token_latency: float = 0.0,
+        completion_tokens: int = 32,
+        prompt_token_latency: float = 0.0,
+        load_latency: float = 0.0,
+        embed_latency: float = 0.01,
+        embed_item_latency: float = 0.001,
+        dimensions: int = 768,
+        embed_parallelism: int = 0
+):
+    """Build the fake Ollama FastAPI app."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI()
+
+    # model -> tokens of the last evaluated prompt (emulated KV cache)
+    kv_cache: Dict[str, List[str]] = {}
+    # model -> expiry timestamp of loaded models
+    loaded: Dict[str, float] = {}
+
+    def _ensure_loaded(model: str, keep_alive: Any = None) -> float:
+        """Return the load time paid by this request."""
+        now = time.time()
+        expiry = loaded.get(model)
+        cost = 0.0 if expiry and expiry > now else load_latency
+        ttl = 300.0
+        if isinstance(keep_alive, (int, float)):
+            ttl = float(keep_alive)
+        if ttl == 0:
+            loaded.pop(model, None)
+            kv_cache.pop(model, None)
+        else:
+            loaded[model] = now + ttl if ttl > 0 else float("inf")
+        return cost
+
+    def _prompt_eval(model: str, prompt_tokens: List[str]) -> int:
+        """Count tokens that are not covered by the cached prefix."""
+        cached = kv_cache.get(model, [])
+        shared = 0
+        for a, b in zip(cached, prompt_tokens):
+            if a != b:
+                break
+            shared += 1
+        kv_cache[model] = prompt_tokens
+        return max(len(prompt_tokens) - shared, 1)
+
+    def _chat_prompt(messages: List[Dict[str, Any]]) -> List[str]:
+        tokens: List[str] = []
+        for msg in messages:
+            tokens.append(f"<{msg.get('role', 'user')}>")
+            tokens.extend(_tokens(msg.get("content", "")))
+        return tokens
+
+    def _stats(load_cost: float, prompt_count: int, eval_count: int) -> Dict[str, Any]:
+        prompt_duration = prompt_count * prompt_token_latency
+        eval_duration = eval_count * token_latency + latency
+        return {
+            "total_duration": int((load_cost + prompt_duration + eval_duration) * 1e9),
+            "load_duration": int(load_cost * 1e9),
+            "prompt_eval_count": prompt_count,
+            "prompt_eval_duration": int(prompt_duration * 1e9),
+            "eval_count": eval_count,
+            "eval_duration": int(max(eval_duration, 1e-6) * 1e9)
+        }
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        stream = body.get("stream", True)
+        options = body.get("options") or {}
+        count = min(int(options.get("num_predict") or completion_tokens), completion_tokens)
+
+        load_cost = _ensure_loaded(model, body.get("keep_alive"))
+        prompt_count = _prompt_eval(model, _chat_prompt(body.get("messages", [])))
+        words = [f"tok{i}" for i in range(count)]
+        # Like Ollama, the generated reply stays in the KV cache after the prompt
+        kv_cache[model] = kv_cache[model] + ["<assistant>"] + words
+
+        if not stream:
+            await asyncio.sleep(load_cost + prompt_count * prompt_token_latency + latency + count * token_latency)
+            return JSONResponse({
+                "model": model,
+                "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "done": True,
+                "done_reason": "stop",
+                **_stats(load_cost, prompt_count, count)
+            })
+
+        async def generate_chunks():
+            await asyncio.sleep(load_cost + prompt_count * prompt_token_latency + latency)
+            for word in words:
+                if token_latency:
+                    await asyncio.sleep(token_latency)
+                yield json.dumps({
+                    "model": model,
+                    "created_at": "2025-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": word + " "},
+                    "done": False
+                }) + "\n"
+            yield json.dumps({
+                "model": model,
+                "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "done_reason": "stop",
+                **_stats(load_cost, prompt_count, count)
+            }) + "\n"
+
+        return StreamingResponse(generate_chunks(), media_type="application/x-ndjson")
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        load_cost = _ensure_loaded(model, body.get("keep_alive"))
+        await asyncio.sleep(load_cost)
+        return JSONResponse({
+            "model": model,
+            "created_at": "2025-01-01T00:00:00Z",
+            "response": "",
+            "done": True,
+            "done_reason": "load" if body.get("keep_alive") != 0 else "unload"
+        })
+
+    # Like OLLAMA_NUM_PARALLEL: embed requests beyond this wait (0 = unlimited)
+    embed_slots = asyncio.Semaphore(embed_parallelism) if embed_parallelism > 0 else None
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if embed_slots is not None:
+            async with embed_slots:
+                await asyncio.sleep(embed_latency + embed_item_latency * len(inputs))
+        else:
+            await asyncio.sleep(embed_latency + embed_item_latency * len(inputs))
+        embeddings = []
+        for text in inputs:
+            seed = hashlib.sha256(text.encode("utf-8")).digest()
+            embeddings.append([((seed[i % len(seed)] / 255.0) - 0.5) for i in range(dimensions)])
+        return JSONResponse({"model": body.get("model", ""), "embeddings": embeddings})
+
+    @app.get("/api/ps")
+    async def ps():
+        now = time.time()
+        models = [
+            {
+                "name": model,
+                "model": model,
+                "size": 4_000_000_000,
+                "size_vram": 4_000_000_000,
+                "expires_at": "2099-01-01T00:00:00Z"
+            }
+            for model, expiry in loaded.items() if expiry > now
+        ]
+        return JSONResponse({"models": models})
+
+    @app.get("/api/tags")
+    async def tags():
+        return JSONResponse({"models": [{"name": m, "model": m, "size": 4_000_000_000} for m in loaded]})
+
+    return app
+
+
+class FakeOllamaServer:
+    """Run the fake Ollama server in a subprocess for the duration of a block."""
+
+    def __init__(self, port: int = 11500, **options):
+        self.port = port
+        self.options = options
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "FakeOllamaServer":
+        args = [sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(self.port)]
+        for key, value in self.options.items():
+            args += [f"--{key.replace('_', '-')}", str(value)]
+        self.process = subprocess.Popen(
+            args,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            try:
+                httpx.get(f"{self.host}/api/tags", timeout=0.5)
+                return self
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError("Fake Ollama server did not start")
+
+    def __exit__(self, *exc) -> None:
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+            self.process = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarks")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=32)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0)
+    parser.add_argument("--load-latency", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.01)
+    parser.add_argument("--embed-item-latency", type=float, default=0.001)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--embed-parallelism", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(
+        latency=args.latency,
+        token_latency=args.token_latency,
+        completion_tokens=args.completion_tokens,
+        prompt_token_latency=args.prompt_token_latency,
+        load_latency=args.load_latency,
+        embed_latency=args.embed_latency,
+        embed_item_latency=args.embed_item_latency,
+        dimensions=args.dimensions,
+        embed_parallelism=args.embed_parallelism
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", backlog=2048)
+
+
+if __name__ == "__main__":
+    main()
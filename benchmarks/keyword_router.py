@@ -0,0 +1,83 @@
+"""
+Model routing cost: linear keyword substring scans vs. the compiled KeywordRouter.
+
+"before" reproduces the old select_model_for_task, which checked every keyword
+list with ``any(keyword in message ...)``. "after" is KeywordRouter.classify.
+Messages range from a short question to whole files pasted into the chat,
+followed by short requests that check where generic patterns like "write a"
+send them.
+
+    python -m benchmarks.keyword_router --iterations 200
+"""
+import argparse
+import inspect
+import time
+from typing import Callable, Optional
+
+from app.utils.keywords import (PROGRAMMING_LANGUAGES, CODE_RELATED_TERMS,
+                                 TRANSLATION_TERMS, MATH_TERMS, CREATIVE_TERMS)
+
+
+def _linear_scan(message: str) -> Optional[str]:
+    message = message.lower()
+    if any(keyword in message for keyword in PROGRAMMING_LANGUAGES + CODE_RELATED_TERMS):
+        return "CODE"
+    if any(keyword in message for keyword in CREATIVE_TERMS):
+        return "CREATIVE"
+    if any(keyword in message for keyword in MATH_TERMS):
+        return "MATH"
+    if any(keyword in message for keyword in TRANSLATION_TERMS):
+        return "TRANSLATION"
+    return None
+
+
+def _messages() -> dict:
+    from app.services import agent_service
+
+    # Prose that matches nothing, so the linear scan has to try every keyword
+    prose = "Please have a look at the following notes from our meeting yesterday. " * 8
+    source = inspect.getsource(agent_service)
+    return {
+        "short question": "What is the capital of Australia?",
+        "short, no match": prose[:600],
+        "pasted file (~20 KB)": "Why does this fail?\n" + source[:20_000],
+        "pasted files (~200 KB)": "Review these files:\n" + (source * 10)[:200_000],
+        "long prose (~200 KB)": (prose * 400)[:200_000],
+        "poem request": "Write a poem about the sea",
+        "code request": "Write a function that reverses a string",
+        "story request": "Create a short story about a lighthouse keeper",
+        "example request": "Show me how to solve this equation: 2x + 3 = 11"
+    }
+
+
+def _time(func: Callable[[str], object], message: str, iterations: int, repeats: int = 5) -> float:
+    """Seconds per call, best of `repeats` runs (like timeit), to keep scheduler noise out."""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(message)
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    from app.services.routing.keyword_router import KeywordRouter
+    router = KeywordRouter()
+
+    print(f"{'message':<24} {'before us':>11} {'after us':>10}  {'before':<12} {'after':<12}")
+    for name, message in _messages().items():
+        before = _time(_linear_scan, message, args.iterations)
+        after = _time(router.classify, message, args.iterations)
+        print(
+            f"{name:<24} {before * 1e6:>11.1f} {after * 1e6:>10.1f}  "
+            f"{str(_linear_scan(message)):<12} {str(router.classify(message)[0]):<12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
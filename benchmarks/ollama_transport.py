@@ -0,0 +1,73 @@
+"""
+Throughput of OllamaModelHandler transports under concurrent chats.
+
+Compares the legacy "executor" transport (sync client in the default thread
+pool) with the pooled "async" transport against a local fake Ollama server.
+
+    python -m benchmarks.ollama_transport --concurrency 64 128 --requests 512
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+async def _run(transport: str, host: str, concurrency: int, total: int) -> dict:
+    from app.models.schemas import Message
+    from app.services.model_providers.ollama import OllamaModelHandler
+    from app.services.model_providers.transport import close_async_clients
+
+    handler = OllamaModelHandler(host=host, transport=transport)
+    messages = [Message(role="user", content="Hello there, how are you?")]
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_chat():
+        async with semaphore:
+            started = time.perf_counter()
+            await handler.generate(messages=messages, model="fake", temperature=0.7, max_tokens=32)
+            latencies.append(time.perf_counter() - started)
+
+    # Warm up the connection pool / thread pool
+    await asyncio.gather(*(one_chat() for _ in range(min(concurrency, total))))
+    latencies.clear()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_chat() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    await close_async_clients()
+    latencies.sort()
+    return {
+        "transport": transport,
+        "concurrency": concurrency,
+        "chats_per_sec": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[64, 128])
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake per-chat latency in seconds")
+    parser.add_argument("--port", type=int, default=11500)
+    args = parser.parse_args()
+
+    with FakeOllamaServer(port=args.port, latency=args.latency) as server:
+        print(f"{'transport':<10} {'conc':>5} {'chats/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for concurrency in args.concurrency:
+            for transport in ("executor", "async"):
+                result = asyncio.run(_run(transport, server.host, concurrency, args.requests))
+                print(
+                    f"{result['transport']:<10} {result['concurrency']:>5} "
+                    f"{result['chats_per_sec']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Pre-generation latency: sequential stages vs. the AgentService stage pipeline.
+
+"before" reproduces the old _prepare_request: save the user message, load
+history, select the model, retrieve RAG context and fit the prompt, one after
+another. "after" is AgentService._prepare_request, where history loading and
+retrieval run concurrently and the user-message write runs in the background.
+Both run with the write-behind queue and the conversation cache off, so every
+save and history load pays its MongoDB round trips, as when the pipeline was
+introduced. "cached" is "after" with both on (the defaults), for reference.
+
+Memory is the real MemoryService on AsyncMongoMemory, over the in-process
+Mongo stand-in (benchmarks/fake_mongo.py) with MongoDB-like round-trip
+latencies; the backend's queries are checked against it before timing. The
+retriever embeds the query through the fake Ollama server's /api/embed and
+then pays a FAISS search latency.
+
+    python -m benchmarks.pre_generation --requests 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+from langchain.schema import Document
+
+from benchmarks.fake_mongo import FakeMongoClient
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+async def _check_backend() -> None:
+    """Check AsyncMongoMemory's index, ordered batch inserts, projection and history order on the stand-in."""
+    import pymongo
+    from pymongo.errors import BulkWriteError
+    from app.models.schemas import Message
+    from app.services.memory.async_mongo_memory import AsyncMongoMemory
+
+    memory = AsyncMongoMemory(client=FakeMongoClient())
+    await memory.initialize()
+    collection = memory.messages_collection
+    assert [("conversation_id", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)] in collection.indexes
+
+    docs = [memory.message_to_doc(Message(role="user", content=f"m{i}"), "check") for i in range(5)]
+    await memory.insert_documents(docs)
+    assert [doc["content"] for doc in collection.documents] == [f"m{i}" for i in range(5)]
+    # An ordered batch stops at the first failure and reports how far it got
+    retry = [memory.message_to_doc(Message(role="user", content="m5"), "check"), docs[0]]
+    try:
+        await memory.insert_documents(retry)
+        raise AssertionError("duplicate _id was inserted")
+    except BulkWriteError as e:
+        assert e.details["nInserted"] == 1
+
+    recent = await memory.load_recent_documents("check", 3)
+    assert [doc["content"] for doc in recent] == ["m3", "m4", "m5"]
+    assert all(set(doc) == {"_id", "role", "content"} for doc in recent)
+    messages = await memory.load_recent_messages("check", 2)
+    assert [message.content for message in messages] == ["m4", "m5"]
+    await memory.close()
+
+
+class _FakeRetriever:
+    """RAGService stand-in: real query embedding over HTTP, simulated FAISS search."""
+
+    def __init__(self, host: str, search_latency: float):
+        from app.services.rag.embeddings import OllamaEmbeddingService
+        self.embedding_service = OllamaEmbeddingService(base_url=host)
+        self.search_latency = search_latency
+
+    async def retrieve_relevant_documents(self, query: str, top_k: int = 3, collection_name: Optional[str] = None) -> List[Document]:
+        await self.embedding_service.embed_query(query)
+        await asyncio.sleep(self.search_latency)
+        return [Document(page_content=f"Excerpt {i} about {query[:40]}") for i in range(top_k)]
+
+
+async def _sequential_prepare(agent, messages, conversation_id: str):
+    """The old, strictly sequential pre-generation stages."""
+    from app.config import settings
+    from app.models.schemas import Message
+
+    await agent.memory_service.save_message(messages[-1], conversation_id)
+    loaded = await agent.memory_service.load_recent_messages(conversation_id)
+    history = loaded[:-1]
+    model, task_type, _ = await agent.route_request(history + messages)
+    task_params = settings.TASK_PARAMS[task_type]
+    documents = await agent.rag_service.retrieve_relevant_documents(messages[-1].content)
+    context = Message(role="system", content="\n\n".join(doc.page_content for doc in documents))
+    return agent.context_budget.fit(history, messages, model, task_type, task_params["max_tokens"], context)
+
+
+async def _run(mode: str, host: str, args) -> List[float]:
+    """Time the pre-generation stages of every request; returns their latencies."""
+    from app.config import settings
+    from app.models.schemas import Message
+    from app.services.agent_service import AgentService
+    from app.services.memory_service import MemoryService
+    from app.services.model_service import ModelService
+    from app.services.response_cache import ResponseCache
+    from app.services.model_providers.transport import close_async_clients
+
+    settings.OLLAMA_HOST = host
+    settings.RESIDENCY_ENABLED = False
+    # Read when MemoryService is constructed
+    settings.MEMORY_WRITE_BEHIND_ENABLED = mode == "cached"
+    settings.MEMORY_CACHE_ENABLED = mode == "cached"
+
+    memory = MemoryService(
+        mongo_backend="async",
+        mongo_client=FakeMongoClient(read_latency=args.load_latency, write_latency=args.save_latency)
+    )
+    await memory.start()
+    agent = AgentService(
+        ModelService(response_cache=ResponseCache(enabled=False)),
+        memory,
+        _FakeRetriever(host, args.search_latency)
+    )
+
+    latencies = []
+    for i in range(args.requests):
+        messages = [Message(role="user", content=f"Question {i}: what did the report say about shipping costs?")]
+        started = time.perf_counter()
+        if mode == "before":
+            await _sequential_prepare(agent, messages, "bench")
+            latencies.append(time.perf_counter() - started)
+        else:
+            *_, pipeline = await agent._prepare_request(
+                messages, None, None, None, "bench",
+                skip_memory=False, use_rag=True, rag_collection="default", rag_num_results=3
+            )
+            latencies.append(time.perf_counter() - started)
+            # Saving the reply would wait for the user message the same way
+            await pipeline.wait("save")
+
+    await memory.close()
+    await close_async_clients()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--save-latency", type=float, default=0.008, help="Fake MongoDB insert seconds")
+    parser.add_argument("--load-latency", type=float, default=0.012, help="Fake MongoDB history query seconds")
+    parser.add_argument("--embed-latency", type=float, default=0.025, help="Fake query embedding seconds")
+    parser.add_argument("--search-latency", type=float, default=0.005, help="Fake FAISS search seconds")
+    parser.add_argument("--port", type=int, default=11550)
+    args = parser.parse_args()
+
+    asyncio.run(_check_backend())
+    with FakeOllamaServer(port=args.port, embed_latency=args.embed_latency, embed_item_latency=0.0) as server:
+        print(f"{'mode':<8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in ("before", "after", "cached"):
+            latencies = sorted(asyncio.run(_run(mode, server.host, args)))
+            print(
+                f"{mode:<8} {statistics.mean(latencies) * 1000:>8.1f} {statistics.median(latencies) * 1000:>8.1f} "
+                f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+KV-cache reuse of the "default" vs "prefix_stable" prompt layouts.
+
+Runs the same multi-turn conversation (with RAG context on every turn and an
+occasional coding question that the router sends to another model) through
+AgentService against the fake Ollama server, which emulates Ollama's per-model
+KV cache. Reports prompt_eval_count and latency per turn for each layout.
+
+    python -m benchmarks.prompt_layout --turns 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from langchain.schema import Document
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+FILLER = (
+    "the harbour town kept careful records of every ship that arrived during "
+    "the long winter and the merchants argued about prices in the square "
+)
+
+
+class _FixedRetriever:
+    """Stands in for RAGService: returns query-dependent documents without embeddings."""
+
+    async def retrieve_relevant_documents(self, query: str, top_k: int = 3, collection_name: str = None) -> List[Document]:
+        return [
+            Document(page_content=f"Excerpt {i} about {query[:40]}: " + FILLER * 2)
+            for i in range(top_k)
+        ]
+
+
+def _question(turn: int) -> str:
+    if turn % 4 == 3:
+        return f"Question {turn}: how would I write a python function that parses these records? " + FILLER
+    return f"Question {turn}: tell me more about what happened next in the story. " + FILLER * 2
+
+
+async def _run(layout: str, host: str, turns: int) -> List[dict]:
+    from app.config import settings
+    from app.models.schemas import Message
+    from app.services.agent_service import AgentService
+    from app.services.memory_service import MemoryService
+    from app.services.model_service import ModelService
+    from app.services.response_cache import ResponseCache
+    from app.services.model_providers.transport import close_async_clients
+
+    settings.OLLAMA_HOST = host
+    settings.PROMPT_LAYOUT = layout
+    settings.RESIDENCY_ENABLED = False
+
+    agent = AgentService(
+        ModelService(response_cache=ResponseCache(enabled=False)),
+        MemoryService(use_mongo=False),
+        _FixedRetriever()
+    )
+
+    results = []
+    for turn in range(turns):
+        started = time.perf_counter()
+        response = await agent.process_request(
+            messages=[Message(role="user", content=_question(turn))],
+            conversation_id=f"bench-{layout}"
+        )
+        results.append({
+            "turn": turn,
+            "model": response.model,
+            # prompt_tokens is Ollama's prompt_eval_count: only the tokens not served from the KV cache
+            "prompt_eval_count": response.usage.get("prompt_tokens", 0),
+            "latency_ms": (time.perf_counter() - started) * 1000
+        })
+
+    await close_async_clients()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=16)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.001, help="Fake prompt-eval seconds per token")
+    parser.add_argument("--port", type=int, default=11520)
+    args = parser.parse_args()
+
+    runs = {}
+    for offset, layout in enumerate(("default", "prefix_stable")):
+        # A fresh server per layout so both start with a cold KV cache
+        with FakeOllamaServer(
+            port=args.port + offset,
+            latency=0.05,
+            completion_tokens=32,
+            prompt_token_latency=args.prompt_token_latency
+        ) as server:
+            runs[layout] = asyncio.run(_run(layout, server.host, args.turns))
+
+    print(f"{'turn':>4}  {'default eval':>12} {'ms':>8}  {'prefix_stable eval':>18} {'ms':>8}")
+    for default, stable in zip(runs["default"], runs["prefix_stable"]):
+        print(
+            f"{default['turn']:>4}  {default['prompt_eval_count']:>12} {default['latency_ms']:>8.1f}  "
+            f"{stable['prompt_eval_count']:>18} {stable['latency_ms']:>8.1f}"
+        )
+    for layout, results in runs.items():
+        print(
+            f"{layout:<14} total prompt_eval_count={sum(r['prompt_eval_count'] for r in results):>6}  "
+            f"mean latency={statistics.mean(r['latency_ms'] for r in results):.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
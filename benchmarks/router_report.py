@@ -0,0 +1,123 @@
+"""
+Offline accuracy/latency report for the keyword and semantic task routers.
+
+Labels come from the section headers in prompts/prompts.txt
+("# code model questions" -> CODE, "# default model questions" -> DEFAULT, ...).
+Each prompt is routed by the KeywordRouter and by the SemanticRouter; the
+semantic router is timed cold (first embedding of the prompt) and warm
+(same prompt again) and reports which decisions fell back to keywords.
+
+Needs a running Ollama with the embedding model pulled:
+
+    ollama pull nomic-embed-text
+    python -m benchmarks.router_report
+
+--fake runs against the fake Ollama server instead. Its embeddings are hashes,
+so that only exercises the fallback and latency paths, not accuracy.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+def load_labelled_prompts(path: str) -> List[Tuple[str, str]]:
+    """(category, prompt) pairs from a prompts file with "# <category> model questions" headers."""
+    pairs = []
+    label = None
+    lines: List[str] = []
+
+    def flush():
+        text = "\n".join(lines).strip()
+        if label and text:
+            pairs.append((label, text))
+        lines.clear()
+
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            flush()
+            label = stripped.lstrip("#").split()[0].upper()
+        elif stripped == "---":
+            flush()
+        else:
+            lines.append(line)
+    flush()
+    return pairs
+
+
+async def _report(prompts: List[Tuple[str, str]], host: str, budget_ms: float) -> None:
+    from app.services.rag.embeddings import OllamaEmbeddingService
+    from app.services.routing.keyword_router import KeywordRouter
+    from app.services.routing.semantic_router import SemanticRouter
+    from app.config import settings
+
+    keyword_router = KeywordRouter()
+    with tempfile.TemporaryDirectory() as directory:
+        router = SemanticRouter(
+            OllamaEmbeddingService(model_name=settings.SEMANTIC_ROUTER_EMBEDDING_MODEL, base_url=host),
+            keyword_router,
+            centroids_path=str(Path(directory) / "centroids.json"),
+            latency_budget_ms=budget_ms
+        )
+        started = time.perf_counter()
+        if not await router.warm_up():
+            raise SystemExit("Could not build centroids, is the embedding model available?")
+        print(f"centroids built in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+        rows = []
+        for label, prompt in prompts:
+            started = time.perf_counter()
+            keyword = keyword_router.classify(prompt)[0] or "DEFAULT"
+            keyword_us = (time.perf_counter() - started) * 1e6
+
+            timings = []
+            for _ in range(2):
+                started = time.perf_counter()
+                semantic, details = await router.classify(prompt)
+                timings.append((time.perf_counter() - started) * 1000)
+            rows.append((label, keyword, semantic or "DEFAULT", details, keyword_us, timings, prompt))
+
+    print(f"{'label':<12} {'keyword':<12} {'semantic':<12} {'router':<8} {'sim':>6} {'cold ms':>8} {'warm ms':>8}  prompt")
+    for label, keyword, semantic, details, _, timings, prompt in rows:
+        print(
+            f"{label:<12} {keyword:<12} {semantic:<12} {details['router']:<8} "
+            f"{details.get('similarity', 0.0):>6.3f} {timings[0]:>8.1f} {timings[1]:>8.1f}  {prompt[:40]}"
+        )
+
+    total = len(rows)
+    print()
+    print(f"keyword  accuracy {sum(r[0] == r[1] for r in rows)}/{total}  "
+          f"mean {statistics.mean(r[4] for r in rows):.1f} us")
+    print(f"semantic accuracy {sum(r[0] == r[2] for r in rows)}/{total}  "
+          f"cold mean {statistics.mean(r[5][0] for r in rows):.1f} ms  "
+          f"warm mean {statistics.mean(r[5][1] for r in rows):.1f} ms  "
+          f"keyword fallbacks {sum(r[3]['router'] == 'keyword' for r in rows)}/{total}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", default="prompts/prompts.txt")
+    parser.add_argument("--host", default=None, help="Ollama host (defaults to settings.OLLAMA_HOST)")
+    parser.add_argument("--budget-ms", type=float, default=1000.0,
+                        help="Query embedding latency budget; generous by default so accuracy isn't masked by fallbacks")
+    parser.add_argument("--fake", action="store_true", help="Use the fake Ollama server")
+    parser.add_argument("--port", type=int, default=11540)
+    args = parser.parse_args()
+
+    prompts = load_labelled_prompts(args.prompts)
+    if args.fake:
+        with FakeOllamaServer(port=args.port, embed_latency=0.002) as server:
+            asyncio.run(_report(prompts, server.host, args.budget_ms))
+    else:
+        from app.config import settings
+        asyncio.run(_report(prompts, args.host or settings.OLLAMA_HOST, args.budget_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Per-upload persistence cost as a FAISS collection grows: full rewrite vs. delta segments.
+
+Uploads a batch of chunks at a time into one collection through
+FAISSVectorStore.add_documents and reports how long persisting each upload
+took. "full" rewrites the whole index every time (the old save_local
+behaviour, RAG_SEGMENTED_PERSISTENCE = False); "segment" appends the upload as
+a delta segment and compacts in the background. Both write atomically and
+fsync. At the end the collection is loaded again, which replays any segments.
+
+Embeddings come from the fake Ollama server; the second run is served from the
+document embedding cache, so only persistence differs.
+
+    python -m benchmarks.segment_persistence --batches 40 --batch-size 250
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+from langchain.schema import Document
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+def _batch(index: int, size: int, chars: int) -> List[Document]:
+    filler = "lorem ipsum dolor sit amet consectetur adipiscing elit " * (chars // 56 + 1)
+    return [
+        Document(page_content=f"batch {index} chunk {i}: {filler[:chars]}", metadata={"batch": index, "chunk": i})
+        for i in range(size)
+    ]
+
+
+async def _run(mode: str, host: str, directory: str, args) -> Dict[str, object]:
+    """Ingest every batch; returns per-batch persist times, compactions and the final load time."""
+    from app.config import settings
+    from app.services.rag.embeddings import OllamaEmbeddingService
+    from app.services.rag.vector_store import FAISSVectorStore
+    from app.services.model_providers.transport import close_async_clients
+
+    settings.RAG_SEGMENTED_PERSISTENCE = mode == "segment"
+    embeddings = OllamaEmbeddingService(base_url=host)
+    store = FAISSVectorStore(embeddings, os.path.join(directory, mode), "bench")
+
+    persist_seconds = []
+    for index in range(args.batches):
+        await store.add_documents(_batch(index, args.batch_size, args.chunk_chars))
+        persist_seconds.append(store.persistence_stats()["last_persist_seconds"])
+    if store.compacting:
+        await store._compaction
+
+    reloaded = FAISSVectorStore(embeddings, os.path.join(directory, mode), "bench")
+    started = time.perf_counter()
+    await reloaded.load()
+    load_seconds = time.perf_counter() - started
+    assert reloaded.vector_count == store.vector_count
+
+    stats = store.persistence_stats()
+    await close_async_clients()
+    return {
+        "persist_seconds": persist_seconds,
+        "vectors": store.vector_count,
+        "compactions": stats["compactions"],
+        "segments": stats["segments"],
+        "load_seconds": load_seconds
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=250, help="Chunks per upload")
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--report-every", type=int, default=5, help="Print every Nth batch")
+    parser.add_argument("--port", type=int, default=11561)
+    args = parser.parse_args()
+
+    from app.config import settings
+
+    directory = tempfile.mkdtemp(prefix="segment_persistence_")
+    settings.EMBEDDING_CACHE_PATH = os.path.join(directory, "embeddings.sqlite3")
+    try:
+        with FakeOllamaServer(port=args.port, dimensions=args.dimensions) as server:
+            results = {mode: asyncio.run(_run(mode, server.host, directory, args)) for mode in ("full", "segment")}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    full, segment = results["full"], results["segment"]
+    print(f"{args.batches} uploads of {args.batch_size} chunks, {args.dimensions} dimensions")
+    print(f"{'batch':>6} {'vectors':>8} {'full ms':>9} {'segment ms':>11}")
+    for index in range(args.batches):
+        if (index + 1) % args.report_every and index != 0:
+            continue
+        print(
+            f"{index + 1:>6} {(index + 1) * args.batch_size:>8} "
+            f"{full['persist_seconds'][index] * 1000:>9.1f} {segment['persist_seconds'][index] * 1000:>11.1f}"
+        )
+    for mode, result in results.items():
+        total = sum(result["persist_seconds"])
+        print(
+            f"{mode}: {total:.2f}s persisting in total, {result['compactions']} compactions, "
+            f"{result['segments']} segments left, load {result['load_seconds'] * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()